@@ -0,0 +1,194 @@
+"""
+Run every benchmark scenario on a seeded synthetic corpus and write the results as JSON, so runs on different commits
+can be compared:
+
+    build         time to index the corpus and peak RSS of the process doing it
+    index_size    size in bytes of the index file
+    query         latency distribution of single queries, with the result cache disabled
+    batch         queries per second of batch mode
+
+Each scenario runs in a fresh process, so peak RSS and timings don't depend on the scenarios run before it.
+
+Usage:
+    python3 benchmarks/benchmark_suite.py --files 1000 --words-per-file 2000 --output results.json
+"""
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "src"))
+import json
+import multiprocessing
+import platform
+import subprocess
+import tempfile
+import time
+from argparse import ArgumentParser, Namespace
+from contextlib import redirect_stdout
+from io import StringIO
+from typing import Callable
+
+import numpy as np
+
+from batch_search import LatencyReport, run_batch
+from corpus_generator import generate_corpus, generate_queries
+from regex_catalog import RegexCatalog
+from simple_search import SimpleSearch
+from tokenizer import Tokenizer
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+Scenario = Callable[[Namespace], dict]
+
+
+def peak_rss_bytes() -> int or None:
+    if resource is None:
+        return None
+    peak_rss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def new_simple_search(args: Namespace) -> SimpleSearch:
+    tokenizer: Tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter=" ")
+    return SimpleSearch(path=args.corpus, valid_extensions=['txt'], tokenizer=tokenizer, workers=args.workers,
+                        ranker=args.ranker, positions=args.positions, cache_entries=0, fuzzy=args.fuzzy)
+
+
+def load(args: Namespace) -> SimpleSearch:
+    simple_search: SimpleSearch = new_simple_search(args)
+    with redirect_stdout(StringIO()):
+        simple_search.load_database(args.index_file)
+    return simple_search
+
+
+def read_queries(args: Namespace) -> list[str]:
+    with open(args.queries_file, mode="r") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def build_scenario(args: Namespace) -> dict:
+    simple_search: SimpleSearch = new_simple_search(args)
+    start: float = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        simple_search.load_directory_into_database()
+    elapsed: float = time.perf_counter() - start
+    n_bytes: int = sum(os.path.getsize(os.path.join(args.corpus, filename))
+                       for filename in simple_search.database_files)
+    return {"seconds": elapsed, "files": len(simple_search.database_files), "bytes": n_bytes,
+            "mb_per_second": n_bytes / elapsed / 1e6, "peak_rss_bytes": peak_rss_bytes()}
+
+
+def index_size_scenario(args: Namespace) -> dict:
+    simple_search: SimpleSearch = new_simple_search(args)
+    with redirect_stdout(StringIO()):
+        simple_search.load_directory_into_database()
+    simple_search.save_index(args.index_file)
+    return {"bytes": os.path.getsize(args.index_file), "terms": sum(1 for _ in simple_search.database.terms()),
+            "peak_rss_bytes": peak_rss_bytes()}
+
+
+def query_scenario(args: Namespace) -> dict:
+    simple_search: SimpleSearch = load(args)
+    queries: list[str] = read_queries(args)
+    latencies: list[float] = list()
+    for query in queries:
+        start: float = time.perf_counter()
+        simple_search.search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    percentiles: list[float] = [float(value) for value in np.percentile(latencies, [50, 90, 95, 99])]
+    return {"queries": len(queries), "mean_ms": float(np.mean(latencies)), "p50_ms": percentiles[0],
+            "p90_ms": percentiles[1], "p95_ms": percentiles[2], "p99_ms": percentiles[3],
+            "max_ms": float(np.max(latencies)), "peak_rss_bytes": peak_rss_bytes()}
+
+
+def batch_scenario(args: Namespace) -> dict:
+    simple_search: SimpleSearch = load(args)
+    report: LatencyReport = run_batch(simple_search, read_queries(args), StringIO(), args.query_workers)
+    return {"queries": report.queries, "workers": args.query_workers, "qps": report.qps,
+            "p50_ms": report.percentile(50), "p99_ms": report.percentile(99), "peak_rss_bytes": peak_rss_bytes()}
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "build": build_scenario,
+    "index_size": index_size_scenario,
+    "query": query_scenario,
+    "batch": batch_scenario,
+}
+
+
+def run_scenario(name: str, args: Namespace, results: multiprocessing.Queue) -> None:
+    results.put(SCENARIOS[name](args))
+
+
+def run_in_fresh_process(name: str, args: Namespace) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results: multiprocessing.Queue = context.Queue()
+    process = context.Process(target=run_scenario, args=(name, args, results))
+    process.start()
+    result: dict = results.get()
+    process.join()
+    return result
+
+
+def git_commit() -> str or None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.realpath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark indexing and searching on a seeded synthetic corpus.")
+    parser.add_argument("--files", help="Number of files in the corpus", type=int, default=1000)
+    parser.add_argument("--words-per-file", help="Average number of words per file", type=int, default=2000)
+    parser.add_argument("--vocabulary", help="Number of distinct words", type=int, default=50_000)
+    parser.add_argument("--seed", help="Random seed of the corpus and the queries", type=int, default=42)
+    parser.add_argument("--n-queries", help="Number of queries", type=int, default=1000)
+    parser.add_argument("--ranker", help="Ranker to search with", type=str, default="percentage")
+    parser.add_argument("--positions", action="store_true", help="Index positions")
+    parser.add_argument("--fuzzy", help="Typos allowed in query words", type=int, default=0)
+    parser.add_argument("--workers", help="Number of processes indexing files", type=int, default=1)
+    parser.add_argument("--query-workers", help="Number of threads in the batch scenario", type=int, default=4)
+    parser.add_argument("--scenarios", help="Scenarios to run", nargs="+", choices=sorted(SCENARIOS),
+                        default=list(SCENARIOS))
+    parser.add_argument("--corpus", help="Directory to generate the corpus in, a temporary one if not given",
+                        type=str, default=None)
+    parser.add_argument("--output", help="File to write the results to, stdout if not given", type=str, default=None)
+    args: Namespace = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        args.corpus = args.corpus or os.path.join(directory, "corpus")
+        args.index_file = os.path.join(directory, "index.bin")
+        args.queries_file = os.path.join(directory, "queries.txt")
+        vocabulary: list[str] = generate_corpus(args.corpus, args.files, args.words_per_file, args.vocabulary,
+                                                seed=args.seed)
+        with open(args.queries_file, mode="w") as f:
+            f.writelines(query + "\n" for query in generate_queries(vocabulary, args.n_queries, seed=args.seed))
+
+        results: dict = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "parameters": {key: value for key, value in vars(args).items()
+                           if key not in ("corpus", "index_file", "queries_file", "output")},
+            "scenarios": {},
+        }
+        # query and batch scenarios open the index file written by index_size, or build it if it did not run
+        for name in args.scenarios:
+            print("running {}".format(name), file=sys.stderr)
+            results["scenarios"][name] = run_in_fresh_process(name, args)
+
+    output: str = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, mode="w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
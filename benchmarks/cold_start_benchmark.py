@@ -0,0 +1,66 @@
+"""
+Measure the time from launching src/simple_search.py to its search> prompt, and to the answer of a first query.
+
+Usage:
+    python3 benchmarks/cold_start_benchmark.py --path tests/samples --runs 5 --query "bicycle"
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+
+SIMPLE_SEARCH: str = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "src", "simple_search.py")
+PROMPT: bytes = b"search> "
+
+
+def read_until(stream, marker: bytes) -> bytes:
+    output: bytes = b""
+    while not output.endswith(marker):
+        byte: bytes = stream.read(1)
+        if not byte:
+            raise RuntimeError("simple_search.py exited before printing {!r}: {}".format(marker, output.decode()))
+        output += byte
+    return output
+
+
+def measure(arguments: list[str], query: str) -> tuple[float, float]:
+    """
+    Seconds to the first prompt, and to the prompt following the answer of query.
+    """
+    start: float = time.perf_counter()
+    process = subprocess.Popen([sys.executable, SIMPLE_SEARCH] + arguments, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    read_until(process.stdout, PROMPT)
+    to_prompt: float = time.perf_counter() - start
+
+    process.stdin.write(query.encode("utf-8") + b"\n")
+    process.stdin.flush()
+    read_until(process.stdout, PROMPT)
+    to_first_answer: float = time.perf_counter() - start
+
+    process.stdin.write(b":quit\n")
+    process.stdin.close()
+    process.wait()
+    return to_prompt, to_first_answer
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Report the time to the first search> prompt of simple_search.py.")
+    parser.add_argument("--path", help="Directory to index", type=str, required=True)
+    parser.add_argument("--runs", help="Number of launches, the median is reported", type=int, default=5)
+    parser.add_argument("--query", help="First query to send", type=str, default="bicycle")
+    args, simple_search_arguments = parser.parse_known_args()
+    if "--wait-for-index" not in simple_search_arguments:
+        # stdin is a pipe here, which simple_search.py only loads in the background with this option
+        simple_search_arguments.append("--index-in-background")
+
+    measures: list[tuple[float, float]] = [measure(["--path", args.path] + simple_search_arguments, args.query)
+                                           for _ in range(args.runs)]
+    print("time to prompt: {:.3f} s, time to first answer: {:.3f} s (median of {} runs)".format(
+        statistics.median(m[0] for m in measures), statistics.median(m[1] for m in measures), args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Generate a synthetic corpus of text files whose word frequencies follow Zipf's law, like natural language does: the
+k-th most frequent word appears about 1 / k^exponent times as often as the most frequent one. The same seed always
+generates the same files and queries.
+
+Usage:
+    python3 benchmarks/corpus_generator.py --output /tmp/corpus --files 1000 --words-per-file 2000 --seed 42
+"""
+import os
+from argparse import ArgumentParser, Namespace
+
+import numpy as np
+
+SYLLABLES: list[str] = [consonant + vowel for consonant in "bcdfghjklmnprstvz" for vowel in "aeiou"]
+WORDS_PER_LINE: int = 12
+
+
+def generate_vocabulary(size: int, rng: np.random.Generator) -> list[str]:
+    vocabulary: list[str] = list()
+    seen: set[str] = set()
+    while len(vocabulary) < size:
+        word: str = "".join(rng.choice(SYLLABLES, size=rng.integers(1, 5)))
+        if word not in seen:
+            seen.add(word)
+            vocabulary.append(word)
+    return vocabulary
+
+
+def zipf_probabilities(size: int, exponent: float) -> np.ndarray:
+    weights: np.ndarray = 1.0 / np.arange(1, size + 1) ** exponent
+    return weights / weights.sum()
+
+
+def generate_corpus(output: str, files: int, words_per_file: int, vocabulary_size: int = 50_000,
+                    exponent: float = 1.1, seed: int = 42) -> list[str]:
+    """
+    Write files text files of words_per_file words into output and return the vocabulary, most frequent word first.
+    File sizes vary between half and one and a half times words_per_file.
+    """
+    rng: np.random.Generator = np.random.default_rng(seed)
+    vocabulary: list[str] = generate_vocabulary(vocabulary_size, rng)
+    words: np.ndarray = np.array(vocabulary)
+    probabilities: np.ndarray = zipf_probabilities(vocabulary_size, exponent)
+
+    os.makedirs(output, exist_ok=True)
+    for file_number in range(files):
+        n_words: int = int(rng.integers(words_per_file // 2, words_per_file * 3 // 2 + 1))
+        file_words: np.ndarray = words[rng.choice(vocabulary_size, size=n_words, p=probabilities)]
+        lines: list[str] = [" ".join(file_words[i:i + WORDS_PER_LINE]) for i in range(0, n_words, WORDS_PER_LINE)]
+        with open(os.path.join(output, "doc_{:06d}.txt".format(file_number)), mode="w") as f:
+            f.write("\n".join(lines))
+            f.write("\n")
+    return vocabulary
+
+
+def generate_queries(vocabulary: list[str], n_queries: int, max_words: int = 4, exponent: float = 1.1,
+                     seed: int = 42) -> list[str]:
+    """
+    Queries of 1 to max_words words, drawn with the same Zipfian distribution as the corpus.
+    """
+    rng: np.random.Generator = np.random.default_rng(seed + 1)
+    probabilities: np.ndarray = zipf_probabilities(len(vocabulary), exponent)
+    return [" ".join(vocabulary[index] for index in rng.choice(len(vocabulary), size=rng.integers(1, max_words + 1),
+                                                               p=probabilities))
+            for _ in range(n_queries)]
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Generate a seeded synthetic corpus with a Zipfian vocabulary.")
+    parser.add_argument("--output", help="Directory to write the files to", type=str, required=True)
+    parser.add_argument("--files", help="Number of files", type=int, default=1000)
+    parser.add_argument("--words-per-file", help="Average number of words per file", type=int, default=2000)
+    parser.add_argument("--vocabulary", help="Number of distinct words", type=int, default=50_000)
+    parser.add_argument("--exponent", help="Exponent of the Zipf distribution", type=float, default=1.1)
+    parser.add_argument("--seed", help="Random seed", type=int, default=42)
+    parser.add_argument("--queries", help="File to write queries to, one per line", type=str, default=None)
+    parser.add_argument("--n-queries", help="Number of queries to write", type=int, default=1000)
+    args: Namespace = parser.parse_args()
+
+    vocabulary: list[str] = generate_corpus(args.output, args.files, args.words_per_file, args.vocabulary,
+                                            args.exponent, args.seed)
+    if args.queries:
+        with open(args.queries, mode="w") as f:
+            for query in generate_queries(vocabulary, args.n_queries, exponent=args.exponent, seed=args.seed):
+                f.write(query + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Measure indexing throughput of a directory with a single process and with N worker processes.
+
+Usage:
+    python3 benchmarks/indexing_throughput.py --path tests/samples --workers 4
+"""
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "src"))
+import time
+from argparse import ArgumentParser, Namespace
+from contextlib import redirect_stdout
+from io import StringIO
+
+from regex_catalog import RegexCatalog
+from simple_search import SimpleSearch
+from tokenizer import Tokenizer
+
+
+def measure(path: str, workers: int) -> tuple[float, int, int]:
+    tokenizer: Tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter=" ")
+    simple_search: SimpleSearch = SimpleSearch(path=path, valid_extensions=['txt'], tokenizer=tokenizer,
+                                               workers=workers)
+    start: float = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        simple_search.load_directory_into_database()
+    elapsed: float = time.perf_counter() - start
+
+    n_bytes: int = sum(os.path.getsize(os.path.join(path, filename)) for filename in simple_search.database_files)
+    return elapsed, len(simple_search.database_files), n_bytes
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Report indexing throughput with 1 vs N worker processes.")
+    parser.add_argument("--path", help="Directory to index", type=str, required=True)
+    parser.add_argument("--workers", help="Number of worker processes to compare against", type=int,
+                        default=os.cpu_count())
+    args: Namespace = parser.parse_args()
+
+    for workers in sorted({1, args.workers}):
+        elapsed, n_files, n_bytes = measure(args.path, workers)
+        print("workers: {:>3}  {:>8.2f}s  {:>8.2f} MB/s  {:>10.1f} files/s".format(
+            workers, elapsed, n_bytes / elapsed / 2 ** 20, n_files / elapsed))
+
+
+if __name__ == "__main__":
+    main()
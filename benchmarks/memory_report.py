@@ -0,0 +1,63 @@
+"""
+Compare the resident size of the index using the legacy layout (dict[str, set[str]] of filenames per token) against
+the current one (dict[str, PostingList] of varbyte encoded doc ids plus a DocumentRegistry), and what indexing
+positions adds on top of it.
+
+Usage:
+    python3 benchmarks/memory_report.py --path tests/samples
+"""
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "src"))
+from argparse import ArgumentParser, Namespace
+
+from regex_catalog import RegexCatalog
+from simple_search import SimpleSearch
+from tokenizer import Tokenizer
+
+
+def build_legacy_dictionary(simple_search: SimpleSearch) -> dict[str, set[str]]:
+    dictionary: dict[str, set[str]] = {}
+    for filename in simple_search.database_files:
+        with open(os.path.join(simple_search.path, filename), mode="r") as f:
+            for line in f:
+                for token in simple_search.tokenizer.get_tokens(raw_string=line):
+                    dictionary.setdefault(token, set()).add(filename)
+    return dictionary
+
+
+def postings_size(dictionary: dict) -> int:
+    # token strings are shared by both layouts, so only the containers holding the postings are measured
+    return sys.getsizeof(dictionary) + sum(sys.getsizeof(postings) for postings in dictionary.values())
+
+
+def registry_size(simple_search: SimpleSearch) -> int:
+    registry = simple_search.document_registry
+    return sys.getsizeof(registry.filenames) + sys.getsizeof(registry._doc_ids)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Report index memory usage for the legacy and the current layouts.")
+    parser.add_argument("--path", help="Directory to index", type=str, required=True)
+    args: Namespace = parser.parse_args()
+
+    tokenizer: Tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter=" ")
+    simple_search: SimpleSearch = SimpleSearch(path=args.path, valid_extensions=['txt'], tokenizer=tokenizer,
+                                               positions=True)
+    simple_search.load_directory_into_database()
+    legacy_dictionary: dict[str, set[str]] = build_legacy_dictionary(simple_search)
+
+    legacy_bytes: int = postings_size(legacy_dictionary)
+    current_bytes: int = postings_size(simple_search.database.dictionary) + registry_size(simple_search)
+    positions_bytes: int = postings_size(simple_search.database.positions)
+    n_postings: int = sum(len(postings) for postings in legacy_dictionary.values())
+
+    print("files: {}, tokens: {}, postings: {}".format(
+        len(simple_search.database_files), len(legacy_dictionary), n_postings))
+    print("legacy  dict[str, set[str]]:         {:>12,} bytes".format(legacy_bytes))
+    print("current dict[str, PostingList] + ids: {:>12,} bytes".format(current_bytes))
+    print("ratio: {:.2f}x smaller".format(legacy_bytes / current_bytes))
+    print("positions dict[str, PositionList]:   {:>12,} bytes".format(positions_bytes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Run a log of queries with exhaustive BM25 and with MaxScore pruning, and report their latency along with the postings
+MaxScore scanned and skipped.
+
+Usage:
+    python3 benchmarks/pruning_benchmark.py --path tests/samples --queries queries.txt
+"""
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "src"))
+import time
+from argparse import ArgumentParser, Namespace
+from contextlib import redirect_stdout
+from io import StringIO
+
+from regex_catalog import RegexCatalog
+from simple_search import SimpleSearch
+from tokenizer import Tokenizer
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Compare exhaustive BM25 ranking against MaxScore pruning.")
+    parser.add_argument("--path", help="Directory to index", type=str, required=True)
+    parser.add_argument("--queries", help="File with one query per line", type=str, required=True)
+    parser.add_argument("--index-file", help="Index file to load the directory from", type=str, default=None)
+    args: Namespace = parser.parse_args()
+
+    with open(args.queries, mode="r") as f:
+        queries: list[str] = [line.strip() for line in f if line.strip()]
+
+    tokenizer: Tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter=" ")
+    for ranker in ("bm25", "bm25-maxscore"):
+        simple_search: SimpleSearch = SimpleSearch(path=args.path, valid_extensions=['txt'], tokenizer=tokenizer,
+                                                   ranker=ranker, cache_entries=0)
+        with redirect_stdout(StringIO()):
+            simple_search.load_database(args.index_file)
+
+        start: float = time.perf_counter()
+        for query in queries:
+            simple_search.rank_search_hits(simple_search.get_query_tokens(query))
+        elapsed: float = time.perf_counter() - start
+
+        print("{:<14} {:>8.3f} ms/query".format(ranker, elapsed / len(queries) * 1000))
+        if hasattr(simple_search.ranker, "stats"):
+            print("{:<14} {}".format("", simple_search.ranker.stats))
+
+
+if __name__ == "__main__":
+    main()
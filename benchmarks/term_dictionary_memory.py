@@ -0,0 +1,74 @@
+"""
+Compare the memory and lookup time of a dict[str, PostingList] term dictionary against a CompactDictionary, for
+growing vocabularies of synthetic terms. Every term maps to the same value, so only the cost of the terms and of the
+table is measured.
+
+Usage:
+    python3 benchmarks/term_dictionary_memory.py --sizes 10000 100000 1000000
+"""
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "src"))
+import random
+import time
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from typing import Callable, Mapping
+
+from compact_dictionary import CompactDictionary
+
+ALPHABET: str = "abcdefghijklmnopqrstuvwxyz0123456789_"
+
+
+def make_terms(size: int, seed: int) -> list[str]:
+    # identifier like words of 3 to 15 characters, the length of most words found in source code and prose
+    generator: random.Random = random.Random(seed)
+    terms: set[str] = set()
+    while len(terms) < size:
+        length: int = generator.randint(3, 15)
+        terms.add(generator.choice(ALPHABET[:26]) + "".join(generator.choices(ALPHABET, k=length - 1)))
+    return list(terms)
+
+
+def measure(build: Callable[[], Mapping]) -> tuple[Mapping, int]:
+    """
+    The built mapping and the bytes allocated to build it, the terms included.
+    """
+    tracemalloc.start()
+    mapping: Mapping = build()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return mapping, allocated
+
+
+def lookup_seconds(mapping: Mapping, queries: list[str]) -> float:
+    start: float = time.perf_counter()
+    for query in queries:
+        mapping.get(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Report the memory of the term dictionary against the vocabulary size.")
+    parser.add_argument("--sizes", help="Vocabulary sizes to measure", nargs="+", type=int,
+                        default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", help="Number of lookups to time", type=int, default=100_000)
+    parser.add_argument("--seed", help="Seed of the synthetic terms", type=int, default=0)
+    args: Namespace = parser.parse_args()
+
+    value: object = object()
+    print("{:>10} {:>14} {:>14} {:>8} {:>12} {:>12}".format("terms", "dict bytes", "compact bytes", "ratio",
+                                                            "dict get", "compact get"))
+    for size in args.sizes:
+        # terms are encoded from fresh str objects, built inside the measure like the tokenizer does when indexing
+        encoded_terms: list[bytes] = [term.encode("utf-8") for term in make_terms(size, args.seed)]
+        dictionary, dict_bytes = measure(lambda: {term.decode("utf-8"): value for term in encoded_terms})
+        compact, compact_bytes = measure(lambda: CompactDictionary((term.decode("utf-8"), value)
+                                                                   for term in encoded_terms))
+        queries: list[str] = random.Random(args.seed).choices(list(dictionary), k=args.lookups)
+        print("{:>10,} {:>14,} {:>14,} {:>7.2f}x {:>9.0f} ns {:>9.0f} ns".format(
+            size, dict_bytes, compact_bytes, dict_bytes / compact_bytes, lookup_seconds(dictionary, queries) * 1e9,
+            lookup_seconds(compact, queries) * 1e9))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare tokens/sec of the original line by line tokenization (one re.compile lookup per word) against streaming a whole
+file through Tokenizer.iter_file_tokens.
+
+Usage:
+    python3 benchmarks/tokenizer_benchmark.py --path tests/samples
+"""
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "src"))
+import re
+import time
+from argparse import ArgumentParser, Namespace
+from typing import Callable
+
+from regex_catalog import RegexCatalog
+from tokenizer import Tokenizer
+
+
+def legacy_get_tokens(tokenizer: Tokenizer, raw_string: str) -> set[str]:
+    tokens: set[str] = set()
+    for word in raw_string.split(tokenizer.word_delimiter):
+        for token in RegexCatalog.get_pattern(tokenizer.regex, flags=re.IGNORECASE).findall(word):
+            tokens.add(token.lower())
+    return tokens
+
+
+def tokenize_by_line(tokenizer: Tokenizer, file_path: str) -> int:
+    n_tokens: int = 0
+    with open(file_path, mode="r") as f:
+        for line in f:
+            n_tokens += len(legacy_get_tokens(tokenizer, line))
+    return n_tokens
+
+
+def tokenize_streaming(tokenizer: Tokenizer, file_path: str) -> int:
+    n_tokens: int = 0
+    with open(file_path, mode="r") as f:
+        for _ in tokenizer.iter_file_tokens(f):
+            n_tokens += 1
+    return n_tokens
+
+
+def measure(tokenize: Callable[[Tokenizer, str], int], tokenizer: Tokenizer, file_paths: list[str]) -> float:
+    start: float = time.perf_counter()
+    for file_path in file_paths:
+        tokenize(tokenizer, file_path)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Report tokenizer throughput before and after streaming tokenization.")
+    parser.add_argument("--path", help="Directory with the text files to tokenize", type=str, required=True)
+    args: Namespace = parser.parse_args()
+
+    tokenizer: Tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter=" ")
+    file_paths: list[str] = [os.path.join(args.path, filename) for filename in sorted(os.listdir(args.path))
+                             if filename.endswith(".txt")]
+
+    # both are measured against the number of token occurrences in the files
+    n_tokens: int = sum(tokenize_streaming(tokenizer, file_path) for file_path in file_paths)
+    print("{:,} tokens in {} files".format(n_tokens, len(file_paths)))
+    print("line by line: {:>14,.0f} tokens/s".format(n_tokens / measure(tokenize_by_line, tokenizer, file_paths)))
+    print("streaming:    {:>14,.0f} tokens/s".format(n_tokens / measure(tokenize_streaming, tokenizer, file_paths)))
+
+
+if __name__ == "__main__":
+    main()
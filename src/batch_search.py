@@ -0,0 +1,113 @@
+import json
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, TextIO
+
+import numpy as np
+
+from query_parser import QueryParseError
+
+QueryResult = dict
+BATCH_SIZE: int = 1024
+
+# SimpleSearch used by the forked worker processes: they inherit it from the parent instead of loading the index again
+_worker_simple_search: 'SimpleSearch' or None = None
+
+
+class LatencyReport:
+    """
+    Latencies of the queries in a batch, in milliseconds, and the wall time it took to run all of them, in seconds.
+    """
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = list()
+        self.errors: int = 0
+        self.elapsed: float = 0.0
+
+    @property
+    def queries(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def qps(self) -> float:
+        return self.queries / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        if not self.latencies:
+            return 0.0
+        return float(np.percentile(self.latencies, percentile))
+
+    def __repr__(self) -> str:
+        return "queries: {}, errors: {}, qps: {:.1f}, p50: {:.3f} ms, p95: {:.3f} ms, p99: {:.3f} ms".format(
+            self.queries, self.errors, self.qps, self.percentile(50), self.percentile(95), self.percentile(99))
+
+
+def search_query(simple_search: 'SimpleSearch', query: str) -> QueryResult:
+    start: float = time.perf_counter()
+    try:
+        results = simple_search.search(query)
+        result: QueryResult = {"query": query, "results": [[filename, score] for filename, score in results]}
+    except QueryParseError as e:
+        result = {"query": query, "error": e.message}
+    result["latency_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def _search_in_worker(query: str) -> QueryResult:
+    return search_query(_worker_simple_search, query)
+
+
+def read_queries(f: TextIO) -> Iterator[str]:
+    for line in f:
+        query: str = line.strip()
+        if query:
+            yield query
+
+
+def run_batch(simple_search: 'SimpleSearch', queries: Iterable[str], output: TextIO, workers: int = 1,
+              processes: bool = False) -> LatencyReport:
+    """
+    Search every query, workers of them at a time, and write one JSON line per query to output, in the order of
+    queries, as soon as its batch is done: {"query", "results": [[filename, score], ...] or "error", "latency_ms"}.
+
+    Threads share simple_search as is; its index is only read, and most of the time of a query is spent in NumPy,
+    which releases the GIL. With processes, workers are forked from this process and share its memory (and the memory
+    mapped index file) copy on write, so nothing is loaded again.
+    """
+    global _worker_simple_search
+    if workers < 1:
+        raise ValueError("Expected workers to be a positive integer.")
+    if processes and "fork" not in multiprocessing.get_all_start_methods():
+        raise ValueError("Searching in several processes needs the fork start method, use threads instead.")
+
+    report: LatencyReport = LatencyReport()
+    start: float = time.perf_counter()
+    if processes:
+        _worker_simple_search = simple_search
+        executor: Executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    with executor:
+        queries = iter(queries)
+        while True:
+            batch: list[str] = list(islice(queries, BATCH_SIZE))
+            if not batch:
+                break
+
+            if processes:
+                results: Iterable[QueryResult] = executor.map(_search_in_worker, batch,
+                                                              chunksize=max(1, len(batch) // (workers * 4)))
+            else:
+                results = executor.map(search_query, [simple_search] * len(batch), batch)
+            for result in results:
+                report.latencies.append(result["latency_ms"])
+                report.errors += "error" in result
+                output.write(json.dumps(result, ensure_ascii=False))
+                output.write("\n")
+
+    _worker_simple_search = None
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -0,0 +1,150 @@
+import zlib
+from array import array
+from collections.abc import MutableMapping, Sequence
+from itertools import accumulate
+from typing import Any, Iterable, Iterator
+
+EMPTY_SLOT: int = 0
+MAX_LOAD_FACTOR: float = 0.5
+
+
+class CompactDictionary(MutableMapping):
+    """
+    Mapping from terms to values that does not keep a str object per term. Terms are interned into one UTF-8 buffer,
+    sorted, where term id i spans buffer[offsets[i]:offsets[i + 1]], and values are a list indexed by term id. A term
+    is looked up in an open addressing hash table of term ids (plus one, 0 marks an empty slot), probed linearly from
+    the crc32 of its bytes, which is the same in every process. A lookup only encodes the term and compares it to the
+    bytes of the candidate ids.
+
+    That takes about len(term) + 20 bytes per term, against the 50 bytes of a str object plus the dict slot, which
+    dominates the memory of large vocabularies. The terms given on construction are frozen: terms added later go to a
+    regular dict, until they are interned too by building a new CompactDictionary from this one. Deleting an interned
+    term only clears its value.
+    """
+
+    def __init__(self, items: Iterable[tuple[str, Any]] = ()) -> None:
+        pairs: list[tuple[bytes, Any]] = sorted((term.encode("utf-8"), value) for term, value in items)
+        self._buffer: bytes = b"".join(encoded_term for encoded_term, _ in pairs)
+        self._offsets: array = array('I' if len(self._buffer) < 1 << 32 else 'Q',
+                                     accumulate((len(encoded_term) for encoded_term, _ in pairs), initial=0))
+        self._values: list = [value for _, value in pairs]
+        self._n_interned: int = len(pairs)
+        self._overflow: dict[str, Any] = dict()
+
+        n_slots: int = 1
+        while n_slots * MAX_LOAD_FACTOR < len(pairs) + 1:
+            n_slots *= 2
+        self._slots: array = array('I', bytes(4 * n_slots))
+        self._mask: int = n_slots - 1
+        for term_id, (encoded_term, _) in enumerate(pairs):
+            slot: int = zlib.crc32(encoded_term) & self._mask
+            while self._slots[slot] != EMPTY_SLOT:
+                slot = (slot + 1) & self._mask
+            self._slots[slot] = term_id + 1
+
+    @property
+    def n_interned(self) -> int:
+        """
+        Number of terms in the buffer, deleted ones included.
+        """
+        return self._n_interned
+
+    @property
+    def overflow(self) -> dict[str, Any]:
+        return self._overflow
+
+    @property
+    def fully_interned(self) -> bool:
+        """
+        Whether no term was added or deleted since construction, so rebuilding would give the same dictionary.
+        """
+        return not self._overflow and None not in self._values
+
+    def interned_terms(self) -> 'InternedTerms':
+        return InternedTerms(self)
+
+    def term_id(self, term: str) -> int or None:
+        """
+        Id of an interned term, None if term was not interned.
+        """
+        encoded_term: bytes = term.encode("utf-8")
+        slots, offsets, mask = self._slots, self._offsets, self._mask
+        slot: int = zlib.crc32(encoded_term) & mask
+        while slots[slot] != EMPTY_SLOT:
+            term_id: int = slots[slot] - 1
+            start: int = offsets[term_id]
+            if offsets[term_id + 1] - start == len(encoded_term) and self._buffer.startswith(encoded_term, start):
+                return term_id
+            slot = (slot + 1) & mask
+        return None
+
+    def term(self, term_id: int) -> str:
+        return self._buffer[self._offsets[term_id]:self._offsets[term_id + 1]].decode("utf-8")
+
+    def __getitem__(self, term: str) -> Any:
+        term_id: int or None = self.term_id(term)
+        if term_id is not None and self._values[term_id] is not None:
+            return self._values[term_id]
+        return self._overflow[term]
+
+    def get(self, term: str, default: Any = None) -> Any:
+        term_id: int or None = self.term_id(term)
+        if term_id is not None and self._values[term_id] is not None:
+            return self._values[term_id]
+        return self._overflow.get(term, default)
+
+    def __contains__(self, term: Any) -> bool:
+        return isinstance(term, str) and self.get(term) is not None
+
+    def __setitem__(self, term: str, value: Any) -> None:
+        term_id: int or None = self.term_id(term)
+        if term_id is None:
+            self._overflow[term] = value
+        else:
+            self._values[term_id] = value
+
+    def __delitem__(self, term: str) -> None:
+        term_id: int or None = self.term_id(term)
+        if term_id is None or self._values[term_id] is None:
+            del self._overflow[term]
+        else:
+            self._values[term_id] = None
+
+    def __iter__(self) -> Iterator[str]:
+        for term_id, value in enumerate(self._values):
+            if value is not None:
+                yield self.term(term_id)
+        yield from self._overflow
+
+    def __len__(self) -> int:
+        return self._n_interned - self._values.count(None) + len(self._overflow)
+
+    def __sizeof__(self) -> int:
+        """
+        Size of the structure itself, values excluded, like sys.getsizeof of a dict.
+        """
+        return (object.__sizeof__(self) + self._buffer.__sizeof__() + self._offsets.__sizeof__()
+                + self._slots.__sizeof__() + self._values.__sizeof__() + self._overflow.__sizeof__()
+                + sum(term.__sizeof__() for term in self._overflow))
+
+
+class InternedTerms(Sequence):
+    """
+    The interned terms of a CompactDictionary, deleted ones included, as a sorted sequence decoded on access: binary
+    searching it, or going through a range of it, never holds more than a few terms as str at once.
+    """
+
+    def __init__(self, dictionary: CompactDictionary) -> None:
+        self._dictionary = dictionary
+
+    def __len__(self) -> int:
+        return self._dictionary.n_interned
+
+    def __getitem__(self, index: int or slice) -> str or list[str]:
+        if isinstance(index, slice):
+            return [self._dictionary.term(term_id) for term_id in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("term id out of range")
+        return self._dictionary.term(index)
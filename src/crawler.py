@@ -0,0 +1,233 @@
+import codecs
+import hashlib
+import mmap
+import os
+from fnmatch import fnmatchcase
+from typing import Iterable, Iterator, NamedTuple
+
+from tokenizer import READ_CHUNK_SIZE
+
+MMAP_THRESHOLD: int = 64 << 20
+ENCODING_ERRORS: list[str] = ["replace", "ignore"]
+
+
+def get_file_extension(filename: str) -> str or None:
+    extension: str = filename.split(".")[-1]
+    if filename == extension:
+        return None
+    return extension
+
+
+class CrawledFile(NamedTuple):
+    path: str  # relative to the root of the crawl
+    size: int
+    mtime_ns: int
+
+
+class CrawlStats:
+    """
+    Counters of the last crawl: directories visited and files yielded, and everything that was left out.
+    """
+
+    def __init__(self) -> None:
+        self.directories: int = 0
+        self.files: int = 0
+        self.other_extensions: int = 0
+        self.excluded: int = 0
+        self.too_large: int = 0
+        self.linked_directories: int = 0
+        self.errors: int = 0
+
+    @property
+    def skipped(self) -> int:
+        return self.other_extensions + self.excluded + self.too_large + self.linked_directories + self.errors
+
+    def __repr__(self) -> str:
+        return ("directories: {}, files: {}, other extensions: {}, excluded: {}, too large: {}, "
+                "linked directories: {}, errors: {}").format(self.directories, self.files, self.other_extensions,
+                                                              self.excluded, self.too_large, self.linked_directories,
+                                                              self.errors)
+
+
+class Crawler:
+    """
+    Walk a directory tree with os.scandir, depth first and in name order, so the same tree always yields its files in
+    the same order (and they get the same doc ids).
+
+    Only files with one of the extensions are yielded. When include patterns are given a file must match one of them,
+    and files or directories matching an exclude pattern are left out, a directory with everything under it. Patterns
+    with a "/" are matched against the path relative to root, the others against the name only, so "*.log" or ".git"
+    match at any depth. Files above max_file_size bytes are left out.
+
+    Symlinks are followed, but a directory is never visited twice: reaching one again through a symlink, which is what
+    a symlink loop does, is counted in the stats and skipped. Entries that cannot be read are counted as errors instead
+    of stopping the crawl.
+    """
+
+    def __init__(self, root: str, extensions: Iterable[str], include: Iterable[str] = (), exclude: Iterable[str] = (),
+                 max_file_size: int or None = None) -> None:
+        if max_file_size is not None and max_file_size < 0:
+            raise ValueError("Expected max_file_size to be a non negative integer.")
+
+        self._root = root
+        self._extensions = set(extensions)
+        self._include = list(include)
+        self._exclude = list(exclude)
+        self._max_file_size = max_file_size
+        self._stats = CrawlStats()
+
+    @property
+    def root(self) -> str:
+        return self._root
+
+    @property
+    def include(self) -> list[str]:
+        return self._include
+
+    @property
+    def exclude(self) -> list[str]:
+        return self._exclude
+
+    @property
+    def max_file_size(self) -> int or None:
+        return self._max_file_size
+
+    @property
+    def stats(self) -> CrawlStats:
+        return self._stats
+
+    def crawl(self) -> Iterator[CrawledFile]:
+        """
+        Raises FileNotFoundError when root does not exist.
+        """
+        self._stats = CrawlStats()
+        root_stat: os.stat_result = os.stat(self.root)
+        visited: set[tuple[int, int]] = {(root_stat.st_dev, root_stat.st_ino)}
+        self._stats.directories += 1
+
+        # entries still to visit, in reverse order so the next one is popped first
+        stack: list[tuple[str, os.DirEntry]] = self._scan("")[::-1]
+        while stack:
+            relative_path, entry = stack.pop()
+            try:
+                if entry.is_dir():
+                    if self._matches(relative_path, entry.name, self._exclude):
+                        self._stats.excluded += 1
+                        continue
+                    stat: os.stat_result = entry.stat()
+                    if (stat.st_dev, stat.st_ino) in visited:
+                        self._stats.linked_directories += 1
+                        continue
+                    visited.add((stat.st_dev, stat.st_ino))
+                    self._stats.directories += 1
+                    stack.extend(self._scan(relative_path)[::-1])
+                elif entry.is_file():
+                    crawled_file: CrawledFile or None = self._accept(relative_path, entry)
+                    if crawled_file is not None:
+                        self._stats.files += 1
+                        yield crawled_file
+            except OSError:
+                self._stats.errors += 1
+
+    def _scan(self, relative_path: str) -> list[tuple[str, os.DirEntry]]:
+        try:
+            with os.scandir(os.path.join(self.root, relative_path)) as entries:
+                return sorted(((os.path.join(relative_path, entry.name), entry) for entry in entries),
+                              key=lambda item: item[1].name)
+        except OSError:
+            self._stats.errors += 1
+            return []
+
+    def _accept(self, relative_path: str, entry: os.DirEntry) -> CrawledFile or None:
+        if get_file_extension(entry.name) not in self._extensions:
+            self._stats.other_extensions += 1
+            return None
+        if (self._include and not self._matches(relative_path, entry.name, self._include)) \
+                or self._matches(relative_path, entry.name, self._exclude):
+            self._stats.excluded += 1
+            return None
+
+        stat: os.stat_result = entry.stat()
+        if self.max_file_size is not None and stat.st_size > self.max_file_size:
+            self._stats.too_large += 1
+            return None
+        return CrawledFile(relative_path, stat.st_size, stat.st_mtime_ns)
+
+    @staticmethod
+    def _matches(relative_path: str, name: str, patterns: list[str]) -> bool:
+        relative_path = relative_path.replace(os.sep, "/")
+        return any(fnmatchcase(relative_path if "/" in pattern else name, pattern) for pattern in patterns)
+
+
+class FileReader:
+    """
+    Decode files into text chunks of about chunk_size bytes, so memory does not depend on the size of the file. Files
+    of mmap_threshold bytes or more are memory mapped instead of read, which saves copying them through a read buffer
+    and lets the kernel drop the pages already decoded.
+
+    Bytes that are not valid in encoding are handled by errors, like in bytes.decode(): with "replace" (the default) or
+    "ignore" the rest of the file is still read. A character split between two chunks is decoded once both are read.
+
+    The bytes read can be fed to a hash object on the way, so hashing the content of a file doesn't take another read.
+    """
+
+    def __init__(self, encoding: str = "utf-8", errors: str = "replace", chunk_size: int = READ_CHUNK_SIZE,
+                 mmap_threshold: int = MMAP_THRESHOLD) -> None:
+        codecs.lookup(encoding)  # raises LookupError on unknown encodings
+        if chunk_size < 1:
+            raise ValueError("Expected chunk_size to be a positive integer.")
+
+        self._encoding = encoding
+        self._errors = errors
+        self._chunk_size = chunk_size
+        self._mmap_threshold = mmap_threshold
+
+    @property
+    def encoding(self) -> str:
+        return self._encoding
+
+    @property
+    def errors(self) -> str:
+        return self._errors
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    @property
+    def mmap_threshold(self) -> int:
+        return self._mmap_threshold
+
+    def iter_chunks(self, file_path: str, content_hash: 'hashlib.blake2b' or None = None) -> Iterator[str]:
+        """
+        content_hash, when given, is updated with every chunk of bytes before it is decoded.
+        """
+        decoder: codecs.IncrementalDecoder = codecs.getincrementaldecoder(self.encoding)(errors=self.errors)
+        with open(file_path, mode="rb") as f:
+            if os.fstat(f.fileno()).st_size >= max(self.mmap_threshold, 1):
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if hasattr(mapped, "madvise"):
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    for start in range(0, len(mapped), self.chunk_size):
+                        chunk: bytes = mapped[start:start + self.chunk_size]
+                        if content_hash is not None:
+                            content_hash.update(chunk)
+                        yield decoder.decode(chunk)
+                        self._release(mapped, start, start + self.chunk_size)
+            else:
+                for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                    if content_hash is not None:
+                        content_hash.update(chunk)
+                    yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+    @staticmethod
+    def _release(mapped: mmap.mmap, start: int, end: int) -> None:
+        """
+        Drop the pages of a decoded chunk from memory: they would count in the resident size of the process until the
+        whole file is read otherwise. Pages shared with the next chunk are kept.
+        """
+        start = start // mmap.PAGESIZE * mmap.PAGESIZE
+        end = min(end, len(mapped)) // mmap.PAGESIZE * mmap.PAGESIZE
+        if end > start and hasattr(mmap, "MADV_DONTNEED"):
+            mapped.madvise(mmap.MADV_DONTNEED, start, end - start)
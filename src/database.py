@@ -1,30 +1,334 @@
+from array import array
+from typing import Iterator
+
+from compact_dictionary import CompactDictionary
+from posting_list import DocId, PositionList, PostingList
+from term_dictionary import TermDictionary, is_wildcard_pattern
+
 DictionaryKey = str
-DictionaryValue = str
-SetDictionaryValue = set[str]
-SetDictionary = dict[DictionaryKey, SetDictionaryValue]
+DictionaryValue = DocId
+PostingDictionary = dict[DictionaryKey, PostingList] or CompactDictionary
+PositionDictionary = dict[DictionaryKey, PositionList]
+
+
+def add_count(counts: array, doc_id: DocId, n: int) -> None:
+    if doc_id >= len(counts):
+        counts.extend(bytes(doc_id + 1 - len(counts)))
+    counts[doc_id] += n
 
 
 class Database:
-    _dictionary: SetDictionary = None
-    
-    def __init__(self) -> None:
+    """
+    In memory posting lists, optionally layered on top of a read-only base index (a MappedIndex loaded from an index
+    file). Postings added in memory are expected to belong to doc ids greater than the ones in the base.
+
+    Along with postings it keeps the length of every document, in tokens, and its number of distinct terms, which is
+    the number of postings it takes, both indexed by doc id. When built with positions,
+    it also records the offset of every token added, which is the length of its document so far: tokens are expected
+    to be added in the order they appear in the document.
+
+    Removing a document only records its doc id as deleted, which is O(1) whatever the size of the document; lookups
+    filter deleted doc ids out, which only costs a re-encoding for the lists holding one of them, and compact() drops
+    them from the in memory posting lists for good. Those of the base can't be rewritten: they are filtered on their
+    first lookup after a removal, and kept filtered in memory until the next one.
+
+    Looking up a pattern with wildcards, like "hel*", returns the union of the postings of the terms matching it (at
+    most max_expansions of them), with their term frequencies added up. Terms are matched against a TermDictionary
+    built on the first such lookup and kept until new terms are added. The same TermDictionary finds the terms a few
+    edits away from a misspelled word, see fuzzy_expand(). Building it is O(terms log terms), so while a directory is
+    being loaded, defer_term_dictionary() keeps it as it is when terms are added, until refresh_term_dictionary().
+
+    Once loaded, intern_terms() moves the terms of the posting lists into a CompactDictionary, which saves the str
+    object of every term. Terms added afterwards are kept as str until the next call. As long as none is, the
+    TermDictionary reads its terms straight from the CompactDictionary, and so does the n-gram index of fuzzy_expand().
+    """
+    DEFAULT_MAX_EXPANSIONS: int = 1024
+
+    _dictionary: PostingDictionary = None
+
+    def __init__(self, base: 'MappedIndex' = None, positions: bool = False,
+                 max_expansions: int = DEFAULT_MAX_EXPANSIONS) -> None:
         self._dictionary = {}
-    
+        self._term_dictionary: TermDictionary or None = None
+        self._term_dictionary_deferred: bool = False
+        self._terms_added: bool = False
+        self._max_expansions = max_expansions
+        self._positions: PositionDictionary or None = {} if positions else None
+        self._base = base
+        self._deleted: set[DocId] = set()
+        self._sorted_deleted: array or None = None
+        self._live_base: dict[DictionaryKey, PostingList or None] = dict()
+        self._document_lengths: array = array('I', base.document_lengths if base is not None else ())
+        self._document_terms: array = array('I', base.document_terms if base is not None else ())
+
     @property
-    def dictionary(self) -> SetDictionary:
+    def dictionary(self) -> PostingDictionary:
         return self._dictionary
 
+    @property
+    def positions(self) -> PositionDictionary or None:
+        return self._positions
+
+    @property
+    def has_positions(self) -> bool:
+        return self._positions is not None
+
+    @property
+    def max_expansions(self) -> int:
+        return self._max_expansions
+
+    @property
+    def term_dictionary(self) -> TermDictionary:
+        if self._term_dictionary is None:
+            if self._base is None and isinstance(self._dictionary, CompactDictionary) \
+                    and self._dictionary.fully_interned:
+                self._term_dictionary = TermDictionary(self._dictionary.interned_terms(), is_sorted=True)
+            else:
+                self._term_dictionary = TermDictionary(self.terms())
+        return self._term_dictionary
+
+    @property
+    def base(self) -> 'MappedIndex' or None:
+        return self._base
+
+    @property
+    def deleted(self) -> set[DocId]:
+        return self._deleted
+
+    @property
+    def document_lengths(self) -> array:
+        return self._document_lengths
+
+    @property
+    def document_terms(self) -> array:
+        return self._document_terms
+
+    def get_document_length(self, doc_id: DocId) -> int:
+        if doc_id >= len(self._document_lengths):
+            return 0
+        return self._document_lengths[doc_id]
+
+    def get_document_terms(self, doc_id: DocId) -> int:
+        if doc_id >= len(self._document_terms):
+            return 0
+        return self._document_terms[doc_id]
+
     def add(self, key: DictionaryKey, val: DictionaryValue) -> None:
-        if not key or not val:
+        if not key or val is None:
             raise ValueError("Expected key and val to be provided.")
-        
+
         if key not in self._dictionary:
-            self._dictionary[key] = SetDictionaryValue((val,))
+            self._dictionary[key] = PostingList((val,))
+            self._add_terms()
+            add_count(self._document_terms, val, 1)
+        elif self._dictionary[key].add(val):
+            add_count(self._document_terms, val, 1)
+        if self._positions is not None:
+            if key not in self._positions:
+                self._positions[key] = PositionList()
+            self._positions[key].add(val, self.get_document_length(val))
+        add_count(self._document_lengths, val, 1)
+
+    def merge(self, other: 'Database') -> None:
+        """
+        Add every posting of other into this Database. Cheapest when other only holds doc ids greater than the ones
+        already stored, as posting lists are then appended to without being decoded.
+        """
+        self._add_terms()
+        for key, postings in other.dictionary.items():
+            if key not in self._dictionary:
+                self._dictionary[key] = postings
+            else:
+                self._dictionary[key].extend(postings)
+
+        if self._positions is not None and other.positions is not None:
+            for key, positions in other.positions.items():
+                if key not in self._positions:
+                    self._positions[key] = positions
+                else:
+                    self._positions[key].extend(positions)
+
+        for counts, other_counts in ((self._document_lengths, other.document_lengths),
+                                     (self._document_terms, other.document_terms)):
+            # partial databases only hold counts for their own doc ids, skip the leading zeros without a python loop
+            other_bytes: bytes = other_counts.tobytes()
+            leading_zeros: int = len(other_bytes) - len(other_bytes.lstrip(b"\x00"))
+            for doc_id in range(leading_zeros // other_counts.itemsize, len(other_counts)):
+                if other_counts[doc_id]:
+                    add_count(counts, doc_id, other_counts[doc_id])
+
+    def intern_terms(self) -> None:
+        """
+        Only rebuilds the CompactDictionary when terms were added or deleted since the last call.
+        """
+        if isinstance(self._dictionary, CompactDictionary) and self._dictionary.fully_interned:
+            return
+        self._dictionary = CompactDictionary(self._dictionary.items())
+        self._term_dictionary, self._terms_added = None, False
+
+    def defer_term_dictionary(self, deferred: bool) -> None:
+        """
+        While deferred, wildcard and fuzzy lookups keep using the TermDictionary built last, without the terms added
+        since, until refresh_term_dictionary(). Undeferring refreshes it.
+        """
+        self._term_dictionary_deferred = deferred
+        if not deferred:
+            self.refresh_term_dictionary()
+
+    def refresh_term_dictionary(self) -> None:
+        """
+        Drop the TermDictionary if terms were added since it was built, the next lookup builds it again.
+        """
+        if self._terms_added:
+            self._term_dictionary, self._terms_added = None, False
+
+    def _add_terms(self) -> None:
+        if self._term_dictionary_deferred:
+            self._terms_added = True
         else:
-            self._dictionary[key].add(val)
-    
-    def find(self, key: str) -> SetDictionaryValue or None:
-        if key not in self.dictionary:
+            self._term_dictionary = None
+
+    def remove(self, doc_id: DocId) -> None:
+        self._deleted.add(doc_id)
+        self._sorted_deleted = None
+        self._live_base.clear()
+
+    def compact(self) -> None:
+        if not self._deleted:
+            return
+
+        for key in list(self._dictionary):
+            postings: PostingList = self._dictionary[key]
+            live_postings: PostingList or None = self._live_postings(postings)
+            if live_postings is None:
+                del self._dictionary[key]
+            elif live_postings is not postings:
+                self._dictionary[key] = live_postings
+
+        if self._positions is not None:
+            for key in list(self._positions):
+                positions: PositionList = self._positions[key].without(self._deleted)
+                if len(positions):
+                    self._positions[key] = positions
+                else:
+                    del self._positions[key]
+
+        if self._base is None:
+            for doc_id in self._deleted:
+                for counts in (self._document_lengths, self._document_terms):
+                    if doc_id < len(counts):
+                        counts[doc_id] = 0
+            self._deleted.clear()
+            self._sorted_deleted = None
+
+    def find(self, key: str) -> PostingList or None:
+        if is_wildcard_pattern(key):
+            return self._find_pattern(key)
+        return self._find_live(key)
+
+    def expand(self, pattern: str) -> list[DictionaryKey]:
+        return self.term_dictionary.expand(pattern, self._max_expansions)
+
+    def prepare_fuzzy_expand(self) -> None:
+        """
+        Build the index of fuzzy_expand() now, instead of on its first call.
+        """
+        _ = self.term_dictionary.ngram_index
+
+    def fuzzy_expand(self, word: str, max_distance: int, deadline: float or None = None) -> tuple[dict[str, int], bool]:
+        """
+        Word and the terms at most max_distance edits away from it, mapped to their distance: the closest
+        max_expansions of them. Returns them along with whether the lookup completed before deadline (a
+        time.perf_counter() value), past which only the terms found so far are returned.
+        """
+        expansion: dict[str, int] = {word: 0}
+        if max_distance <= 0 or is_wildcard_pattern(word):
+            return expansion, True
+
+        matches, complete = self.term_dictionary.ngram_index.similar(word, max_distance, self._max_expansions, deadline)
+        expansion.update((term, distance) for term, distance in matches if term != word)
+        return expansion, complete
+
+    def _find_pattern(self, pattern: str) -> PostingList or None:
+        term_frequencies: dict[DocId, int] = dict()
+        for key in self.expand(pattern):
+            postings: PostingList or None = self._find_live(key)
+            if postings is None:
+                continue
+            for doc_id, tf in postings.items():
+                term_frequencies[doc_id] = term_frequencies.get(doc_id, 0) + tf
+
+        if not term_frequencies:
+            return None
+        return PostingList.from_items((doc_id, term_frequencies[doc_id]) for doc_id in sorted(term_frequencies))
+
+    def _find_live(self, key: str) -> PostingList or None:
+        postings: PostingList or None = self._live_postings(self._dictionary.get(key))
+        if self._base is None:
+            return postings
+
+        base_postings: PostingList or None = self._find_live_base(key)
+        if postings is None:
+            return base_postings
+        if base_postings is None:
+            return postings
+
+        base_postings.extend(postings)
+        return base_postings
+
+    def _find_live_base(self, key: str) -> PostingList or None:
+        """
+        A copy of the postings of key in the base, callers extend it. Lists holding a deleted doc id are only filtered
+        once after a removal.
+        """
+        if key in self._live_base:
+            live_postings: PostingList or None = self._live_base[key]
+            return None if live_postings is None else live_postings.copy()
+
+        postings: PostingList or None = self._base.find(key)
+        live_postings = self._live_postings(postings)
+        if live_postings is not postings:
+            self._live_base[key] = live_postings
+            return None if live_postings is None else live_postings.copy()
+        return postings
+
+    def _live_postings(self, postings: PostingList or None) -> PostingList or None:
+        if postings is None or not self._deleted:
+            return postings
+
+        if self._sorted_deleted is None:
+            self._sorted_deleted = array('I', sorted(self._deleted))
+        live_postings: PostingList = postings.without(self._sorted_deleted)
+        return live_postings if len(live_postings) else None
+
+    def find_positions(self, key: str) -> PositionList or None:
+        """
+        Positions of key in every document containing it, deleted documents included. None if there are no positions
+        for key, or the Database was built without them.
+        """
+        if self._positions is None:
             return None
-        
-        return self.dictionary[key]
+        if self._base is None:
+            return self._positions.get(key)
+
+        base_positions: PositionList or None = self._base.find_positions(key)
+        if key not in self._positions:
+            return base_positions
+        if base_positions is None:
+            return self._positions[key]
+
+        base_positions.extend(self._positions[key])
+        return base_positions
+
+    def terms(self) -> Iterator[DictionaryKey]:
+        if self._base is None:
+            return iter(self._dictionary)
+
+        return iter(set(self._base.terms()).union(self._dictionary))
+
+    def find_doc_ids(self, key: str) -> Iterator[DocId]:
+        postings: PostingList or None = self.find(key)
+        if postings is None:
+            return iter(())
+
+        return iter(postings)
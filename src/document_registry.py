@@ -0,0 +1,216 @@
+import hashlib
+import os
+from typing import Iterable, Iterator, NamedTuple
+
+from posting_list import DocId
+
+HASH_CHUNK_SIZE: int = 1 << 20
+
+
+class FileMetadata(NamedTuple):
+    mtime_ns: int
+    size: int
+    content_hash: bytes or None = None
+
+    @classmethod
+    def from_file(cls, file_path: str, with_content_hash: bool = False) -> 'FileMetadata':
+        stat: os.stat_result = os.stat(file_path)
+        content_hash: bytes or None = cls.hash_file(file_path) if with_content_hash else None
+        return cls(stat.st_mtime_ns, stat.st_size, content_hash)
+
+    @staticmethod
+    def content_hasher() -> 'hashlib.blake2b':
+        """
+        Hash object giving the content_hash of the bytes it is updated with, e.g. by FileReader.iter_chunks().
+        """
+        return hashlib.blake2b(digest_size=16)
+
+    @classmethod
+    def hash_file(cls, file_path: str) -> bytes:
+        content_hash = cls.content_hasher()
+        with open(file_path, mode="rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                content_hash.update(chunk)
+        return content_hash.digest()
+
+
+class DocumentRegistry:
+    """
+    Bidirectional mapping between filenames and the integer doc ids stored in the Database posting lists, along with
+    the FileMetadata of each file when it was indexed.
+    Doc ids are assigned sequentially in registration order and never reused: removing a file leaves a hole at its doc
+    id, and a modified file is registered again with a new one.
+
+    Files with the same content can share a doc id: the first one registered owns it, and the others are added as its
+    duplicates, found through the content hash of its metadata. A shared doc id stays in use until all of its files are
+    removed, the oldest remaining duplicate taking over when its owner is. Only files of the same size can have the
+    same content: has_size() tells the files worth hashing before deciding whether to index them.
+    """
+
+    def __init__(self, filenames: Iterable[str or None] = (),
+                 metadata: Iterable[FileMetadata or None] or None = None,
+                 duplicates: Iterable[tuple[DocId, str, FileMetadata or None]] = ()) -> None:
+        self._filenames: list[str or None] = list()
+        self._metadata: list[FileMetadata or None] = list()
+        self._doc_ids: dict[str, DocId] = dict()
+        self._duplicates: dict[DocId, dict[str, FileMetadata or None]] = dict()
+        self._content_doc_ids: dict[bytes, DocId] = dict()
+        self._sizes: set[int] = set()
+        filenames = list(filenames)
+        metadata = list(metadata) if metadata is not None else len(filenames) * [None]
+        for filename, file_metadata in zip(filenames, metadata):
+            if filename:
+                self.register(filename, file_metadata)
+            else:
+                self._filenames.append(None)
+                self._metadata.append(None)
+        for doc_id, filename, file_metadata in duplicates:
+            self.add_duplicate(doc_id, filename, file_metadata)
+
+    @property
+    def filenames(self) -> list[str]:
+        """
+        Every filename, in doc id order, duplicates right after the file owning their doc id.
+        """
+        return [filename for _, filename in self.items()]
+
+    @property
+    def next_doc_id(self) -> DocId:
+        return len(self._filenames)
+
+    def register(self, filename: str, metadata: FileMetadata or None = None) -> DocId:
+        if not filename:
+            raise ValueError("Expected filename to be provided.")
+
+        if filename in self._doc_ids:
+            return self._doc_ids[filename]
+
+        doc_id: DocId = len(self._filenames)
+        self._filenames.append(filename)
+        self._metadata.append(metadata)
+        self._doc_ids[filename] = doc_id
+        self._add_content(doc_id, metadata)
+        return doc_id
+
+    def _add_content(self, doc_id: DocId, metadata: FileMetadata or None) -> None:
+        if metadata is None:
+            return
+        self._sizes.add(metadata.size)
+        if metadata.content_hash is not None:
+            self._content_doc_ids.setdefault(metadata.content_hash, doc_id)
+
+    def has_size(self, size: int) -> bool:
+        """
+        Whether a file of that size was ever registered: sizes of removed files are not forgotten.
+        """
+        return size in self._sizes
+
+    def find_content(self, content_hash: bytes or None) -> DocId or None:
+        """
+        Doc id of a registered file with that content hash, if any.
+        """
+        return self._content_doc_ids.get(content_hash) if content_hash is not None else None
+
+    def add_duplicate(self, doc_id: DocId, filename: str, metadata: FileMetadata or None = None) -> None:
+        """
+        Register filename under the doc id of a file with the same content, which is not indexed again.
+        """
+        if not filename:
+            raise ValueError("Expected filename to be provided.")
+        if doc_id >= len(self._filenames) or self._filenames[doc_id] is None:
+            raise ValueError("Unknown doc id: {}".format(doc_id))
+        if filename in self._doc_ids:
+            raise ValueError("File already registered: {}".format(filename))
+
+        self._duplicates.setdefault(doc_id, dict())[filename] = metadata
+        self._doc_ids[filename] = doc_id
+        if metadata is not None:
+            self._sizes.add(metadata.size)
+
+    def remove(self, filename: str) -> DocId or None:
+        """
+        Returns the doc id of filename once no other file shares it, which is when it should be deleted from the
+        Database, and None while some do.
+        """
+        doc_id: DocId = self._doc_ids.pop(filename)
+        duplicates: dict[str, FileMetadata or None] = self._duplicates.get(doc_id, {})
+        if filename in duplicates:
+            del duplicates[filename]
+        elif duplicates:
+            # the oldest duplicate becomes the owner of the doc id
+            owner: str = next(iter(duplicates))
+            self._filenames[doc_id], self._metadata[doc_id] = owner, duplicates.pop(owner)
+        else:
+            metadata: FileMetadata or None = self._metadata[doc_id]
+            if metadata is not None and self._content_doc_ids.get(metadata.content_hash) == doc_id:
+                del self._content_doc_ids[metadata.content_hash]
+            self._filenames[doc_id] = None
+            self._metadata[doc_id] = None
+            return doc_id
+
+        if not duplicates:
+            del self._duplicates[doc_id]
+        return None
+
+    def update_metadata(self, filename: str, metadata: FileMetadata) -> None:
+        """
+        The content hash of a file owning its doc id can be given here once it is indexed.
+        """
+        doc_id: DocId = self._doc_ids[filename]
+        if filename in self._duplicates.get(doc_id, {}):
+            self._duplicates[doc_id][filename] = metadata
+        else:
+            self._metadata[doc_id] = metadata
+            self._add_content(doc_id, metadata)
+
+    def get_doc_id(self, filename: str) -> DocId or None:
+        return self._doc_ids.get(filename)
+
+    def get_filename(self, doc_id: DocId) -> str or None:
+        return self._filenames[doc_id]
+
+    def get_filenames(self, doc_id: DocId) -> list[str]:
+        """
+        Every file of doc id: the file owning it, then its duplicates.
+        """
+        if self._filenames[doc_id] is None:
+            return []
+        return [self._filenames[doc_id]] + list(self._duplicates.get(doc_id, ()))
+
+    def get_metadata(self, filename: str) -> FileMetadata or None:
+        doc_id: DocId or None = self._doc_ids.get(filename)
+        if doc_id is None:
+            return None
+        if filename in self._duplicates.get(doc_id, {}):
+            return self._duplicates[doc_id][filename]
+        return self._metadata[doc_id]
+
+    def slots(self) -> Iterator[tuple[str or None, FileMetadata or None]]:
+        """
+        Every doc id in order, removed ones included as (None, None), which is what an index file stores.
+        """
+        return zip(self._filenames, self._metadata)
+
+    def duplicates(self) -> Iterator[tuple[DocId, str, FileMetadata or None]]:
+        return ((doc_id, filename, metadata) for doc_id in sorted(self._duplicates)
+                for filename, metadata in self._duplicates[doc_id].items())
+
+    def doc_ids(self) -> Iterator[DocId]:
+        return (doc_id for doc_id, filename in enumerate(self._filenames) if filename is not None)
+
+    def items(self) -> Iterator[tuple[DocId, str]]:
+        """
+        (doc id, filename) of every file, so a shared doc id comes once per file sharing it.
+        """
+        for doc_id in self.doc_ids():
+            for filename in self.get_filenames(doc_id):
+                yield doc_id, filename
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self._doc_ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.filenames)
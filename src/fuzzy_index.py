@@ -0,0 +1,124 @@
+import time
+from array import array
+from collections.abc import Sequence
+from typing import Iterable
+
+import numpy as np
+
+GRAM_SIZE: int = 2
+PADDING: str = "\0"
+VERIFY_BLOCK: int = 4096
+# edits allowed by the length of the term, like "AUTO" fuzziness in Lucene: words up to 2 characters are matched
+# exactly, up to 5 characters with 1 edit, longer ones with 2
+EDITS_BY_LENGTH: list[tuple[int, int]] = [(6, 2), (3, 1)]
+
+
+def max_edits(term: str, limit: int) -> int:
+    for length, edits in EDITS_BY_LENGTH:
+        if len(term) >= length:
+            return min(edits, limit)
+    return 0
+
+
+def ngrams(term: str, n: int = GRAM_SIZE) -> set[str]:
+    """
+    Distinct substrings of n characters of term, padded so the first and last characters count as much as the others:
+    "ride" gives "\0r", "ri", "id", "de" and "e\0" with bigrams.
+    """
+    padded: str = PADDING * (n - 1) + term + PADDING * (n - 1)
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def bounded_levenshtein(word: str, terms: list[str], max_distance: int) -> np.ndarray:
+    """
+    Levenshtein distance between word and every term, max_distance + 1 for the terms further away than max_distance.
+
+    Terms are compared all at once, as rows of a matrix of code points, filling the dynamic programming table one
+    character of word at a time: substitutions and deletions come from the previous row, and insertions, which chain
+    along the row, are a running minimum of (distance - column) across it. Distances in a row never go below the
+    lowest one of the row before, so the computation stops as soon as every term is above the bound.
+    """
+    above: int = max_distance + 1
+    if not terms:
+        return np.zeros(0, dtype=np.int64)
+
+    width: int = max(len(term) for term in terms)
+    code_points: np.ndarray = np.frombuffer("".join(term.ljust(width, PADDING) for term in terms).encode("utf-32-le"),
+                                            dtype=np.uint32).reshape(len(terms), width)
+    lengths: np.ndarray = np.fromiter((len(term) for term in terms), dtype=np.int64, count=len(terms))
+    columns: np.ndarray = np.arange(width + 1)
+    previous: np.ndarray = np.tile(columns, (len(terms), 1))
+    current: np.ndarray = np.empty_like(previous)
+    for i, character in enumerate(word, start=1):
+        current[:, 0] = i
+        np.minimum(previous[:, :-1] + (code_points != ord(character)), previous[:, 1:] + 1, out=current[:, 1:])
+        current = np.minimum.accumulate(current - columns, axis=1) + columns
+        if current.min() > max_distance:
+            return np.full(len(terms), above)
+        previous, current = current, previous
+
+    return np.minimum(previous[np.arange(len(terms)), lengths], above)
+
+
+class NGramIndex:
+    """
+    Inverted index from the character n-grams of a list of terms to the ids (positions in the list) of the terms
+    containing them, to find the terms within an edit distance of a word without computing its distance to every term.
+
+    An edit changes at most n of the n-grams of a word, so a term at most k edits away from it shares all its n-grams
+    but n * k of them at most (the count filter), and has a length within k of its own (the length filter). Only the
+    terms passing both filters have their distance computed, by bounded_levenshtein, in blocks of VERIFY_BLOCK terms
+    between which the deadline is checked. Words too short to share any n-gram after k edits fall back to comparing
+    every term of a close enough length.
+
+    n-grams shared with every term are counted at once by np.bincount over the concatenated posting lists of the
+    n-grams of the word, so the filters cost O(postings) in numpy rather than in Python.
+    """
+
+    def __init__(self, terms: Iterable[str], n: int = GRAM_SIZE) -> None:
+        self._terms: Sequence[str] = terms if isinstance(terms, Sequence) else list(terms)
+        self._n = n
+        self._postings: dict[str, array] = dict()
+        for term_id, term in enumerate(self._terms):
+            for gram in ngrams(term, n):
+                self._postings.setdefault(gram, array('I')).append(term_id)
+        self._lengths: np.ndarray = np.fromiter((len(term) for term in self._terms), dtype=np.int64,
+                                                count=len(self._terms))
+
+    @property
+    def n(self) -> int:
+        return self._n
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def similar(self, word: str, max_distance: int, limit: int or None = None,
+                deadline: float or None = None) -> tuple[list[tuple[str, int]], bool]:
+        """
+        Terms at most max_distance edits away from word, as (term, distance) sorted by distance then term, at most
+        limit of them. Stops looking once time.perf_counter() reaches deadline. Returns the terms found, and whether
+        the search was complete.
+        """
+        grams: set[str] = ngrams(word, self._n)
+        min_shared: int = len(grams) - self._n * max_distance
+        accepted: np.ndarray = np.abs(self._lengths - len(word)) <= max_distance
+        if min_shared > 0:
+            postings: list[np.ndarray] = [np.frombuffer(self._postings[gram], dtype=np.uint32) for gram in grams
+                                          if gram in self._postings]
+            shared: np.ndarray = np.bincount(np.concatenate(postings), minlength=len(self._terms)) if postings \
+                else np.zeros(len(self._terms), dtype=np.int64)
+            accepted &= shared >= min_shared
+        candidates: list[int] = np.flatnonzero(accepted).tolist()
+
+        matches: list[tuple[str, int]] = list()
+        for start in range(0, len(candidates), VERIFY_BLOCK):
+            if deadline is not None and time.perf_counter() >= deadline:
+                matches.sort(key=lambda match: (match[1], match[0]))
+                return matches[:limit], False
+            terms: list[str] = [self._terms[term_id] for term_id in candidates[start:start + VERIFY_BLOCK]]
+            distances: np.ndarray = bounded_levenshtein(word, terms, max_distance)
+            matches.extend((terms[position], int(distances[position]))
+                           for position in np.flatnonzero(distances <= max_distance))
+
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches[:limit], True
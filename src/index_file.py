@@ -0,0 +1,380 @@
+"""
+Binary layout of an index file, all integers little endian:
+
+    header      magic (8 bytes), version, flags, n_files, n_terms (uint32), then the offsets of the files, document
+                lengths, terms, term table, postings and positions sections (uint64). The only flag is HAS_POSITIONS
+    files       indexed path followed by every filename in doc id order, each one as uint32 length + utf-8 bytes,
+                and the metadata of each file: mtime in ns, size and content hash (all zeros when unknown). Removed
+                documents are stored as empty filenames so doc ids don't change. Then the number of duplicates
+                (uint32), files sharing the doc id of a file with the same content, each one as its doc id (uint32),
+                filename and metadata
+    lengths     length in tokens of every document, in doc id order, then its number of distinct terms (uint32)
+    terms       utf-8 bytes of every term, sorted, without separators
+    term table  one fixed size entry per term, in the same order: term offset and length, postings offset and length,
+                number of postings, last doc id, highest term frequency, number of skip pointers, and positions
+                offset and length (0 when the index has no positions)
+    postings    varbyte encoded (doc id gap, term frequency) pairs, as stored by PostingList, each list followed by
+                its skip pointers: their doc ids, offsets and positions (uint32)
+    positions   for every term, as stored by PositionList: one doc id and one buffer offset per posting (uint32),
+                followed by the varbyte encoded position gaps
+
+The term table is what makes lazy lookups possible: it is binary searched straight from the memory map, and only the
+postings of the terms being queried are ever copied out of it. Opening a file checks that every section, and every
+range the term table points to, lies within the file, so a truncated or corrupt index fails with an IndexFileError.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Iterator
+
+import numpy as np
+
+from database import Database
+from document_registry import DocumentRegistry, FileMetadata
+from posting_list import DocId, PositionList, PostingList
+
+MAGIC: bytes = b"SSINDEX\x00"
+VERSION: int = 6
+HEADER: struct.Struct = struct.Struct("<8sIIII6Q")
+TERM_ENTRY: struct.Struct = struct.Struct("<QIQIIIIIQI")
+HAS_POSITIONS: int = 1
+LENGTH: struct.Struct = struct.Struct("<I")
+FILE_METADATA: struct.Struct = struct.Struct("<qQ16s")
+NO_CONTENT_HASH: bytes = bytes(16)
+NO_DOC_ID: int = 0xFFFFFFFF
+# TERM_ENTRY as a packed numpy record, to check the whole term table at once
+TERM_ENTRY_DTYPE: np.dtype = np.dtype([("term_offset", "<u8"), ("term_length", "<u4"), ("postings_offset", "<u8"),
+                                       ("postings_length", "<u4"), ("count", "<u4"), ("last", "<u4"),
+                                       ("max_tf", "<u4"), ("n_skips", "<u4"), ("positions_offset", "<u8"),
+                                       ("positions_length", "<u4")])
+
+
+class IndexFileError(Exception):
+    def __init__(self, filename: str, reason: str) -> None:
+        self.message = "Could not open index file {}: {}".format(filename, reason)
+        super().__init__(self.message)
+
+
+def encode_name(name: str) -> bytes:
+    encoded_name: bytes = name.encode("utf-8")
+    return LENGTH.pack(len(encoded_name)) + encoded_name
+
+
+def encode_metadata(metadata: FileMetadata or None) -> bytes:
+    if metadata is None:
+        return FILE_METADATA.pack(-1, 0, NO_CONTENT_HASH)
+    return FILE_METADATA.pack(metadata.mtime_ns, metadata.size, metadata.content_hash or NO_CONTENT_HASH)
+
+
+def to_little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_index_file(filename: str, path: str, document_registry: DocumentRegistry, database: Database) -> None:
+    """
+    Serialize a Database into filename. It is written to a temporary file first and then moved, so a reader never sees
+    a half written index.
+    """
+    files_section: bytearray = bytearray(encode_name(path))
+    removed: set[DocId] = set(database.deleted)
+    n_files: int = 0
+    for name, metadata in document_registry.slots():
+        files_section += encode_name(name or "") + encode_metadata(metadata)
+        if name is None:
+            removed.add(n_files)
+        n_files += 1
+    duplicates: list[tuple[DocId, str, FileMetadata or None]] = list(document_registry.duplicates())
+    files_section += LENGTH.pack(len(duplicates))
+    for doc_id, name, metadata in duplicates:
+        files_section += LENGTH.pack(doc_id) + encode_name(name) + encode_metadata(metadata)
+
+    # removed documents are written with no length, as a reopened Database starts without deleted doc ids
+    lengths_section: array = array('I')
+    for counts in (database.document_lengths, database.document_terms):
+        section_counts: array = counts[:n_files]
+        section_counts.extend(bytes(n_files - len(section_counts)))
+        for doc_id in removed:
+            if doc_id < n_files:
+                section_counts[doc_id] = 0
+        lengths_section.extend(section_counts)
+
+    terms_section: bytearray = bytearray()
+    term_table: bytearray = bytearray()
+    postings_section: bytearray = bytearray()
+    positions_section: bytearray = bytearray()
+    n_terms: int = 0
+    for term in sorted(database.terms()):
+        postings: PostingList or None = database.find(term)
+        if postings is None:
+            continue
+
+        n_terms += 1
+        encoded_term: bytes = term.encode("utf-8")
+        last: DocId = NO_DOC_ID if postings.last is None else postings.last
+        skips: tuple[array, array, array] = postings.skips or (array('I'), array('I'), array('I'))
+        positions_offset: int = len(positions_section)
+        positions: PositionList or None = database.find_positions(term)
+        if positions is not None:
+            positions = positions.without(database.deleted)
+            positions_section += to_little_endian(positions.doc_ids)
+            positions_section += to_little_endian(positions.offsets)
+            positions_section += positions.buffer
+        term_table += TERM_ENTRY.pack(len(terms_section), len(encoded_term), len(postings_section),
+                                      len(postings.buffer), len(postings), last, postings.max_tf, len(skips[0]),
+                                      positions_offset, len(positions_section) - positions_offset)
+        terms_section += encoded_term
+        postings_section += postings.buffer
+        for skip_values in skips:
+            postings_section += to_little_endian(skip_values)
+
+    files_offset: int = HEADER.size
+    lengths_offset: int = files_offset + len(files_section)
+    terms_offset: int = lengths_offset + len(lengths_section) * lengths_section.itemsize
+    term_table_offset: int = terms_offset + len(terms_section)
+    postings_offset: int = term_table_offset + len(term_table)
+    positions_offset: int = postings_offset + len(postings_section)
+    flags: int = HAS_POSITIONS if database.has_positions else 0
+
+    temporary_filename: str = "{}.tmp".format(filename)
+    with open(temporary_filename, mode="wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, flags, n_files, n_terms, files_offset, lengths_offset, terms_offset,
+                            term_table_offset, postings_offset, positions_offset))
+        f.write(files_section)
+        f.write(to_little_endian(lengths_section))
+        f.write(terms_section)
+        f.write(term_table)
+        f.write(postings_section)
+        f.write(positions_section)
+    os.replace(temporary_filename, filename)
+
+
+class MappedIndex:
+    """
+    Read-only view over an index file written by write_index_file. Opening it only parses the header and the file list;
+    terms are looked up on demand by binary search over the memory mapped term table.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self._filename = filename
+        with open(filename, mode="rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise IndexFileError(filename, "file is empty")
+
+        try:
+            self._open(filename)
+        except (struct.error, UnicodeDecodeError) as e:
+            self._mmap.close()
+            raise IndexFileError(filename, "file is corrupt ({})".format(e))
+        except IndexFileError:
+            self._mmap.close()
+            raise
+
+    def _open(self, filename: str) -> None:
+        if len(self._mmap) < HEADER.size:
+            raise IndexFileError(filename, "file is truncated")
+
+        magic, version, flags, n_files, n_terms, files_offset, lengths_offset, terms_offset, term_table_offset, \
+            postings_offset, positions_offset = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise IndexFileError(filename, "not an index file")
+        if version != VERSION:
+            raise IndexFileError(filename, "unsupported version {}, expected {}".format(version, VERSION))
+        if not HEADER.size <= files_offset <= lengths_offset <= terms_offset <= term_table_offset <= postings_offset \
+                <= positions_offset <= len(self._mmap):
+            raise IndexFileError(filename, "file is truncated")
+        if terms_offset - lengths_offset != 2 * n_files * LENGTH.size \
+                or postings_offset - term_table_offset != n_terms * TERM_ENTRY.size:
+            raise IndexFileError(filename, "file is corrupt (section sizes don't match the header)")
+
+        self._n_terms = n_terms
+        self._has_positions = bool(flags & HAS_POSITIONS)
+        self._terms_offset = terms_offset
+        self._term_table_offset = term_table_offset
+        self._postings_offset = postings_offset
+        self._positions_offset = positions_offset
+
+        self._files_end = lengths_offset
+        self._path, offset = self._read_name(files_offset)
+        self._filenames: list[str or None] = list()
+        self._metadata: list[FileMetadata or None] = list()
+        for _ in range(n_files):
+            name, offset = self._read_name(offset)
+            metadata, offset = self._read_metadata(offset)
+            self._filenames.append(name or None)
+            self._metadata.append(metadata)
+
+        self._duplicates: list[tuple[DocId, str, FileMetadata or None]] = list()
+        (n_duplicates,) = self._read_files_section(LENGTH, offset)
+        offset += LENGTH.size
+        for _ in range(n_duplicates):
+            (doc_id,) = self._read_files_section(LENGTH, offset)
+            name, offset = self._read_name(offset + LENGTH.size)
+            metadata, offset = self._read_metadata(offset)
+            self._duplicates.append((doc_id, name, metadata))
+
+        # raised here rather than in _term_table_error, whose arrays must be gone for the mmap to be closed
+        error: str or None = self._term_table_error()
+        if error is not None:
+            raise IndexFileError(filename, "file is corrupt ({})".format(error))
+        counts: memoryview = memoryview(self._mmap)[lengths_offset:terms_offset].cast("I")
+        self._document_lengths = counts[:n_files]
+        self._document_terms = counts[n_files:]
+        counts.release()
+
+    def _term_table_error(self) -> str or None:
+        """
+        Every term, postings list and positions list the term table points to must lie within its section, and terms
+        must be contiguous, valid utf-8 and start on a character, so that each one decodes on its own. Returns the
+        section breaking these rules, if any.
+        """
+        terms_length: int = self._term_table_offset - self._terms_offset
+        try:
+            self._mmap[self._terms_offset:self._term_table_offset].decode("utf-8")
+        except UnicodeDecodeError:
+            return "terms section"
+
+        entries: np.ndarray = np.frombuffer(self._mmap, dtype=TERM_ENTRY_DTYPE, count=self._n_terms,
+                                            offset=self._term_table_offset)
+        term_offsets: np.ndarray = entries["term_offset"]
+        term_ends: np.ndarray = term_offsets + entries["term_length"]
+        terms: np.ndarray = np.frombuffer(self._mmap, dtype=np.uint8, count=terms_length, offset=self._terms_offset)
+        if self._n_terms and (term_offsets[0] != 0 or term_ends[-1] != terms_length
+                              or np.any(term_offsets[1:] != term_ends[:-1])
+                              or np.any(terms[term_offsets[term_offsets < terms_length]] & 0xC0 == 0x80)):
+            return "term table"
+
+        postings_ends: np.ndarray = entries["postings_offset"] + entries["postings_length"] \
+            + entries["n_skips"].astype(np.uint64) * (3 * LENGTH.size)
+        if np.any(postings_ends > self._positions_offset - self._postings_offset):
+            return "postings section"
+        if self._has_positions:
+            positions_ends: np.ndarray = entries["positions_offset"] + entries["positions_length"]
+            if np.any(positions_ends > len(self._mmap) - self._positions_offset) \
+                    or np.any(entries["count"].astype(np.uint64) * (2 * LENGTH.size) > entries["positions_length"]):
+                return "positions section"
+        return None
+
+    def _read_files_section(self, structure: struct.Struct, offset: int) -> tuple:
+        if offset + structure.size > self._files_end:
+            raise struct.error("files section ends at {}, reading {} bytes at {}".format(self._files_end,
+                                                                                         structure.size, offset))
+        return structure.unpack_from(self._mmap, offset)
+
+    def _read_name(self, offset: int) -> tuple[str, int]:
+        (length,) = self._read_files_section(LENGTH, offset)
+        offset += LENGTH.size
+        if offset + length > self._files_end:
+            raise struct.error("name of {} bytes at {} goes past the files section".format(length, offset))
+        return self._mmap[offset:offset + length].decode("utf-8"), offset + length
+
+    def _read_metadata(self, offset: int) -> tuple[FileMetadata or None, int]:
+        mtime_ns, size, content_hash = self._read_files_section(FILE_METADATA, offset)
+        if content_hash == NO_CONTENT_HASH:
+            content_hash = None
+        return None if mtime_ns < 0 else FileMetadata(mtime_ns, size, content_hash), offset + FILE_METADATA.size
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def filenames(self) -> list[str or None]:
+        return self._filenames
+
+    @property
+    def document_lengths(self) -> memoryview:
+        return self._document_lengths
+
+    @property
+    def document_terms(self) -> memoryview:
+        return self._document_terms
+
+    @property
+    def duplicates(self) -> list[tuple[DocId, str, FileMetadata or None]]:
+        return self._duplicates
+
+    @property
+    def has_positions(self) -> bool:
+        return self._has_positions
+
+    @property
+    def metadata(self) -> list[FileMetadata or None]:
+        return self._metadata
+
+    def __len__(self) -> int:
+        return self._n_terms
+
+    def _entry(self, position: int) -> tuple[int, ...]:
+        return TERM_ENTRY.unpack_from(self._mmap, self._term_table_offset + position * TERM_ENTRY.size)
+
+    def _term(self, entry: tuple[int, ...]) -> bytes:
+        start: int = self._terms_offset + entry[0]
+        return self._mmap[start:start + entry[1]]
+
+    def find(self, term: str) -> PostingList or None:
+        entry: tuple[int, ...] or None = self._find_entry(term)
+        return None if entry is None else self._postings(entry)
+
+    def find_positions(self, term: str) -> PositionList or None:
+        entry: tuple[int, ...] or None = self._find_entry(term) if self._has_positions else None
+        return None if entry is None else self._positions(entry)
+
+    def _find_entry(self, term: str) -> tuple[int, ...] or None:
+        encoded_term: bytes = term.encode("utf-8")
+        low, high = 0, self._n_terms
+        while low < high:
+            middle: int = (low + high) // 2
+            entry = self._entry(middle)
+            current_term: bytes = self._term(entry)
+            if current_term < encoded_term:
+                low = middle + 1
+            elif current_term > encoded_term:
+                high = middle
+            else:
+                return entry
+
+        return None
+
+    def _postings(self, entry: tuple[int, ...]) -> PostingList:
+        _, _, postings_offset, postings_length, count, last, max_tf, n_skips, _, _ = entry
+        start: int = self._postings_offset + postings_offset
+        skips: tuple[array, array, array] or None = None
+        if n_skips:
+            skips_start: int = start + postings_length
+            skips = tuple(array('I', self._mmap[skips_start + i * n_skips * 4:skips_start + (i + 1) * n_skips * 4])
+                          for i in range(3))
+            if sys.byteorder == "big":
+                for skip_values in skips:
+                    skip_values.byteswap()
+        return PostingList.from_encoded(self._mmap[start:start + postings_length], count,
+                                        None if last == NO_DOC_ID else last, max_tf, skips)
+
+    def _positions(self, entry: tuple[int, ...]) -> PositionList:
+        count, positions_offset, positions_length = entry[4], entry[8], entry[9]
+        start: int = self._positions_offset + positions_offset
+        doc_ids: array = array('I', self._mmap[start:start + count * 4])
+        offsets: array = array('I', self._mmap[start + count * 4:start + count * 8])
+        if sys.byteorder == "big":
+            doc_ids.byteswap()
+            offsets.byteswap()
+        return PositionList.from_encoded(doc_ids, offsets, self._mmap[start + count * 8:start + positions_length])
+
+    def terms(self) -> Iterator[str]:
+        for position in range(self._n_terms):
+            yield self._term(self._entry(position)).decode("utf-8")
+
+    def close(self) -> None:
+        self._document_lengths.release()
+        self._document_terms.release()
+        self._mmap.close()
@@ -0,0 +1,178 @@
+import functools
+import threading
+import time
+import tracemalloc
+from typing import Callable, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+MIN_BUCKET_SECONDS: float = 1e-6
+N_BUCKETS: int = 32  # the last bucket is above 2^30 us, about 18 minutes
+
+
+class LatencyHistogram:
+    """
+    Latencies of one stage in buckets doubling in width, starting at 1 us: bucket i counts the latencies between
+    2^(i-1) and 2^i microseconds. Recording is O(1) and the memory used does not grow with the number of calls;
+    percentiles are the upper bound of the bucket they fall in, so they are at most 2x the exact value.
+    """
+
+    def __init__(self) -> None:
+        self.buckets: list[int] = [0] * N_BUCKETS
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        bucket: int = min(int(seconds / MIN_BUCKET_SECONDS).bit_length(), N_BUCKETS - 1)
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """
+        In seconds, like the recorded latencies.
+        """
+        if not self.count:
+            return 0.0
+        rank: float = self.count * percentile / 100
+        seen: int = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if bucket_count and seen >= rank:
+                return min((1 << bucket) * MIN_BUCKET_SECONDS, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {"count": self.count, "total_ms": self.total * 1000, "mean_ms": self.mean * 1000,
+                "p50_ms": self.percentile(50) * 1000, "p99_ms": self.percentile(99) * 1000, "max_ms": self.max * 1000}
+
+    def __repr__(self) -> str:
+        return "calls: {}, total: {:.3f} ms, mean: {:.3f} ms, p50: {:.3f} ms, p99: {:.3f} ms, max: {:.3f} ms".format(
+            self.count, self.total * 1000, self.mean * 1000, self.percentile(50) * 1000, self.percentile(99) * 1000,
+            self.max * 1000)
+
+
+class Instrumentation:
+    """
+    Cumulative counters and a LatencyHistogram per stage of indexing and searching, plus optional tracemalloc snapshots
+    of the memory allocated by the index.
+
+    It is disabled by default: a stage decorated with timed() then only costs one attribute check per call, and nothing
+    is recorded. It is shared by the threads of the process, so recording takes a lock; worker processes record in
+    their own copy, which is not merged back.
+    """
+    TOP_ALLOCATIONS: int = 10
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled: bool = enabled
+        self._counters: dict[str, int] = dict()
+        self._histograms: dict[str, LatencyHistogram] = dict()
+        self._memory_snapshots: dict[str, dict] = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def counters(self) -> dict[str, int]:
+        return dict(self._counters)
+
+    @property
+    def histograms(self) -> dict[str, LatencyHistogram]:
+        return dict(self._histograms)
+
+    @property
+    def memory_snapshots(self) -> dict[str, dict]:
+        return dict(self._memory_snapshots)
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram: LatencyHistogram or None = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def count(self, counter: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + n
+
+    def timed(self, stage: str) -> Callable[[F], F]:
+        """
+        Decorator recording the latency of every call to the decorated function under stage, while enabled.
+        """
+        def decorator(function: F) -> F:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start: float = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def start_tracing_memory() -> None:
+        """
+        tracemalloc slows every allocation down, so it is only started on demand, before the index is loaded.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def snapshot_memory(self, label: str) -> dict or None:
+        """
+        Current and peak memory traced so far, and the source lines that allocated most of it. None when tracemalloc
+        is not tracing.
+        """
+        if not tracemalloc.is_tracing():
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        statistics: list[tracemalloc.Statistic] = tracemalloc.take_snapshot().statistics("lineno")
+        snapshot: dict = {"current_bytes": current, "peak_bytes": peak,
+                          "top": [{"line": str(statistic.traceback), "bytes": statistic.size,
+                                   "allocations": statistic.count}
+                                  for statistic in statistics[:self.TOP_ALLOCATIONS]]}
+        with self._lock:
+            self._memory_snapshots[label] = snapshot
+        return snapshot
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._memory_snapshots.clear()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {"counters": dict(self._counters),
+                    "stages": {stage: histogram.as_dict() for stage, histogram in self._histograms.items()},
+                    "memory": dict(self._memory_snapshots)}
+
+    def report(self) -> str:
+        if not self.enabled:
+            return "instrumentation is disabled, run with --profile to enable it"
+
+        lines: list[str] = list()
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                lines.append("{}: {}".format(stage, histogram))
+            for counter, value in sorted(self._counters.items()):
+                lines.append("{}: {}".format(counter, value))
+            for label, snapshot in self._memory_snapshots.items():
+                lines.append("memory after {}: {:.1f} MB, peak {:.1f} MB".format(
+                    label, snapshot["current_bytes"] / 1e6, snapshot["peak_bytes"] / 1e6))
+                lines.extend("  {} bytes in {} allocations: {}".format(top["bytes"], top["allocations"], top["line"])
+                             for top in snapshot["top"])
+        return "\n".join(lines) if lines else "nothing recorded yet"
+
+
+# shared by every SimpleSearch of the process, so the stages can be decorated at class definition
+INSTRUMENTATION: Instrumentation = Instrumentation()
+timed: Callable[[str], Callable[[F], F]] = INSTRUMENTATION.timed
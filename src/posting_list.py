@@ -0,0 +1,432 @@
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator
+
+DocId = int
+
+
+def encode_varbyte(value: int, buffer: bytearray) -> None:
+    """
+    Append value to buffer using 7 bits per byte, the high bit flags that more bytes follow.
+    Small numbers (which is what deltas between sorted doc ids usually are) take a single byte.
+    """
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def decode_varbyte(buffer: bytes or bytearray, offset: int) -> tuple[int, int]:
+    """
+    Decode the single value starting at offset, returning it with the offset of the next one.
+    """
+    value: int = 0
+    shift: int = 0
+    while True:
+        byte: int = buffer[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def decode_varbytes(buffer: bytes or bytearray) -> Iterator[int]:
+    value: int = 0
+    shift: int = 0
+    for byte in buffer:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = 0
+            shift = 0
+
+
+class PostingList:
+    """
+    Sorted set of document ids for a single token, each one with the number of times the token appears in it (term
+    frequency, tf).
+
+    Postings are kept as (gap to the previous doc id, tf) pairs, varbyte encoded into a single bytearray. Since
+    documents are indexed in doc id order, adding a posting is almost always an append of a couple of bytes, and adding
+    the same doc id again only re-encodes its tf at the end of the buffer; inserting an id lower than the last one is
+    supported but requires re-encoding the whole list.
+
+    Every SKIP_INTERVAL postings a skip pointer is recorded: the doc id right before the next posting, the offset of
+    that posting in the buffer and its position in the list. PostingCursor uses them to jump over whole regions of
+    the list without decoding them.
+    """
+    SKIP_INTERVAL: int = 64
+
+    __slots__ = ("_buffer", "_count", "_last", "_last_tf", "_tf_offset", "_max_tf", "_skips")
+
+    def __init__(self, doc_ids: Iterable[DocId] = ()) -> None:
+        self._reset()
+        for doc_id in doc_ids:
+            self.add(doc_id)
+
+    def _reset(self) -> None:
+        self._buffer = bytearray()
+        self._count = 0
+        self._last = None
+        self._last_tf = None
+        self._tf_offset = None
+        self._max_tf = 0
+        self._skips = None
+
+    @classmethod
+    def from_items(cls, items: Iterable[tuple[DocId, int]]) -> 'PostingList':
+        postings: PostingList = cls()
+        for doc_id, tf in items:
+            postings.add(doc_id, tf)
+        return postings
+
+    @classmethod
+    def from_encoded(cls, buffer: bytes or bytearray, count: int, last: DocId or None, max_tf: int = 0,
+                     skips: 'tuple[array, array, array] or None' = None) -> 'PostingList':
+        postings: PostingList = cls()
+        postings._buffer = bytearray(buffer)
+        postings._count = count
+        postings._last = last
+        postings._max_tf = max_tf
+        postings._skips = skips
+        return postings
+
+    def copy(self) -> 'PostingList':
+        skips: tuple[array, array, array] or None = None if self._skips is None \
+            else tuple(array('I', values) for values in self._skips)
+        return PostingList.from_encoded(self._buffer, self._count, self._last, self._max_tf, skips)
+
+    @property
+    def buffer(self) -> bytearray:
+        return self._buffer
+
+    @property
+    def last(self) -> DocId or None:
+        return self._last
+
+    @property
+    def max_tf(self) -> int:
+        return self._max_tf
+
+    @property
+    def skips(self) -> 'tuple[array, array, array] or None':
+        """
+        Skip pointers as three arrays of the same length: doc ids before the skipped to postings, their offsets in the
+        buffer and their positions in the list. None if the list is too short to have any.
+        """
+        return self._skips
+
+    def add(self, doc_id: DocId, tf: int = 1) -> bool:
+        """
+        Returns whether doc_id was not in the list yet, rather than having its term frequency increased.
+        """
+        if doc_id < 0:
+            raise ValueError("Expected doc id to be a non negative integer.")
+        if tf < 1:
+            raise ValueError("Expected term frequency to be a positive integer.")
+
+        if self._last is None or doc_id > self._last:
+            if self._count and self._count % self.SKIP_INTERVAL == 0:
+                self._add_skip(self._last, len(self._buffer), self._count)
+            encode_varbyte(doc_id if self._last is None else doc_id - self._last, self._buffer)
+            self._tf_offset = len(self._buffer)
+            encode_varbyte(tf, self._buffer)
+            self._last = doc_id
+            self._last_tf = tf
+            self._count += 1
+        elif doc_id == self._last:
+            if self._tf_offset is None:
+                self._locate_last_tf()
+            del self._buffer[self._tf_offset:]
+            self._last_tf += tf
+            encode_varbyte(self._last_tf, self._buffer)
+            self._max_tf = max(self._max_tf, self._last_tf)
+            return False
+        else:
+            return self._insert(doc_id, tf)
+
+        self._max_tf = max(self._max_tf, self._last_tf)
+        return True
+
+    def _add_skip(self, doc_id: DocId, offset: int, position: int) -> None:
+        if self._skips is None:
+            self._skips = (array('I'), array('I'), array('I'))
+        self._skips[0].append(doc_id)
+        self._skips[1].append(offset)
+        self._skips[2].append(position)
+
+    def _locate_last_tf(self) -> None:
+        # lists loaded from an index file don't know where their last tf starts until decoded
+        offset: int = 0
+        while offset < len(self._buffer):
+            _, offset = decode_varbyte(self._buffer, offset)
+            self._tf_offset = offset
+            self._last_tf, offset = decode_varbyte(self._buffer, offset)
+
+    def extend(self, other: 'PostingList') -> None:
+        if not len(other):
+            return
+
+        first_doc_id, offset = decode_varbyte(other.buffer, 0)
+        if self._last is None or first_doc_id > self._last:
+            # only the first gap of other changes, the rest of its buffer can be copied as is
+            encode_varbyte(first_doc_id if self._last is None else first_doc_id - self._last, self._buffer)
+            start: int = len(self._buffer)
+            if other.skips is not None:
+                for skip_doc_id, skip_offset, skip_position in zip(*other.skips):
+                    self._add_skip(skip_doc_id, start + skip_offset - offset, self._count + skip_position)
+            self._buffer += other.buffer[offset:]
+            self._count += len(other)
+            self._last = other.last
+            self._last_tf = other._last_tf
+            self._tf_offset = None if other._tf_offset is None else start + other._tf_offset - offset
+            self._max_tf = max(self._max_tf, other.max_tf)
+            return
+
+        for doc_id, tf in other.items():
+            self.add(doc_id, tf)
+
+    def _insert(self, doc_id: DocId, tf: int) -> bool:
+        items: dict[DocId, int] = dict(self.items())
+        is_new: bool = doc_id not in items
+        items[doc_id] = items.get(doc_id, 0) + tf
+
+        self._reset()
+        for sorted_doc_id in sorted(items):
+            self.add(sorted_doc_id, items[sorted_doc_id])
+        return is_new
+
+    def without(self, doc_ids: 'array or list[DocId]') -> 'PostingList':
+        """
+        Copy of this list leaving the postings of doc_ids, sorted, out. The list itself when it holds none of them,
+        which a cursor finds out through skip pointers, without decoding or re-encoding the whole list.
+        """
+        cursor: PostingCursor = self.cursor()
+        for doc_id in doc_ids:
+            if cursor.next_geq(doc_id) == doc_id:
+                break
+            if cursor.doc_id == PostingCursor.END:
+                return self
+        else:
+            return self
+
+        excluded: set[DocId] = set(doc_ids)
+        return PostingList.from_items((doc_id, tf) for doc_id, tf in self.items() if doc_id not in excluded)
+
+    def cursor(self) -> 'PostingCursor':
+        return PostingCursor(self)
+
+    def to_array(self) -> array:
+        return array('I', self)
+
+    def to_arrays(self) -> tuple[array, array]:
+        """
+        Doc ids and their term frequencies, as two arrays of the same length.
+        """
+        values: array = array('I', decode_varbytes(self._buffer))
+        doc_ids: array = values[::2]
+        running_doc_id: DocId = 0
+        for position, gap in enumerate(doc_ids):
+            running_doc_id += gap
+            doc_ids[position] = running_doc_id
+        return doc_ids, values[1::2]
+
+    def items(self) -> Iterator[tuple[DocId, int]]:
+        values: Iterator[int] = decode_varbytes(self._buffer)
+        doc_id: DocId = 0
+        for gap in values:
+            doc_id += gap
+            yield doc_id, next(values)
+
+    def __iter__(self) -> Iterator[DocId]:
+        for doc_id, _ in self.items():
+            yield doc_id
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, doc_id: DocId) -> bool:
+        return self.cursor().next_geq(doc_id) == doc_id
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PostingList):
+            return NotImplemented
+        return self._buffer == other._buffer
+
+    def __repr__(self) -> str:
+        return "PostingList({})".format(list(self.items()))
+
+    def __sizeof__(self) -> int:
+        skips_size: int = 0 if self._skips is None else sum(skips.__sizeof__() for skips in self._skips)
+        return object.__sizeof__(self) + self._buffer.__sizeof__() + skips_size
+
+
+class PostingCursor:
+    """
+    Forward only reader over a PostingList. doc_id and tf hold the current posting, doc_id is END once the list is
+    exhausted. scanned and skipped count the postings decoded and the ones jumped over through skip pointers.
+    """
+    END: DocId = 1 << 32
+
+    __slots__ = ("_buffer", "_skips", "_length", "_offset", "_position", "doc_id", "tf", "scanned", "skipped")
+
+    def __init__(self, postings: PostingList) -> None:
+        self._buffer = postings.buffer
+        self._skips = postings.skips
+        self._length = len(postings)
+        self._offset = 0
+        self._position = 0
+        self.doc_id = 0
+        self.tf = 0
+        self.scanned = 0
+        self.skipped = 0
+        self.next()
+
+    def next(self) -> DocId:
+        if self._position >= self._length:
+            self.doc_id = self.END
+            self.tf = 0
+            return self.doc_id
+
+        gap, self._offset = decode_varbyte(self._buffer, self._offset)
+        self.tf, self._offset = decode_varbyte(self._buffer, self._offset)
+        self.doc_id = gap if self._position == 0 else self.doc_id + gap
+        self._position += 1
+        self.scanned += 1
+        return self.doc_id
+
+    def next_geq(self, target: DocId) -> DocId:
+        """
+        Move to the first posting with a doc id greater or equal than target, binary searching the skip pointers to
+        land as close to it as possible before decoding.
+        """
+        if self.doc_id >= target:
+            return self.doc_id
+
+        if self._skips is not None:
+            skip: int = bisect_left(self._skips[0], target) - 1
+            if skip >= 0 and self._skips[2][skip] >= self._position:
+                self.skipped += self._skips[2][skip] - self._position
+                self.doc_id = self._skips[0][skip]
+                self._offset = self._skips[1][skip]
+                self._position = self._skips[2][skip]
+
+        while self.doc_id < target:
+            self.next()
+        return self.doc_id
+
+
+class PositionList:
+    """
+    Positions (offsets in tokens from the start of the document) of a single token in every document containing it.
+
+    doc_ids and offsets are parallel arrays: the positions of doc_ids[i] start at offsets[i] in the buffer, varbyte
+    encoded as gaps to the previous position in the same document. Looking the positions of a document up is a binary
+    search over doc_ids followed by decoding only its own positions.
+    Documents must be added in increasing doc id order, and positions in increasing order within a document.
+    """
+
+    __slots__ = ("_doc_ids", "_offsets", "_buffer", "_last_position")
+
+    def __init__(self) -> None:
+        self._doc_ids = array('I')
+        self._offsets = array('I')
+        self._buffer = bytearray()
+        self._last_position = None
+
+    @classmethod
+    def from_encoded(cls, doc_ids: array, offsets: array, buffer: bytes or bytearray) -> 'PositionList':
+        positions: PositionList = cls()
+        positions._doc_ids = doc_ids
+        positions._offsets = offsets
+        positions._buffer = bytearray(buffer)
+        return positions
+
+    @property
+    def doc_ids(self) -> array:
+        return self._doc_ids
+
+    @property
+    def offsets(self) -> array:
+        return self._offsets
+
+    @property
+    def buffer(self) -> bytearray:
+        return self._buffer
+
+    def add(self, doc_id: DocId, position: int) -> None:
+        if not self._doc_ids or doc_id > self._doc_ids[-1]:
+            self._doc_ids.append(doc_id)
+            self._offsets.append(len(self._buffer))
+            encode_varbyte(position, self._buffer)
+        elif doc_id == self._doc_ids[-1]:
+            if self._last_position is None:
+                self._last_position = self.get(doc_id)[-1]
+            if position <= self._last_position:
+                raise ValueError("Expected positions to be added in increasing order.")
+            encode_varbyte(position - self._last_position, self._buffer)
+        else:
+            raise ValueError("Expected positions to be added in increasing doc id order.")
+        self._last_position = position
+
+    def extend(self, other: 'PositionList') -> None:
+        if not len(other):
+            return
+        if self._doc_ids and other.doc_ids[0] <= self._doc_ids[-1]:
+            raise ValueError("Expected positions to be added in increasing doc id order.")
+
+        start: int = len(self._buffer)
+        self._doc_ids.extend(other.doc_ids)
+        self._offsets.extend(start + offset for offset in other.offsets)
+        self._buffer += other.buffer
+        self._last_position = other._last_position
+
+    def without(self, doc_ids: set[DocId]) -> 'PositionList':
+        """
+        Copy of this list leaving the positions of doc_ids out.
+        """
+        positions: PositionList = PositionList()
+        for position, doc_id in enumerate(self._doc_ids):
+            if doc_id in doc_ids:
+                continue
+            end: int = self._offsets[position + 1] if position + 1 < len(self._offsets) else len(self._buffer)
+            positions._doc_ids.append(doc_id)
+            positions._offsets.append(len(positions._buffer))
+            positions._buffer += self._buffer[self._offsets[position]:end]
+        return positions
+
+    def get(self, doc_id: DocId) -> array:
+        """
+        Sorted positions of the token in doc_id, empty if the token is not in it.
+        """
+        position: int = bisect_left(self._doc_ids, doc_id)
+        if position == len(self._doc_ids) or self._doc_ids[position] != doc_id:
+            return array('I')
+
+        end: int = self._offsets[position + 1] if position + 1 < len(self._offsets) else len(self._buffer)
+        positions: array = array('I', decode_varbytes(self._buffer[self._offsets[position]:end]))
+        for index in range(1, len(positions)):
+            positions[index] += positions[index - 1]
+        return positions
+
+    def items(self) -> Iterator[tuple[DocId, array]]:
+        for doc_id in self._doc_ids:
+            yield doc_id, self.get(doc_id)
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PositionList):
+            return NotImplemented
+        return (self._doc_ids, self._offsets, self._buffer) == (other._doc_ids, other._offsets, other._buffer)
+
+    def __repr__(self) -> str:
+        return "PositionList({})".format([(doc_id, list(positions)) for doc_id, positions in self.items()])
+
+    def __sizeof__(self) -> int:
+        return (object.__sizeof__(self) + self._doc_ids.__sizeof__() + self._offsets.__sizeof__()
+                + self._buffer.__sizeof__())
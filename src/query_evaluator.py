@@ -0,0 +1,276 @@
+from array import array
+from typing import Callable, Iterable
+
+from database import Database
+from posting_list import DocId, PositionList, PostingCursor, PostingList
+from query_parser import And, Near, Not, Or, Phrase, QueryNode, Term
+
+END: DocId = PostingCursor.END
+
+
+class DocIdIterator:
+    """
+    Lazy, ascending stream of doc ids. doc_id is the current one (END once exhausted), next() moves to the following
+    one and next_geq(target) to the first one greater or equal than target. cost is an estimate of how many doc ids
+    it yields, used to evaluate the cheapest iterators first.
+    """
+    doc_id: DocId = END
+    cost: int = 0
+
+    def next(self) -> DocId:
+        raise NotImplementedError
+
+    def next_geq(self, target: DocId) -> DocId:
+        while self.doc_id < target:
+            self.next()
+        return self.doc_id
+
+
+class EmptyIterator(DocIdIterator):
+    def next(self) -> DocId:
+        return self.doc_id
+
+
+class PostingsIterator(DocIdIterator):
+    def __init__(self, postings: PostingList) -> None:
+        self._cursor = postings.cursor()
+        self.doc_id = self._cursor.doc_id
+        self.cost = len(postings)
+
+    def next(self) -> DocId:
+        self.doc_id = self._cursor.next()
+        return self.doc_id
+
+    def next_geq(self, target: DocId) -> DocId:
+        # skip pointers make this O(log) in the length of the posting list before decoding
+        self.doc_id = self._cursor.next_geq(target)
+        return self.doc_id
+
+
+class DocIdListIterator(DocIdIterator):
+    def __init__(self, doc_ids: list[DocId]) -> None:
+        self._doc_ids = doc_ids
+        self._position = 0
+        self.cost = len(doc_ids)
+        self.doc_id = doc_ids[0] if doc_ids else END
+
+    def next(self) -> DocId:
+        self._position += 1
+        self.doc_id = self._doc_ids[self._position] if self._position < len(self._doc_ids) else END
+        return self.doc_id
+
+    def next_geq(self, target: DocId) -> DocId:
+        # galloping search: double the step until target is passed, then binary search the last step
+        step: int = 1
+        low: int = self._position
+        while low + step < len(self._doc_ids) and self._doc_ids[low + step] < target:
+            low += step
+            step *= 2
+        high: int = min(low + step, len(self._doc_ids))
+        while low < high:
+            middle: int = (low + high) // 2
+            if self._doc_ids[middle] < target:
+                low = middle + 1
+            else:
+                high = middle
+        self._position = low
+        self.doc_id = self._doc_ids[low] if low < len(self._doc_ids) else END
+        return self.doc_id
+
+
+class AndIterator(DocIdIterator):
+    """
+    Intersection, leapfrogging from the rarest iterator: every candidate comes from it and the others only jump
+    ahead to it, so the cost is driven by the shortest list.
+    """
+
+    def __init__(self, children: list[DocIdIterator]) -> None:
+        self._children = sorted(children, key=lambda child: child.cost)
+        self.cost = self._children[0].cost
+        self._align(self._children[0].doc_id)
+
+    def _align(self, candidate: DocId) -> None:
+        while candidate != END:
+            for child in self._children:
+                if child.next_geq(candidate) != candidate:
+                    candidate = child.doc_id
+                    break
+            else:
+                break
+        self.doc_id = candidate
+
+    def next(self) -> DocId:
+        self._align(self._children[0].next())
+        return self.doc_id
+
+    def next_geq(self, target: DocId) -> DocId:
+        if self.doc_id < target:
+            self._align(self._children[0].next_geq(target))
+        return self.doc_id
+
+
+class OrIterator(DocIdIterator):
+    def __init__(self, children: list[DocIdIterator]) -> None:
+        self._children = children
+        self.cost = sum(child.cost for child in children)
+        self.doc_id = min(child.doc_id for child in children)
+
+    def next(self) -> DocId:
+        current: DocId = self.doc_id
+        for child in self._children:
+            if child.doc_id == current:
+                child.next()
+        self.doc_id = min(child.doc_id for child in self._children)
+        return self.doc_id
+
+    def next_geq(self, target: DocId) -> DocId:
+        if self.doc_id < target:
+            self.doc_id = min(child.next_geq(target) for child in self._children)
+        return self.doc_id
+
+
+class AndNotIterator(DocIdIterator):
+    def __init__(self, included: DocIdIterator, excluded: DocIdIterator) -> None:
+        self._included = included
+        self._excluded = excluded
+        self.cost = included.cost
+        self._skip_excluded(included.doc_id)
+
+    def _skip_excluded(self, candidate: DocId) -> None:
+        while candidate != END and self._excluded.next_geq(candidate) == candidate:
+            candidate = self._included.next()
+        self.doc_id = candidate
+
+    def next(self) -> DocId:
+        self._skip_excluded(self._included.next())
+        return self.doc_id
+
+    def next_geq(self, target: DocId) -> DocId:
+        if self.doc_id < target:
+            self._skip_excluded(self._included.next_geq(target))
+        return self.doc_id
+
+
+class PositionsIterator(DocIdIterator):
+    """
+    Candidates whose positions of the given tokens satisfy matches. Positions are only decoded for the candidates, which
+    come from the intersection of the tokens posting lists.
+    """
+
+    def __init__(self, candidates: DocIdIterator, position_lists: list[PositionList],
+                 matches: Callable[[list[array]], bool]) -> None:
+        self._candidates = candidates
+        self._position_lists = position_lists
+        self._matches = matches
+        self.cost = candidates.cost
+        self._accept(candidates.doc_id)
+
+    def _accept(self, candidate: DocId) -> None:
+        while candidate != END and not self._matches([positions.get(candidate) for positions in self._position_lists]):
+            candidate = self._candidates.next()
+        self.doc_id = candidate
+
+    def next(self) -> DocId:
+        self._accept(self._candidates.next())
+        return self.doc_id
+
+    def next_geq(self, target: DocId) -> DocId:
+        if self.doc_id < target:
+            self._accept(self._candidates.next_geq(target))
+        return self.doc_id
+
+
+def matches_phrase(token_positions: list[array]) -> bool:
+    """
+    True if there is a position p such that the i-th token is at p + i.
+    """
+    starts: set[int] = set(token_positions[0])
+    for offset in range(1, len(token_positions)):
+        starts.intersection_update(position - offset for position in token_positions[offset])
+        if not starts:
+            return False
+    return True
+
+
+def matches_near(distances: tuple[int, ...]) -> Callable[[list[array]], bool]:
+    """
+    Build a check for positions where the i-th and (i + 1)-th tokens are at most distances[i] apart. Each step merges
+    the sorted positions of the next token with the ones of the previous token still matching.
+    """
+
+    def matches(token_positions: list[array]) -> bool:
+        matching: list[int] = list(token_positions[0])
+        for distance, positions in zip(distances, token_positions[1:]):
+            next_matching: list[int] = list()
+            previous: int = 0
+            for position in positions:
+                while previous < len(matching) and matching[previous] < position - distance:
+                    previous += 1
+                if previous < len(matching) and matching[previous] <= position + distance:
+                    next_matching.append(position)
+            if not next_matching:
+                return False
+            matching = next_matching
+        return True
+
+    return matches
+
+
+class QueryEvaluator:
+    """
+    Turn a parsed query into a tree of DocIdIterator over the Database posting lists. NOT is evaluated as an exclusion
+    from its sibling terms, or from every live document when a query only has negated terms. Phrases and NEAR are
+    checked against positions when the Database has them; without positions a phrase only requires all its tokens.
+    """
+
+    def __init__(self, database: Database, all_doc_ids: Iterable[DocId]) -> None:
+        self._database = database
+        self._all_doc_ids = all_doc_ids
+
+    def evaluate(self, node: QueryNode or None) -> list[DocId]:
+        if node is None:
+            return []
+
+        iterator: DocIdIterator = self.iterator(node)
+        doc_ids: list[DocId] = list()
+        while iterator.doc_id != END:
+            doc_ids.append(iterator.doc_id)
+            iterator.next()
+        return doc_ids
+
+    def iterator(self, node: QueryNode) -> DocIdIterator:
+        if isinstance(node, Term):
+            postings: PostingList or None = self._database.find(node.token)
+            return EmptyIterator() if postings is None else PostingsIterator(postings)
+        if isinstance(node, Phrase):
+            return self._positions_iterator(node.tokens, matches_phrase)
+        if isinstance(node, Near):
+            if not self._database.has_positions:
+                raise ValueError("NEAR needs a Database with positions.")
+            return self._positions_iterator(node.tokens, matches_near(node.distances))
+        if isinstance(node, Or):
+            return OrIterator([self.iterator(child) for child in node.children])
+        if isinstance(node, Not):
+            return AndNotIterator(self._all_documents(), self.iterator(node.child))
+
+        included: list[DocIdIterator] = [self.iterator(child) for child in node.children
+                                         if not isinstance(child, Not)]
+        excluded: list[DocIdIterator] = [self.iterator(child.child) for child in node.children
+                                         if isinstance(child, Not)]
+        iterator: DocIdIterator = AndIterator(included) if included else self._all_documents()
+        if excluded:
+            iterator = AndNotIterator(iterator, excluded[0] if len(excluded) == 1 else OrIterator(excluded))
+        return iterator
+
+    def _positions_iterator(self, tokens: tuple[str, ...], matches: Callable[[list[array]], bool]) -> DocIdIterator:
+        candidates: DocIdIterator = self.iterator(And(tuple(Term(token) for token in tokens)))
+        if not self._database.has_positions:
+            return candidates
+
+        position_lists: list[PositionList or None] = [self._database.find_positions(token) for token in tokens]
+        if any(positions is None for positions in position_lists):
+            return EmptyIterator()
+        return PositionsIterator(candidates, position_lists, matches)
+
+    def _all_documents(self) -> DocIdIterator:
+        return DocIdListIterator(list(self._all_doc_ids))
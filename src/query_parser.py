@@ -0,0 +1,195 @@
+import re
+from dataclasses import dataclass
+from re import Pattern
+from typing import Union
+
+from tokenizer import Tokenizer
+
+
+class QueryParseError(Exception):
+    def __init__(self, query: str, reason: str) -> None:
+        self.message = "Could not parse query {!r}: {}".format(query, reason)
+        super().__init__(self.message)
+
+
+@dataclass(frozen=True)
+class Term:
+    token: str
+
+
+@dataclass(frozen=True)
+class Phrase:
+    tokens: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Near:
+    """
+    tokens[i] and tokens[i + 1] appear at most distances[i] tokens apart, in any order.
+    """
+    tokens: tuple[str, ...]
+    distances: tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class And:
+    children: tuple
+
+
+@dataclass(frozen=True)
+class Or:
+    children: tuple
+
+
+@dataclass(frozen=True)
+class Not:
+    child: object
+
+
+QueryNode = Union[Term, Phrase, Near, And, Or, Not]
+
+
+class QueryParser:
+    """
+    Recursive descent parser for boolean queries, from lowest to highest precedence:
+
+        or_query   := and_query ("OR" and_query)*
+        and_query  := not_query (["AND"] not_query)*         adjacent terms are ANDed
+        not_query  := "NOT" not_query | near_query
+        near_query := primary ("NEAR/" distance primary)*    primaries must be single words
+        primary    := "(" or_query ")" | '"' words '"' | word
+
+    Operators must be written in uppercase, so plain text like "to be or not to be" is not a boolean query. Words are
+    turned into tokens by the Tokenizer; a word that yields several tokens, like "I'm", becomes a Phrase, and a word
+    with wildcards, like "hel*", a Term holding the pattern.
+    """
+    OPERATORS: frozenset[str] = frozenset({"AND", "OR", "NOT"})
+    LEXEME_PATTERN: Pattern = re.compile(r'\(|\)|"[^"]*"?|[^\s()"]+')
+    NEAR_PATTERN: Pattern = re.compile(r'NEAR/(\d+)')
+
+    def __init__(self, tokenizer: Tokenizer) -> None:
+        self._tokenizer = tokenizer
+
+    @classmethod
+    def is_boolean_query(cls, query: str) -> bool:
+        return any(lexeme in cls.OPERATORS or lexeme[0] in '()"' or cls.NEAR_PATTERN.fullmatch(lexeme)
+                   for lexeme in cls.LEXEME_PATTERN.findall(query))
+
+    def parse(self, query: str) -> QueryNode or None:
+        """
+        Returns None when the query has no searchable tokens at all.
+        """
+        self._query = query
+        self._lexemes: list[str] = self.LEXEME_PATTERN.findall(query)
+        self._position: int = 0
+        if not self._lexemes:
+            return None
+
+        node: QueryNode or None = self._parse_or()
+        if self._position < len(self._lexemes):
+            raise QueryParseError(query, "unexpected {!r}".format(self._lexemes[self._position]))
+        return node
+
+    def _peek(self) -> str or None:
+        return self._lexemes[self._position] if self._position < len(self._lexemes) else None
+
+    def _parse_or(self) -> QueryNode or None:
+        children: list[QueryNode] = [self._parse_and()]
+        while self._peek() == "OR":
+            self._position += 1
+            children.append(self._parse_and())
+        return self._combine(Or, children)
+
+    def _parse_and(self) -> QueryNode or None:
+        children: list[QueryNode] = [self._parse_not()]
+        while self._peek() is not None and self._peek() not in ("OR", ")"):
+            if self._peek() == "AND":
+                self._position += 1
+            children.append(self._parse_not())
+        return self._combine(And, children)
+
+    def _parse_not(self) -> QueryNode or None:
+        if self._peek() == "NOT":
+            self._position += 1
+            child: QueryNode or None = self._parse_not()
+            return None if child is None else Not(child)
+        return self._parse_near()
+
+    def _parse_near(self) -> QueryNode or None:
+        node: QueryNode or None = self._parse_primary()
+        tokens: list[str] = list()
+        distances: list[int] = list()
+        while self._peek() is not None and self.NEAR_PATTERN.fullmatch(self._peek()):
+            distances.append(int(self.NEAR_PATTERN.fullmatch(self._peek()).group(1)))
+            self._position += 1
+            if not tokens:
+                tokens.append(self._near_token(node))
+            tokens.append(self._near_token(self._parse_primary()))
+        return Near(tuple(tokens), tuple(distances)) if tokens else node
+
+    def _near_token(self, node: QueryNode or None) -> str:
+        if not isinstance(node, Term):
+            raise QueryParseError(self._query, "NEAR only applies to single words")
+        return node.token
+
+    def _parse_primary(self) -> QueryNode or None:
+        lexeme: str or None = self._peek()
+        if lexeme is None or lexeme in self.OPERATORS or lexeme == ")" or self.NEAR_PATTERN.fullmatch(lexeme):
+            raise QueryParseError(self._query, "expected a word, a phrase or '(' but got {!r}".format(lexeme))
+
+        self._position += 1
+        if lexeme == "(":
+            node: QueryNode or None = self._parse_or()
+            if self._peek() != ")":
+                raise QueryParseError(self._query, "missing ')'")
+            self._position += 1
+            return node
+
+        if lexeme.startswith('"'):
+            if len(lexeme) == 1 or not lexeme.endswith('"'):
+                raise QueryParseError(self._query, "missing closing '\"'")
+            return self._words_node(lexeme[1:-1])
+
+        pattern: str or None = self._tokenizer.get_wildcard_pattern(lexeme)
+        return Term(pattern) if pattern is not None else self._words_node(lexeme)
+
+    def _words_node(self, words: str) -> QueryNode or None:
+        tokens: tuple[str, ...] = tuple(self._tokenizer.iter_tokens(words))
+        if not tokens:
+            return None
+        if len(tokens) == 1:
+            return Term(tokens[0])
+        return Phrase(tokens)
+
+    @staticmethod
+    def _combine(node_type: type, children: list[QueryNode or None]) -> QueryNode or None:
+        # words without tokens (e.g. punctuation only) are dropped from the query
+        children = [child for child in children if child is not None]
+        if not children:
+            return None
+        if len(children) == 1:
+            return children[0]
+        return node_type(tuple(children))
+
+
+def positive_tokens(node: QueryNode or None) -> set[str]:
+    """
+    Tokens a matching document contains, i.e. the ones not under a NOT.
+    """
+    if isinstance(node, Term):
+        return {node.token}
+    if isinstance(node, (Phrase, Near)):
+        return set(node.tokens)
+    if isinstance(node, (And, Or)):
+        return set().union(*(positive_tokens(child) for child in node.children))
+    return set()
+
+
+def has_near(node: QueryNode or None) -> bool:
+    if isinstance(node, Near):
+        return True
+    if isinstance(node, (And, Or)):
+        return any(has_near(child) for child in node.children)
+    if isinstance(node, Not):
+        return has_near(node.child)
+    return False
@@ -0,0 +1,115 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Hashable
+
+CachedResult = list[tuple[str, float]]
+
+
+class CacheStats:
+    """
+    Cumulative counters of lookups answered from the cache (hits), the ones that had to be computed (misses), and the
+    entries dropped to make room for new ones (evictions).
+    """
+
+    def __init__(self) -> None:
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def reset(self) -> None:
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def __repr__(self) -> str:
+        return "hits: {}, misses: {}, evictions: {}".format(self.hits, self.misses, self.evictions)
+
+
+def result_size(result: CachedResult) -> int:
+    return sys.getsizeof(result) + sum(sys.getsizeof(item) + sys.getsizeof(item[0]) + sys.getsizeof(item[1])
+                                       for item in result)
+
+
+class ResultCache:
+    """
+    Least recently used cache of search results, bounded both by number of entries and by their size in bytes.
+
+    Every entry belongs to a generation of the index: looking a key up with another generation than the one the cache
+    holds drops every entry, so results computed before the index changed are never returned. It can be shared by
+    threads searching concurrently.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 1 << 20) -> None:
+        if max_entries < 0 or max_bytes < 0:
+            raise ValueError("Expected cache limits to be non negative integers.")
+
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, tuple[CachedResult, int]] = OrderedDict()
+        self._size: int = 0
+        self._generation: int or None = None
+        self._stats = CacheStats()
+        self._lock = threading.RLock()
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._stats
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, generation: int) -> CachedResult or None:
+        with self._lock:
+            return self._get(key, generation)
+
+    def _get(self, key: Hashable, generation: int) -> CachedResult or None:
+        if generation != self._generation:
+            self.clear()
+            self._generation = generation
+
+        entry: tuple[CachedResult, int] or None = self._entries.get(key)
+        if entry is None:
+            self._stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        return list(entry[0])
+
+    def put(self, key: Hashable, result: CachedResult, generation: int) -> None:
+        with self._lock:
+            self._put(key, result, generation)
+
+    def _put(self, key: Hashable, result: CachedResult, generation: int) -> None:
+        if generation != self._generation:
+            self.clear()
+            self._generation = generation
+
+        entry_size: int = result_size(result)
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+        if not self._max_entries or entry_size > self._max_bytes:
+            return
+
+        self._entries[key] = (list(result), entry_size)
+        self._size += entry_size
+        while len(self._entries) > self._max_entries or self._size > self._max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self._stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
@@ -1,12 +1,22 @@
 class Scanner:
-    def __init__(self, exit_word: str, prompt: str) -> None:
+    def __init__(self, exit_word: str, prompt: str, reload_word: str = ":reload", stats_word: str = ":stats") -> None:
         self._exit_word = exit_word
         self._prompt = prompt
+        self._reload_word = reload_word
+        self._stats_word = stats_word
 
     @property
     def exit_word(self) -> str:
         return self._exit_word
 
+    @property
+    def reload_word(self) -> str:
+        return self._reload_word
+
+    @property
+    def stats_word(self) -> str:
+        return self._stats_word
+
     @property
     def prompt(self) -> str:
         return self._prompt
@@ -16,3 +26,9 @@ class Scanner:
 
     def is_exit_statement(self, line: str) -> bool:
         return line == self.exit_word
+
+    def is_reload_statement(self, line: str) -> bool:
+        return line == self.reload_word
+
+    def is_stats_statement(self, line: str) -> bool:
+        return line == self.stats_word
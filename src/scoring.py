@@ -0,0 +1,401 @@
+from heapq import heappush, heapreplace
+from itertools import accumulate
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from database import Database
+from posting_list import DocId, PostingCursor, PostingList
+
+ScoredDocument = tuple[DocId, float]
+# query token -> the terms it matches, with their edit distance to it
+Expansions = dict[str, dict[str, int]]
+
+FUZZY_WEIGHT: float = 0.5
+
+
+class CollectionStatistics(NamedTuple):
+    """
+    Number of live documents and sum of their lengths, the two numbers BM25 needs about the whole collection besides
+    document frequencies. They add up across shards holding disjoint sets of documents.
+    """
+    n_documents: int
+    total_length: int
+
+    @classmethod
+    def combine(cls, statistics: Iterable['CollectionStatistics']) -> 'CollectionStatistics':
+        statistics = list(statistics)
+        return cls(sum(s.n_documents for s in statistics), sum(s.total_length for s in statistics))
+
+
+def postings_as_array(postings: PostingList) -> np.ndarray:
+    return np.frombuffer(postings.to_array(), dtype=np.uint32)
+
+
+def select_top_k(doc_ids: np.ndarray, scores: np.ndarray, k: int) -> list[ScoredDocument]:
+    """
+    Pick the k highest scores without sorting every candidate: np.partition finds the k-th best score in linear time
+    and only the candidates at or above it get sorted. Ties are broken by doc id so results are deterministic.
+    """
+    if k <= 0 or not len(doc_ids):
+        return []
+
+    if len(scores) > k:
+        kth_score: float = np.partition(scores, len(scores) - k)[len(scores) - k]
+        candidates: np.ndarray = np.flatnonzero(scores >= kth_score)
+        doc_ids, scores = doc_ids[candidates], scores[candidates]
+
+    order: np.ndarray = np.lexsort((doc_ids, -scores))[:k]
+    return [(int(doc_id), float(score)) for doc_id, score in zip(doc_ids[order], scores[order])]
+
+
+def term_weight(distance: int) -> float:
+    """
+    Weight of a match distance edits away from the query token: every edit halves it, so a misspelled match always
+    scores below an exact one.
+    """
+    return FUZZY_WEIGHT ** distance
+
+
+def token_terms(token: str, expansions: Expansions or None) -> dict[str, int]:
+    return expansions.get(token, {token: 0}) if expansions else {token: 0}
+
+
+def best_per_document(doc_ids: list[np.ndarray], scores: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Best score of every doc id, out of the scores of the terms a query token matches: a document containing both a
+    word and a misspelling of it scores like the word alone.
+    """
+    if len(doc_ids) == 1:
+        return doc_ids[0], scores[0]
+
+    unique_doc_ids, positions = np.unique(np.concatenate(doc_ids), return_inverse=True)
+    best_scores: np.ndarray = np.zeros(len(unique_doc_ids))
+    np.maximum.at(best_scores, positions, np.concatenate(scores))
+    return unique_doc_ids, best_scores
+
+
+def restrict_to(doc_ids: np.ndarray, candidates: np.ndarray or None) -> np.ndarray:
+    """
+    Mask of the doc_ids present in candidates, both sorted; everything matches when there are no candidates to check.
+    """
+    if candidates is None:
+        return np.ones(len(doc_ids), dtype=bool)
+    positions: np.ndarray = np.minimum(np.searchsorted(candidates, doc_ids), max(len(candidates) - 1, 0))
+    return candidates[positions] == doc_ids if len(candidates) else np.zeros(len(doc_ids), dtype=bool)
+
+
+class PercentageRanker:
+    """
+    Score of a document is the percentage of query tokens it contains, rounded half to even like pandas does.
+    Only doc ids present in the posting lists of the query tokens are visited: the cost is O(matching postings),
+    independently of the number of files in the Database.
+
+    When candidates (sorted doc ids, e.g. the ones matching a boolean query) are given, only those are ranked and every
+    one of them is returned, with a score of 0 if it contains none of the query tokens. Scores only depend on the
+    document, so collection statistics and document frequencies are ignored.
+
+    With expansions, a query token also matches the terms it is expanded to, counting as term_weight(distance) of a
+    token instead of a whole one.
+    """
+
+    def prepare(self, database: Database, collection: CollectionStatistics or None = None) -> None:
+        pass
+
+    @staticmethod
+    def format_score(score: float) -> str:
+        return "{}%".format(int(score))
+
+    @staticmethod
+    def rank(database: Database, query_tokens: set[str], top_n: int, candidates: np.ndarray or None = None,
+             document_frequencies: dict[str, int] or None = None,
+             expansions: Expansions or None = None) -> list[ScoredDocument]:
+        if not query_tokens and candidates is None:
+            return []
+
+        matching_doc_ids: list[np.ndarray] = list() if candidates is None else [candidates]
+        token_hits: list[np.ndarray] = list() if candidates is None else [np.zeros(len(candidates))]
+        for token in query_tokens:
+            term_doc_ids: list[np.ndarray] = list()
+            term_hits: list[np.ndarray] = list()
+            for term, distance in token_terms(token, expansions).items():
+                postings: PostingList or None = database.find(term)
+                if postings:
+                    doc_ids: np.ndarray = postings_as_array(postings)
+                    term_doc_ids.append(doc_ids[restrict_to(doc_ids, candidates)])
+                    term_hits.append(np.full(len(term_doc_ids[-1]), term_weight(distance)))
+            if term_doc_ids:
+                doc_ids, hits = best_per_document(term_doc_ids, term_hits)
+                matching_doc_ids.append(doc_ids)
+                token_hits.append(hits)
+
+        if not matching_doc_ids:
+            return []
+
+        doc_ids, positions = np.unique(np.concatenate(matching_doc_ids), return_inverse=True)
+        hits: np.ndarray = np.bincount(positions, weights=np.concatenate(token_hits))
+        scores: np.ndarray = np.round(hits / max(len(query_tokens), 1) * 100)
+        return select_top_k(doc_ids, scores, top_n)
+
+
+UPPER_BOUND_TOLERANCE: float = 1e-9
+
+
+class PostingStats:
+    """
+    Cumulative counters of the postings a ranker decoded (scanned) and the ones it could leave untouched (skipped).
+    """
+
+    def __init__(self) -> None:
+        self.queries: int = 0
+        self.scanned: int = 0
+        self.skipped: int = 0
+
+    def reset(self) -> None:
+        self.queries, self.scanned, self.skipped = 0, 0, 0
+
+    def __repr__(self) -> str:
+        return "queries: {}, postings scanned: {}, postings skipped: {}".format(self.queries, self.scanned,
+                                                                                self.skipped)
+
+
+class BM25Ranker:
+    """
+    Okapi BM25: score(d) = sum over query tokens t of idf(t) * tf(t, d) * (k1 + 1) / (tf(t, d) + norm(d)),
+    with norm(d) = k1 * (1 - b + b * length(d) / average length) and idf(t) = ln(1 + (N - df(t) + 0.5) / (df(t) + 0.5)).
+
+    Document norms only depend on the indexed documents, so prepare() computes them for every doc id once the Database
+    is loaded; a query then visits the postings of its tokens only. idf(t) comes from the length of the posting list.
+    Like in PercentageRanker, candidates restricts the ranking to the given sorted doc ids.
+
+    When the Database only holds a shard of the collection, scores are the ones of the whole collection as long as N
+    and the average length come from its CollectionStatistics, given to prepare(), and df(t) from the
+    document_frequencies summed across shards, given to rank().
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self._k1 = k1
+        self._b = b
+        self._norms: np.ndarray = np.zeros(0)
+        self._min_norm: float = 0.0
+        self._n_documents: int = 0
+        self._average_length: float = 1.0
+        self._collection: CollectionStatistics or None = None
+
+    @property
+    def k1(self) -> float:
+        return self._k1
+
+    @property
+    def b(self) -> float:
+        return self._b
+
+    @property
+    def n_documents(self) -> int:
+        return self._n_documents
+
+    @property
+    def collection(self) -> CollectionStatistics or None:
+        return self._collection
+
+    @staticmethod
+    def document_lengths(database: Database) -> np.ndarray:
+        """
+        Length of every doc id, 0 for deleted ones.
+        """
+        lengths: np.ndarray = np.array(database.document_lengths, dtype=np.float64)
+        if database.deleted:
+            lengths[[doc_id for doc_id in database.deleted if doc_id < len(lengths)]] = 0
+        return lengths
+
+    @classmethod
+    def collection_statistics(cls, database: Database) -> CollectionStatistics:
+        lengths: np.ndarray = cls.document_lengths(database)
+        return CollectionStatistics(int(np.count_nonzero(lengths)), int(lengths.sum()))
+
+    def prepare(self, database: Database, collection: CollectionStatistics or None = None) -> None:
+        """
+        collection overrides the statistics of database from now on, including when preparing again.
+        """
+        if collection is not None:
+            self._collection = collection
+        lengths: np.ndarray = self.document_lengths(database)
+        collection = self._collection or CollectionStatistics(int(np.count_nonzero(lengths)), int(lengths.sum()))
+
+        self._n_documents = collection.n_documents
+        self._average_length = collection.total_length / self._n_documents if self._n_documents else 1.0
+        self._norms = self._k1 * (1 - self._b + self._b * lengths / self._average_length)
+        self._min_norm = float(self._norms[lengths > 0].min()) if np.any(lengths) else 0.0
+
+    def cover(self, database: Database) -> None:
+        """
+        Add the norms of the doc ids indexed since prepare(), against the statistics it computed: O(new documents), for
+        the queries answered while loading, between two calls to prepare(). Prepares a ranker that never was.
+        """
+        if not len(self._norms):
+            self.prepare(database)
+            return
+
+        lengths: np.ndarray = np.array(database.document_lengths[len(self._norms):], dtype=np.float64)
+        norms: np.ndarray = self._k1 * (1 - self._b + self._b * lengths / self._average_length)
+        if np.any(lengths):
+            new_min_norm: float = float(norms[lengths > 0].min())
+            self._min_norm = min(self._min_norm, new_min_norm) if self._min_norm else new_min_norm
+        self._norms = np.concatenate((self._norms, norms))
+
+    def idf(self, document_frequency: int) -> float:
+        return float(np.log(1 + (self._n_documents - document_frequency + 0.5) / (document_frequency + 0.5)))
+
+    def upper_bound(self, postings: PostingList, document_frequency: int or None = None) -> float:
+        """
+        Highest score a document can get from the token of postings: its contribution grows with tf and decreases with
+        the document norm, so it is bounded by the one of the highest tf in the list in the shortest document indexed.
+        """
+        max_tf: int = postings.max_tf
+        document_frequency = len(postings) if document_frequency is None else document_frequency
+        bound: float = self.idf(document_frequency) * max_tf * (self._k1 + 1) / (max_tf + self._min_norm)
+        return bound * (1 + UPPER_BOUND_TOLERANCE)
+
+    @staticmethod
+    def format_score(score: float) -> str:
+        return "{:.2f}".format(score)
+
+    def rank(self, database: Database, query_tokens: set[str], top_n: int, candidates: np.ndarray or None = None,
+             document_frequencies: dict[str, int] or None = None,
+             expansions: Expansions or None = None) -> list[ScoredDocument]:
+        """
+        With expansions, a query token scores the best of the terms it is expanded to, each one weighted by
+        term_weight(distance).
+        """
+        document_frequencies = document_frequencies or {}
+        matching_doc_ids: list[np.ndarray] = list() if candidates is None else [candidates]
+        token_scores: list[np.ndarray] = list() if candidates is None else [np.zeros(len(candidates))]
+        # in sorted order, so scores are summed in the same order in every process, whatever the order of the set
+        for token in sorted(query_tokens):
+            term_doc_ids: list[np.ndarray] = list()
+            term_scores: list[np.ndarray] = list()
+            for term, distance in token_terms(token, expansions).items():
+                postings: PostingList or None = database.find(term)
+                if not postings:
+                    continue
+
+                doc_id_array, tf_array = postings.to_arrays()
+                doc_ids: np.ndarray = np.frombuffer(doc_id_array, dtype=np.uint32)
+                if len(doc_ids) and doc_ids[-1] >= len(self._norms):
+                    self.cover(database)
+                tfs: np.ndarray = np.frombuffer(tf_array, dtype=np.uint32).astype(np.float64)
+                if candidates is not None:
+                    mask: np.ndarray = restrict_to(doc_ids, candidates)
+                    doc_ids, tfs = doc_ids[mask], tfs[mask]
+                term_doc_ids.append(doc_ids)
+                idf: float = self.idf(document_frequencies.get(term, len(postings)))
+                term_scores.append(term_weight(distance) * idf * tfs * (self._k1 + 1) / (tfs + self._norms[doc_ids]))
+            if term_doc_ids:
+                doc_ids, scores = best_per_document(term_doc_ids, term_scores)
+                matching_doc_ids.append(doc_ids)
+                token_scores.append(scores)
+
+        if not matching_doc_ids:
+            return []
+
+        doc_ids, positions = np.unique(np.concatenate(matching_doc_ids), return_inverse=True)
+        scores: np.ndarray = np.bincount(positions, weights=np.concatenate(token_scores))
+        return select_top_k(doc_ids, scores, top_n)
+
+
+class MaxScoreBM25Ranker(BM25Ranker):
+    """
+    Same top results as BM25Ranker, computed with the MaxScore dynamic pruning algorithm instead of scoring every
+    matching document.
+
+    Query tokens are sorted by the upper bound of their score. Once top_n documents have been found, the lowest score
+    among them is the threshold to enter the results: the tokens with the lowest bounds whose bounds add up to less
+    than it are non essential, as a document containing only them cannot make it. Candidates are then only taken from
+    the posting lists of essential tokens, and non essential lists are only probed (jumping ahead through their skip
+    pointers) while the candidate can still reach the threshold. Rankings restricted to candidates are already bounded
+    by them and are left to BM25Ranker, like rankings with expansions.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        super().__init__(k1, b)
+        self._stats = PostingStats()
+
+    @property
+    def stats(self) -> PostingStats:
+        return self._stats
+
+    def rank(self, database: Database, query_tokens: set[str], top_n: int, candidates: np.ndarray or None = None,
+             document_frequencies: dict[str, int] or None = None,
+             expansions: Expansions or None = None) -> list[ScoredDocument]:
+        if candidates is not None or expansions:
+            return super().rank(database, query_tokens, top_n, candidates, document_frequencies, expansions)
+
+        document_frequencies = document_frequencies or {}
+        terms: list[tuple[float, float, PostingCursor]] = list()
+        total_postings: int = 0
+        for token in sorted(query_tokens):
+            postings: PostingList or None = database.find(token)
+            if not postings:
+                continue
+
+            if postings.last >= len(self._norms):
+                self.cover(database)
+            document_frequency: int = document_frequencies.get(token, len(postings))
+            terms.append((self.upper_bound(postings, document_frequency), self.idf(document_frequency),
+                          postings.cursor()))
+            total_postings += len(postings)
+
+        self._stats.queries += 1
+        if not terms or top_n <= 0:
+            return []
+
+        terms.sort(key=lambda term: term[0])
+        cumulative_bounds: list[float] = list(accumulate(term[0] for term in terms))
+        idfs: list[float] = [term[1] for term in terms]
+        cursors: list[PostingCursor] = [term[2] for term in terms]
+        weight: float = self._k1 + 1
+
+        top_documents: list[tuple[float, int]] = list()  # min heap of (score, -doc_id)
+        threshold: float = float("-inf")
+        first_essential: int = 0
+        while first_essential < len(cursors):
+            doc_id: DocId = min(cursor.doc_id for cursor in cursors[first_essential:])
+            if doc_id == PostingCursor.END:
+                break
+
+            norm: float = float(self._norms[doc_id])
+            score: float = 0.0
+            for position in range(first_essential, len(cursors)):
+                cursor: PostingCursor = cursors[position]
+                if cursor.doc_id == doc_id:
+                    score += idfs[position] * cursor.tf * weight / (cursor.tf + norm)
+                    cursor.next()
+
+            for position in range(first_essential - 1, -1, -1):
+                if score + cumulative_bounds[position] < threshold:
+                    break
+                cursor = cursors[position]
+                if cursor.next_geq(doc_id) == doc_id:
+                    score += idfs[position] * cursor.tf * weight / (cursor.tf + norm)
+
+            if len(top_documents) < top_n:
+                heappush(top_documents, (score, -doc_id))
+            elif (score, -doc_id) > top_documents[0]:
+                heapreplace(top_documents, (score, -doc_id))
+
+            if len(top_documents) == top_n:
+                threshold = top_documents[0][0]
+                while first_essential < len(cursors) and cumulative_bounds[first_essential] < threshold:
+                    first_essential += 1
+
+        scanned: int = sum(cursor.scanned for cursor in cursors)
+        self._stats.scanned += scanned
+        self._stats.skipped += total_postings - scanned
+        return [(-negative_doc_id, score) for score, negative_doc_id in sorted(top_documents, reverse=True)]
+
+
+RANKERS: dict[str, type] = {
+    "percentage": PercentageRanker,
+    "bm25": BM25Ranker,
+    "bm25-maxscore": MaxScoreBM25Ranker,
+}
@@ -0,0 +1,174 @@
+"""
+Line protocol TCP server for SimpleSearch: every line a client sends is a query, answered with one JSON line in the
+format of batch mode ({"query", "results" or "error", "latency_ms"}). ":reload" rebuilds the index in the background,
+its reply carries a "last_error" if the previous reload failed, and ":quit" closes the connection.
+
+Usage:
+    python3 src/search_server.py --path tests/samples --index-file index.bin --port 8765
+"""
+import asyncio
+import json
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from batch_search import search_query
+from regex_catalog import RegexCatalog
+from simple_search import SimpleSearch
+from tokenizer import Tokenizer
+
+LOCALHOST: str = "127.0.0.1"
+
+
+class SearchServer:
+    """
+    Queries are served from a snapshot: a SimpleSearch that is never modified once built. Reloading builds a whole new
+    snapshot with build_snapshot in a background thread, while queries keep being answered from the current one, and
+    then replaces it with a single assignment, so a query sees either the old index or the new one, never a mix. If
+    a background reload fails, the current snapshot is kept and the error is kept until the next reload reports it.
+
+    Scoring runs in a pool of query_workers threads, so the event loop keeps accepting and reading from clients while
+    queries are being ranked.
+    """
+    RELOAD_WORD: str = ":reload"
+    EXIT_WORD: str = ":quit"
+
+    def __init__(self, build_snapshot: Callable[[], SimpleSearch], query_workers: int = 4) -> None:
+        self._build_snapshot = build_snapshot
+        self._snapshot: SimpleSearch or None = None
+        self._query_executor = ThreadPoolExecutor(max_workers=query_workers)
+        self._reload_executor = ThreadPoolExecutor(max_workers=1)
+        self._reload_task: asyncio.Task or None = None
+        self._reload_error: str or None = None
+        self._server: asyncio.base_events.Server or None = None
+
+    @property
+    def snapshot(self) -> SimpleSearch or None:
+        return self._snapshot
+
+    @property
+    def port(self) -> int or None:
+        if self._server is None:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    @property
+    def is_reloading(self) -> bool:
+        return self._reload_task is not None and not self._reload_task.done()
+
+    @property
+    def reload_error(self) -> str or None:
+        return self._reload_error
+
+    async def start(self, host: str = LOCALHOST, port: int = 0) -> None:
+        """
+        Build the first snapshot and start listening; port 0 picks a free one.
+        """
+        await self.reload()
+        self._server = await asyncio.start_server(self.handle_client, host, port)
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._reload_task is not None:
+            await asyncio.gather(self._reload_task, return_exceptions=True)
+        self._query_executor.shutdown()
+        self._reload_executor.shutdown()
+
+    async def reload(self) -> SimpleSearch:
+        snapshot: SimpleSearch = await asyncio.get_running_loop().run_in_executor(self._reload_executor,
+                                                                                  self._build_snapshot)
+        self._snapshot = snapshot
+        return snapshot
+
+    def start_reload(self) -> bool:
+        """
+        Start reloading in the background, unless a reload is already running. Returns whether it was started.
+        """
+        if self.is_reloading:
+            return False
+        self._reload_task = asyncio.get_running_loop().create_task(self._reload_in_background())
+        return True
+
+    async def _reload_in_background(self) -> None:
+        try:
+            await self.reload()
+        except Exception as e:
+            self._reload_error = "{}: {}".format(type(e).__name__, e)
+            print("reload failed, still serving the previous index: {}".format(self._reload_error))
+
+    def pop_reload_error(self) -> str or None:
+        """
+        Error of the last background reload that failed, if it was not reported yet.
+        """
+        error: str or None = self._reload_error
+        self._reload_error = None
+        return error
+
+    async def search(self, query: str) -> dict:
+        return await asyncio.get_running_loop().run_in_executor(self._query_executor, search_query, self._snapshot,
+                                                                query)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line: bytes = await reader.readline()
+                if not line:
+                    break
+
+                query: str = line.decode("utf-8", errors="replace").strip()
+                if query == self.EXIT_WORD:
+                    break
+                if query == self.RELOAD_WORD:
+                    error: str or None = self.pop_reload_error()
+                    response: dict = {"reload": "started" if self.start_reload() else "already running"}
+                    if error is not None:
+                        response["last_error"] = error
+                elif query:
+                    response = await self.search(query)
+                else:
+                    continue
+
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def main() -> None:
+    parser: ArgumentParser = SimpleSearch.argument_parser()
+    parser.description = "Serve SimpleSearch queries over a line protocol TCP server."
+    parser.add_argument("--host", help="Address to listen on", type=str, default=LOCALHOST)
+    parser.add_argument("--port", help="Port to listen on", type=int, default=8765)
+    args: Namespace = parser.parse_args()
+    tokenizer: Tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter=" ")
+
+    def build_snapshot() -> SimpleSearch:
+        simple_search: SimpleSearch = SimpleSearch.from_args(args, tokenizer)
+        simple_search.load_database(args.index_file)
+        return simple_search
+
+    async def serve() -> None:
+        server: SearchServer = SearchServer(build_snapshot, args.query_workers)
+        await server.start(args.host, args.port)
+        print("serving {} on {}:{}".format(args.path, args.host, server.port))
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Search a directory split into shards, each one indexed and searched by its own worker process.
+
+Usage:
+    python3 src/sharded_search.py --path tests/samples --shards 4 --ranker bm25
+"""
+import multiprocessing
+from argparse import ArgumentParser, Namespace
+from contextlib import redirect_stdout
+from io import StringIO
+from multiprocessing.connection import Connection
+from typing import Any
+
+from crawler import Crawler
+from database import Database
+from query_parser import QueryNode, QueryParseError, QueryParser, has_near, positive_tokens
+from regex_catalog import RegexCatalog
+from result_cache import ResultCache
+from scanner import Scanner
+from scoring import RANKERS, BM25Ranker, CollectionStatistics
+from simple_search import SearchResult, SimpleSearch
+from tokenizer import Tokenizer
+
+ParsedQuery = set[str] or QueryNode or None
+
+# options of simple_search.py that shards don't support, and why
+UNSUPPORTED_OPTIONS: dict[str, str] = {
+    "--workers": "every shard already indexes its files in a process of its own",
+    "--index-file": "shards are indexed on start and never saved",
+    "--hash-files": "shards are never reloaded",
+    "--dedup": "files with the same content would only be found within a shard",
+    "--fuzzy": "the terms of every shard would have to be expanded",
+    "--compact-terms": "shards keep the terms they index as they are",
+    "--queries": "batch mode is only available in simple_search.py",
+    "--query-workers": "batch mode is only available in simple_search.py",
+    "--query-processes": "batch mode is only available in simple_search.py",
+    "--wait-for-index": "shards are always indexed before the prompt shows up",
+    "--index-in-background": "shards are always indexed before the prompt shows up",
+    "--profile": "stages are only timed in simple_search.py",
+    "--trace-memory": "memory is only traced in simple_search.py",
+}
+
+
+class ShardError(Exception):
+    def __init__(self, shard: int, reason: str) -> None:
+        self.message = "Shard {} failed: {}".format(shard, reason)
+        super().__init__(self.message)
+
+
+class Shard:
+    """
+    Worker side of a shard: a SimpleSearch indexing only its own files, answering the requests of the coordinator.
+    Its result cache is off, the coordinator caches the merged results.
+    """
+
+    def __init__(self, simple_search: SimpleSearch) -> None:
+        self._simple_search = simple_search
+
+    @property
+    def simple_search(self) -> SimpleSearch:
+        return self._simple_search
+
+    def collection_statistics(self) -> CollectionStatistics:
+        return BM25Ranker.collection_statistics(self._simple_search.database)
+
+    def prepare(self, collection: CollectionStatistics) -> None:
+        self._simple_search.ranker.prepare(self._simple_search.database, collection)
+
+    def document_frequencies(self, query_tokens: set[str]) -> dict[str, int]:
+        return self._simple_search.document_frequencies(query_tokens)
+
+    def rank(self, query: ParsedQuery, top_n: int, document_frequencies: dict[str, int]) -> list[SearchResult]:
+        if isinstance(query, set):
+            return self._simple_search.rank_search_hits(query, top_n, document_frequencies)
+        return self._simple_search.rank_boolean_query(query, top_n, document_frequencies)
+
+
+def serve_shard(connection: Connection, path: str, valid_extensions: list[str], tokenizer: Tokenizer,
+                filenames: list[str], options: dict) -> None:
+    """
+    Entry point of a shard process: index filenames, send the statistics of the shard, then answer (method, args)
+    requests with (True, result) or (False, error message) until None is received.
+    """
+    simple_search: SimpleSearch = SimpleSearch(path=path, valid_extensions=valid_extensions, tokenizer=tokenizer,
+                                               cache_entries=0, **options)
+    with redirect_stdout(StringIO()):
+        simple_search.load_files(filenames)
+    shard: Shard = Shard(simple_search)
+    connection.send(shard.collection_statistics())
+
+    while True:
+        request: tuple[str, tuple] or None = connection.recv()
+        if request is None:
+            break
+        method, args = request
+        try:
+            connection.send((True, getattr(shard, method)(*args)))
+        except Exception as e:
+            connection.send((False, "{}: {}".format(type(e).__name__, e)))
+    connection.close()
+
+
+class ShardedSearch:
+    """
+    Coordinator of n_shards worker processes, each holding a Database for a subset of the files: files are dealt to
+    shards in crawl order, like cards, so shards get about the same number of files and the i-th file of a shard is
+    file i * n_shards + shard of the crawl.
+
+    A query is parsed once here and scattered to every shard, whose top results are gathered and merged into the global
+    ones. Percentage scores only depend on the document. BM25 scores also depend on the collection, so that every
+    shard scores like a single index would:
+        - at start, the number of documents and total length of every shard are summed and sent back to all of them,
+        - every query first gathers the document frequencies of its tokens from all shards, and sends their sums along
+          with the query.
+    Ties are broken by crawl order, the order of doc ids in a single index, so results are the ones SimpleSearch gives
+    for the same directory.
+
+    Shards are built once, on start(); changes in the directory need a new ShardedSearch.
+    """
+
+    def __init__(self, path: str, valid_extensions: [str], tokenizer: Tokenizer, n_shards: int = 2,
+                 ranker: str = "percentage", positions: bool = False,
+                 max_expansions: int = Database.DEFAULT_MAX_EXPANSIONS, include: [str] = (), exclude: [str] = (),
+                 max_file_size: int or None = None, encoding: str = "utf-8", encoding_errors: str = "replace",
+                 cache_entries: int = 256, cache_bytes: int = 1 << 20) -> None:
+        if n_shards < 1:
+            raise ValueError("Expected n_shards to be a positive integer.")
+        if ranker not in RANKERS:
+            raise ValueError("Unknown ranker: {}".format(ranker))
+
+        self._path = path
+        self._valid_extensions = list(valid_extensions)
+        self._tokenizer = tokenizer
+        self._n_shards = n_shards
+        self._ranker = RANKERS[ranker]()
+        self._positions = positions
+        self._crawler = Crawler(path, valid_extensions, include, exclude, max_file_size)
+        self._shard_options: dict = {"ranker": ranker, "positions": positions, "max_expansions": max_expansions,
+                                     "encoding": encoding, "encoding_errors": encoding_errors}
+        self._result_cache = ResultCache(cache_entries, cache_bytes)
+        self._crawl_order: dict[str, int] = dict()
+        self._connections: list[Connection] = list()
+        self._processes: list[multiprocessing.Process] = list()
+        self._collection: CollectionStatistics or None = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def n_shards(self) -> int:
+        return self._n_shards
+
+    @property
+    def ranker(self) -> Any:
+        return self._ranker
+
+    @property
+    def files(self) -> list[str]:
+        return list(self._crawl_order)
+
+    @property
+    def collection(self) -> CollectionStatistics or None:
+        return self._collection
+
+    @property
+    def result_cache(self) -> ResultCache:
+        return self._result_cache
+
+    @classmethod
+    def from_args(cls, args: Namespace, tokenizer: Tokenizer) -> 'ShardedSearch':
+        return cls(path=args.path, valid_extensions=['txt'], tokenizer=tokenizer, n_shards=args.shards,
+                   ranker=args.ranker, positions=args.positions, max_expansions=args.max_expansions,
+                   include=args.include, exclude=args.exclude, max_file_size=args.max_file_size,
+                   encoding=args.encoding, encoding_errors=args.encoding_errors, cache_entries=args.cache_entries,
+                   cache_bytes=args.cache_bytes)
+
+    def start(self) -> None:
+        """
+        Crawl the directory and start the shard processes, which index their files concurrently. Returns once all of
+        them are ready. Raises FileNotFoundError when path does not exist.
+        """
+        filenames: list[str] = [crawled_file.path for crawled_file in self._crawler.crawl()]
+        self._crawl_order = {filename: order for order, filename in enumerate(filenames)}
+        for shard in range(self.n_shards):
+            connection, shard_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=serve_shard, daemon=True,
+                                              args=(shard_connection, self.path, self._valid_extensions,
+                                                    self._tokenizer, filenames[shard::self.n_shards],
+                                                    self._shard_options))
+            process.start()
+            shard_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+        self._collection = CollectionStatistics.combine(self._receive(shard) for shard in range(self.n_shards))
+        self._scatter("prepare", self._collection)
+
+    def close(self) -> None:
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+        for process, connection in zip(self._processes, self._connections):
+            process.join()
+            connection.close()
+        self._connections, self._processes = list(), list()
+
+    def __enter__(self) -> 'ShardedSearch':
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def parse(self, query_string: str) -> ParsedQuery:
+        """
+        Tokens of a plain query, or the QueryNode of a boolean one. Raises QueryParseError, like SimpleSearch.search().
+        """
+        if not QueryParser.is_boolean_query(query_string):
+            return self._tokenizer.get_query_tokens(query_string)
+
+        query: QueryNode or None = QueryParser(self._tokenizer).parse(query_string)
+        if has_near(query) and not self._positions:
+            raise QueryParseError(query_string, "NEAR needs an index built with positions")
+        return query
+
+    def search(self, query_string: str, top_n_rows: int = SimpleSearch.RANK_RESULT_LIMIT) -> list[SearchResult]:
+        query: ParsedQuery = self.parse(query_string)
+        if query is None:
+            return []
+
+        key: tuple = (frozenset(query) if isinstance(query, set) else query, top_n_rows)
+        results: list[SearchResult] or None = self._result_cache.get(key, 0)
+        if results is not None:
+            return results
+
+        document_frequencies: dict[str, int] = dict()
+        if isinstance(self._ranker, BM25Ranker):
+            query_tokens: set[str] = query if isinstance(query, set) else positive_tokens(query)
+            for shard_frequencies in self._scatter("document_frequencies", query_tokens):
+                for token, frequency in shard_frequencies.items():
+                    document_frequencies[token] = document_frequencies.get(token, 0) + frequency
+
+        shard_results: list[list[SearchResult]] = self._scatter("rank", query, top_n_rows, document_frequencies)
+        results = sorted((result for results in shard_results for result in results),
+                         key=lambda result: (-result[1], self._crawl_order[result[0]]))[:top_n_rows]
+        self._result_cache.put(key, results, 0)
+        return results
+
+    def _scatter(self, method: str, *args) -> list:
+        """
+        Send the request to every shard before waiting for any of them, so they all work on it at the same time.
+        """
+        for connection in self._connections:
+            connection.send((method, args))
+        responses: list = list()
+        for shard in range(self.n_shards):
+            succeeded, response = self._receive(shard)
+            if not succeeded:
+                raise ShardError(shard, response)
+            responses.append(response)
+        return responses
+
+    def _receive(self, shard: int) -> Any:
+        try:
+            return self._connections[shard].recv()
+        except EOFError:
+            raise ShardError(shard, "the process exited with code {}".format(self._processes[shard].exitcode))
+
+    def report_results(self, results: list[SearchResult]) -> None:
+        if not results:
+            print("no matches found")
+            return
+
+        for file, rank in results:
+            print("{}: {}".format(file, self._ranker.format_score(rank)))
+
+    def interact(self, search_scanner: Scanner) -> None:
+        query_string: str = search_scanner.read_input_as_string()
+        while not search_scanner.is_exit_statement(query_string):
+            try:
+                self.report_results(self.search(query_string))
+            except QueryParseError as e:
+                print(e.message)
+            query_string = search_scanner.read_input_as_string()
+
+
+def unsupported_option(parser: ArgumentParser, args: Namespace) -> str or None:
+    """
+    Error message for the first option of UNSUPPORTED_OPTIONS given a value other than its default, None if none is.
+    """
+    for option, reason in UNSUPPORTED_OPTIONS.items():
+        destination: str = option[2:].replace("-", "_")
+        if getattr(args, destination) != parser.get_default(destination):
+            return "{} is not supported with shards, {}".format(option, reason)
+    return None
+
+
+def main() -> None:
+    parser: ArgumentParser = SimpleSearch.argument_parser()
+    parser.description = "Index a directory in shards, each one in its own process, and search all of them."
+    parser.add_argument("--shards", help="Number of shard processes", type=int, default=2)
+    args: Namespace = parser.parse_args()
+    error: str or None = unsupported_option(parser, args)
+    if error is not None:
+        parser.error(error)
+    tokenizer: Tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter=" ")
+
+    with ShardedSearch.from_args(args, tokenizer) as sharded_search:
+        print("{} files in {} shards".format(len(sharded_search.files), sharded_search.n_shards))
+        sharded_search.interact(Scanner(exit_word=":quit", prompt="search> "))
+
+
+if __name__ == "__main__":
+    main()
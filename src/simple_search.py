@@ -1,35 +1,167 @@
+import atexit
+import hashlib
+import json
+import multiprocessing
 import os
-import pandas as pd
+import sys
+import threading
+import time
+import numpy as np
 
 from argparse import ArgumentParser, Namespace
-from collections import defaultdict
-from database import Database, SetDictionary
+from batch_search import LatencyReport, read_queries, run_batch
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext, redirect_stdout
+from crawler import ENCODING_ERRORS, Crawler, FileReader, get_file_extension
+from database import Database
+from document_registry import DocumentRegistry, FileMetadata
+from fuzzy_index import max_edits
+from index_file import IndexFileError, MappedIndex, write_index_file
+from instrumentation import INSTRUMENTATION, Instrumentation, timed
+from posting_list import DocId, PostingList
+from query_evaluator import QueryEvaluator
+from query_parser import QueryNode, QueryParseError, QueryParser, has_near, positive_tokens
 from regex_catalog import RegexCatalog
+from result_cache import ResultCache
 from scanner import Scanner
+from scoring import RANKERS, BM25Ranker, Expansions, PercentageRanker, ScoredDocument
 from tokenizer import Tokenizer
+from typing import Iterator
+
+SearchResult = tuple[str, float]
 
 
 class SimpleSearch:
     RANK_RESULT_LIMIT: int = 10
+    BATCHES_PER_WORKER: int = 4
+    # while loading in the background, growth of the number of files indexed past which the ranker is prepared again
+    PREPARE_GROWTH: float = 0.1
+    # seconds a query can spend looking for the misspellings of its tokens, past which it uses the ones found so far
+    FUZZY_TIME_LIMIT: float = 0.05
+
+    def __init__(self, path: str, valid_extensions: [str], tokenizer: Tokenizer, workers: int = 1,
+                 hash_files: bool = False, ranker: str = "percentage", positions: bool = False,
+                 cache_entries: int = 256, cache_bytes: int = 1 << 20,
+                 max_expansions: int = Database.DEFAULT_MAX_EXPANSIONS, include: [str] = (), exclude: [str] = (),
+                 max_file_size: int or None = None, encoding: str = "utf-8", encoding_errors: str = "replace",
+                 compact_terms: bool = False, fuzzy: int = 0, deduplicate: bool = False) -> None:
+        if workers < 1:
+            raise ValueError("Expected workers to be a positive integer.")
+        if ranker not in RANKERS:
+            raise ValueError("Unknown ranker: {}".format(ranker))
+        if fuzzy < 0:
+            raise ValueError("Expected fuzzy to be a non negative integer.")
 
-    def __init__(self, path: str, valid_extensions: [str], tokenizer: Tokenizer) -> None:
         self._path = path
-        self._database = Database()
-        self._database_files = list()
+        self._positions = positions
+        self._max_expansions = max_expansions
+        self._database = Database(positions=positions, max_expansions=max_expansions)
+        self._document_registry = DocumentRegistry()
         self._valid_extensions = set(valid_extensions)
+        self._crawler = Crawler(path, self._valid_extensions, include, exclude, max_file_size)
+        self._file_reader = FileReader(encoding, encoding_errors)
         self._tokenizer = tokenizer
+        self._ranker_name = ranker
+        self._ranker = RANKERS[ranker]()
+        self._result_cache = ResultCache(cache_entries, cache_bytes)
+        self._generation = 0
+        # held while indexing a file, and by queries while loading in the background, so they see whole files
+        self._lock = threading.RLock()
+        self._loading: bool = False
+        self._loading_thread: threading.Thread or None = None
+        self._loading_error: Exception or None = None
+        self._files_to_index: int or None = None
+        self._files_indexed: int = 0
+        self._prepared_files: int = 0
+        self._workers = workers
+        # deduplicating needs the content hash of every file, which then also tells touched files from modified ones
+        self._hash_files = hash_files or deduplicate
+        self._deduplicate = deduplicate
+        self._compact_terms = compact_terms
+        self._fuzzy = fuzzy
 
     @property
     def path(self) -> str:
         return self._path
 
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def hash_files(self) -> bool:
+        return self._hash_files
+
+    @property
+    def compact_terms(self) -> bool:
+        return self._compact_terms
+
+    @property
+    def deduplicate(self) -> bool:
+        return self._deduplicate
+
+    @property
+    def fuzzy(self) -> int:
+        return self._fuzzy
+
+    @property
+    def positions(self) -> bool:
+        return self._positions
+
+    @property
+    def ranker(self) -> PercentageRanker or BM25Ranker:
+        return self._ranker
+
+    @property
+    def max_expansions(self) -> int:
+        return self._max_expansions
+
+    @property
+    def result_cache(self) -> ResultCache:
+        return self._result_cache
+
+    @property
+    def generation(self) -> int:
+        """
+        Changes every time the Database is loaded, reloaded or cleared, which invalidates the cached results.
+        """
+        return self._generation
+
+    @property
+    def is_loading(self) -> bool:
+        return self._loading
+
+    @property
+    def loading_error(self) -> Exception or None:
+        """
+        What made loading in the background fail, if it did.
+        """
+        return self._loading_error
+
+    @property
+    def coverage(self) -> tuple[int, int or None]:
+        """
+        Number of files indexed (or found up to date, when reloading) so far, and number of files to index, None while
+        the directory is being crawled.
+        """
+        return self._files_indexed, self._files_to_index
+
+    @property
+    def instrumentation(self) -> Instrumentation:
+        return INSTRUMENTATION
+
     @property
     def database(self) -> Database:
         return self._database
 
+    @property
+    def document_registry(self) -> DocumentRegistry:
+        return self._document_registry
+
     @property
     def database_files(self) -> list[str]:
-        return self._database_files
+        return self._document_registry.filenames
 
     @property
     def valid_extensions(self) -> [str]:
@@ -39,69 +171,636 @@ class SimpleSearch:
     def tokenizer(self) -> Tokenizer:
         return self._tokenizer
 
+    @property
+    def crawler(self) -> Crawler:
+        return self._crawler
+
+    @property
+    def file_reader(self) -> FileReader:
+        return self._file_reader
+
     @staticmethod
-    def parse_args() -> Namespace:
+    def argument_parser() -> ArgumentParser:
         parser = ArgumentParser(description="Index a directory, perform lookups on its file contents and rank results.")
         parser.add_argument("--path", help="Directory to scan to look for text files", type=str, required=True)
+        parser.add_argument("--workers", help="Number of processes used to index files", type=int, default=1)
+        parser.add_argument("--index-file", help="File to load the index from, it is built and saved there if missing",
+                            type=str, default=None)
+        parser.add_argument("--hash-files", action="store_true",
+                            help="Hash file contents to tell modified files from touched ones on reload")
+        parser.add_argument("--dedup", action="store_true",
+                            help="Index files with the same content once, they share their search results")
+        parser.add_argument("--ranker", help="Ranking function for search results", type=str,
+                            choices=sorted(RANKERS), default="percentage")
+        parser.add_argument("--positions", action="store_true",
+                            help="Index token positions, so quoted phrases and NEAR/k match words next to each other")
+        parser.add_argument("--max-expansions", help="Maximum number of words a wildcard like hel* can match",
+                            type=int, default=Database.DEFAULT_MAX_EXPANSIONS)
+        parser.add_argument("--fuzzy", help="Also match words up to this number of typos (edits) away from the query "
+                                            "words, scored lower than exact matches", type=int, default=0)
+        parser.add_argument("--queries", help="File with one query per line to search in batch, - to read stdin. "
+                                              "Results are written to stdout as JSON lines", type=str, default=None)
+        parser.add_argument("--query-workers", help="Number of queries searched concurrently in batch mode", type=int,
+                            default=os.cpu_count() or 1)
+        parser.add_argument("--query-processes", action="store_true",
+                            help="Search batch queries in forked processes instead of threads")
+        parser.add_argument("--cache-entries", help="Number of query results to cache, 0 to disable the cache",
+                            type=int, default=256)
+        parser.add_argument("--cache-bytes", help="Size in bytes of the query results to cache", type=int,
+                            default=1 << 20)
+        parser.add_argument("--include", help="Only index files matching one of these globs, e.g. 'docs/*' or "
+                                              "'*_2024.txt'", nargs="+", type=str, default=[])
+        parser.add_argument("--exclude", help="Skip files and directories matching one of these globs, e.g. '.git' or "
+                                              "'*.min.txt'", nargs="+", type=str, default=[])
+        parser.add_argument("--max-file-size", help="Skip files larger than this number of bytes", type=int,
+                            default=None)
+        parser.add_argument("--encoding", help="Encoding of the files", type=str, default="utf-8")
+        parser.add_argument("--encoding-errors", help="What to do with bytes that are not valid in --encoding",
+                            type=str, choices=ENCODING_ERRORS, default="replace")
+        parser.add_argument("--compact-terms", action="store_true",
+                            help="Intern the indexed words into one buffer once loaded, to save memory on large "
+                                 "vocabularies")
+        loading = parser.add_mutually_exclusive_group()
+        loading.add_argument("--wait-for-index", action="store_true",
+                             help="Load the index before showing the prompt, instead of in the background when the "
+                                  "input is a terminal")
+        loading.add_argument("--index-in-background", action="store_true",
+                             help="Load the index in the background even when the input is not a terminal, so piped "
+                                  "queries may be answered from part of the files")
+        parser.add_argument("--profile", help="Time every stage of indexing and searching, and write the timings at "
+                                              "exit: as JSON to the given file, or as text to stderr", nargs="?",
+                            const="-", type=str, default=None)
+        parser.add_argument("--trace-memory", action="store_true",
+                            help="Trace memory allocations with tracemalloc and snapshot them once the index is loaded")
+
+        return parser
+
+    @staticmethod
+    def parse_args() -> Namespace:
+        return SimpleSearch.argument_parser().parse_args()
 
-        return parser.parse_args()
+    @classmethod
+    def from_args(cls, args: Namespace, tokenizer: Tokenizer) -> 'SimpleSearch':
+        return cls(path=args.path, valid_extensions=['txt'], tokenizer=tokenizer, workers=args.workers,
+                   hash_files=args.hash_files, ranker=args.ranker, positions=args.positions,
+                   cache_entries=args.cache_entries, cache_bytes=args.cache_bytes, max_expansions=args.max_expansions,
+                   include=args.include, exclude=args.exclude, max_file_size=args.max_file_size, encoding=args.encoding,
+                   encoding_errors=args.encoding_errors, compact_terms=args.compact_terms,
+                   fuzzy=args.fuzzy, deduplicate=args.dedup)
 
     def clear_database(self) -> None:
-        self._database = Database()
-        self._database_files = list()
+        database: Database = Database(positions=self.positions, max_expansions=self.max_expansions)
+        with self._lock:
+            self._database, self._document_registry = database, DocumentRegistry()
+            self._generation += 1
 
-    def load_directory_into_database(self) -> None:
+    def load_database(self, index_filename: str or None = None) -> None:
+        """
+        Open index_filename when given and present, otherwise index the directory (and save it to index_filename).
+        """
+        if index_filename and os.path.exists(index_filename):
+            try:
+                self.open_index(index_filename)
+                print("{} files read from index {}".format(len(self.database_files), index_filename))
+                if self.reload_database():
+                    self.save_index(index_filename)
+                return
+            except IndexFileError as e:
+                print("{}, rebuilding it".format(e.message))
+
+        self.load_directory_into_database()
+        if index_filename:
+            self.save_index(index_filename)
+
+    def load_database_in_background(self, index_filename: str or None = None) -> None:
+        """
+        Run load_database() in a background thread and return at once. Queries are answered meanwhile, against the
+        files indexed so far: see coverage.
+        """
+        if self.is_loading:
+            raise RuntimeError("The database is already being loaded.")
+
+        self._loading_error = None
+        self._files_to_index, self._files_indexed = None, 0
+        self._loading = True
+        self._loading_thread = threading.Thread(target=self._load_database_in_background, args=(index_filename,),
+                                                name="indexing", daemon=True)
+        self._loading_thread.start()
+
+    def _load_database_in_background(self, index_filename: str or None) -> None:
         try:
-            files_in_dir: list[str] = os.listdir(self.path)
-        except FileNotFoundError as e:
-            raise e
+            self.load_database(index_filename)
+            INSTRUMENTATION.snapshot_memory("loading the index")
+        except Exception as e:
+            self._loading_error = e
+        finally:
+            with self._lock:
+                self.database.defer_term_dictionary(False)
+                self._loading = False
+
+    def wait_until_loaded(self, timeout: float or None = None) -> bool:
+        """
+        Returns whether loading is over.
+        """
+        if self._loading_thread is not None:
+            self._loading_thread.join(timeout)
+        return not self.is_loading
+
+    def open_index(self, index_filename: str) -> None:
+        """
+        The Database, registry and ranker are replaced together under the lock, so a query running meanwhile sees the
+        index either before or after.
+        """
+        index: MappedIndex = MappedIndex(index_filename)
+        if os.path.realpath(index.path) != os.path.realpath(self.path):
+            index.close()
+            raise IndexFileError(index_filename, "it was built for directory {}".format(index.path))
+        if index.has_positions != self.positions:
+            index.close()
+            raise IndexFileError(index_filename, "it was built {} positions".format(
+                "with" if index.has_positions else "without"))
+
+        database: Database = Database(base=index, positions=self.positions, max_expansions=self.max_expansions)
+        document_registry: DocumentRegistry = DocumentRegistry(index.filenames, index.metadata, index.duplicates)
+        with self._lock:
+            self._database, self._document_registry = database, document_registry
+            self._ranker.prepare(self.database)
+            self._generation += 1
+
+    def save_index(self, index_filename: str) -> None:
+        write_index_file(index_filename, self.path, self.document_registry, self.database)
+
+    def reload_database(self) -> int:
+        """
+        Bring the Database up to date with the directory without rebuilding it. Files are compared against the
+        metadata they were indexed with: removed files get their doc id deleted, new files are indexed, and modified
+        ones (other size or mtime, and other content hash when hash_files is set) are deleted and indexed again under a
+        new doc id, or the one of a file with their new content when deduplicating. Unchanged files are only stat'ed, so
+        the cost is driven by the bytes that changed.
+        Returns the number of files added, modified or removed.
+        """
+        valid_files: list[str] = self.list_files()
+        self._files_to_index, self._files_indexed, self._prepared_files = len(valid_files), 0, 0
+        removed_files: set[str] = set(self.database_files).difference(valid_files)
+        with self._lock:
+            for filename in removed_files:
+                self.remove_file(filename)
+
+        added_count, modified_count = 0, 0
+        for filename in valid_files:
+            self._files_indexed += 1
+            self.prepare_while_loading()
+            if filename not in self.document_registry:
+                added_count += 1
+            else:
+                try:
+                    modified: bool = self.is_modified(filename)
+                except OSError as e:
+                    # removed or made unreadable since it was crawled
+                    print("ignoring file {}: {}".format(filename, e.strerror))
+                    with self._lock:
+                        self.remove_file(filename)
+                    removed_files.add(filename)
+                    continue
+                if not modified:
+                    continue
+                with self._lock:
+                    self.remove_file(filename)
+                modified_count += 1
+            self.dump_file_to_database(filename)
+
+        print("{} files added, {} modified, {} removed".format(added_count, modified_count, len(removed_files)))
+        if self.deduplicate:
+            print(self.deduplication_report())
+        with self._lock:
+            if modified_count or removed_files:
+                self.database.compact()
+            if self.compact_terms:
+                self.database.intern_terms()
+            if self.fuzzy:
+                self.database.prepare_fuzzy_expand()
+            self._ranker.prepare(self.database)
+            self._generation += 1
+        return added_count + modified_count + len(removed_files)
+
+    def is_modified(self, filename: str) -> bool:
+        known_metadata: FileMetadata or None = self.document_registry.get_metadata(filename)
+        file_path: str = os.path.join(self.path, filename)
+        metadata: FileMetadata = FileMetadata.from_file(file_path)
+        if known_metadata is None:
+            return True
+        if (known_metadata.mtime_ns, known_metadata.size) == (metadata.mtime_ns, metadata.size):
+            return False
+        if not self.hash_files or known_metadata.content_hash is None or known_metadata.size != metadata.size:
+            return True
+
+        metadata = metadata._replace(content_hash=FileMetadata.hash_file(file_path))
+        if metadata.content_hash != known_metadata.content_hash:
+            return True
+
+        self.document_registry.update_metadata(filename, metadata)
+        return False
+
+    def list_files(self) -> list[str]:
+        """
+        Paths, relative to path, of the files to index in the whole directory tree, as found by the crawler.
+        Raises FileNotFoundError when path does not exist.
+        """
+        return [crawled_file.path for crawled_file in self.crawler.crawl()]
 
+    @timed("index_directory")
+    def load_directory_into_database(self) -> None:
+        files_in_dir: list[str] = self.list_files()
         print("{} files in directory {}".format(len(files_in_dir), self.path))
+        if self.crawler.stats.skipped:
+            print("crawled {}".format(self.crawler.stats))
+        self.load_files(files_in_dir)
+        if self.deduplicate:
+            print(self.deduplication_report())
 
-        for filename in files_in_dir:
-            self.dump_file_to_database(filename)
+    def load_files(self, filenames: list[str]) -> None:
+        """
+        Index filenames, relative to path, in that order.
+        """
+        self._files_to_index, self._files_indexed, self._prepared_files = len(filenames), 0, 0
+        if self.workers > 1:
+            self.load_files_in_parallel(filenames)
+        else:
+            for filename in filenames:
+                self.dump_file_to_database(filename)
+                self._files_indexed += 1
+                self.prepare_while_loading()
+
+        with self._lock:
+            if self.compact_terms:
+                self.database.intern_terms()
+            if self.fuzzy:
+                self.database.prepare_fuzzy_expand()
+            self._ranker.prepare(self.database)
+            self._generation += 1
+
+    @timed("index_in_parallel")
+    def load_files_in_parallel(self, filenames: list[str]) -> None:
+        """
+        Doc ids are assigned here, in the order of filenames, before any file is read. Workers get contiguous batches of
+        (doc_id, filename, whether to hash it) and return a partial Database for them, with the content hashes
+        computed while indexing; merging the partials in batch order only appends to the posting lists, and the
+        resulting index is the same one a single process would build. When deduplicating, the files with the size of
+        another one are hashed here first, to know whether to index them.
+        Workers are forked, unless other threads are running (like when loading in the background), which forking
+        would copy in whatever state they are: they are spawned then. Files removed or made unreadable since they were
+        crawled are skipped, as in dump_file_to_database.
+        """
+        valid_filenames: list[str] = [filename for filename in filenames if self.is_valid_file(filename)]
+        sizes: Counter or None = None
+        if self.deduplicate:
+            sizes = Counter()
+            for filename in valid_filenames:
+                try:
+                    sizes[os.path.getsize(os.path.join(self.path, filename))] += 1
+                except OSError:
+                    pass  # reported when reading its metadata below
+        batch: list[tuple[DocId, str, bool]] = list()
+        metadata_by_filename: dict[str, FileMetadata] = dict()
+        for filename in valid_filenames:
+            try:
+                metadata: FileMetadata = self.get_file_metadata(filename, sizes)
+            except OSError as e:
+                print("ignoring file {}: {}".format(filename, e.strerror))
+                self._files_indexed += 1
+                continue
+            with self._lock:
+                doc_id: DocId or None = self.register_file(filename, metadata)
+            if doc_id is None:
+                self._files_indexed += 1
+            else:
+                batch.append((doc_id, filename, self.hash_files and metadata.content_hash is None))
+                metadata_by_filename[filename] = metadata
+        if not batch:
+            return
+
+        batch_size: int = -(-len(batch) // (self.workers * self.BATCHES_PER_WORKER))
+        batches: list[list[tuple[DocId, str, bool]]] = [batch[i:i + batch_size]
+                                                        for i in range(0, len(batch), batch_size)]
+        can_fork: bool = threading.active_count() == 1 and "fork" in multiprocessing.get_all_start_methods()
+        start_method: str = "fork" if can_fork else "spawn"
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 mp_context=multiprocessing.get_context(start_method)) as executor:
+            partial_indexes = executor.map(SimpleSearch.index_batch,
+                                           [self.path] * len(batches), [self.tokenizer] * len(batches), batches,
+                                           [self.positions] * len(batches), [self.file_reader] * len(batches))
+            for (partial_database, content_hashes, unread_filenames), indexed_batch in zip(partial_indexes, batches):
+                with self._lock:
+                    self._database.merge(partial_database)
+                    for filename, content_hash in content_hashes.items():
+                        self.document_registry.update_metadata(
+                            filename, metadata_by_filename[filename]._replace(content_hash=content_hash))
+                    for filename in unread_filenames:
+                        self.remove_file(filename)
+                    self._generation += 1
+                self._files_indexed += len(indexed_batch)
+                self.prepare_while_loading()
+
+    def prepare_while_loading(self) -> None:
+        """
+        Prepare the ranker for the files indexed so far when loading in the background, once their number grew by
+        PREPARE_GROWTH since the last time: preparing is O(documents), so doing it on every query or after every file
+        would be quadratic. Queries rank the documents indexed in between against the statistics prepared last.
+        The term dictionary of wildcard and fuzzy lookups, O(terms log terms) to build, is refreshed at the same time.
+        """
+        if self.is_loading and self._files_indexed >= self._prepared_files * (1 + self.PREPARE_GROWTH):
+            with self._lock:
+                self._ranker.prepare(self.database)
+                self.database.defer_term_dictionary(True)
+                self.database.refresh_term_dictionary()
+            self._prepared_files = self._files_indexed
 
+    @staticmethod
+    def index_batch(path: str, tokenizer: Tokenizer, batch: list[tuple[DocId, str, bool]], positions: bool = False,
+                    file_reader: FileReader or None = None) -> tuple[Database, dict[str, bytes], list[str]]:
+        """
+        Partial Database of the (doc_id, filename, hash_content) of batch, the content hash of the files hashed, and the
+        files that could not be read.
+        """
+        file_reader = file_reader or FileReader()
+        simple_search: SimpleSearch = SimpleSearch(path=path, valid_extensions=[], tokenizer=tokenizer,
+                                                   positions=positions, encoding=file_reader.encoding,
+                                                   encoding_errors=file_reader.errors)
+        content_hashes: dict[str, bytes] = dict()
+        unread_filenames: list[str] = list()
+        for doc_id, filename, hash_content in batch:
+            try:
+                content_hash: bytes or None = simple_search.index_file(doc_id, filename, hash_content)
+                if content_hash is not None:
+                    content_hashes[filename] = content_hash
+            except OSError as e:
+                print("ignoring file {}: {}".format(filename, e.strerror))
+                unread_filenames.append(filename)
+
+        return simple_search.database, content_hashes, unread_filenames
+
+    @timed("dump_file_to_database")
     def dump_file_to_database(self, filename: str) -> None:
-        if not self.get_file_extension(filename) in self.valid_extensions:
-            print("ignoring file {}: not a valid extension".format(filename))
+        if not self.is_valid_file(filename):
             return
 
-        self.database_files.append(filename)
+        with self._lock:
+            try:
+                metadata: FileMetadata = self.get_file_metadata(filename)
+                doc_id: DocId or None = self.register_file(filename, metadata)
+                if doc_id is not None:
+                    content_hash: bytes or None = self.index_file(doc_id, filename,
+                                                                  self.hash_files and metadata.content_hash is None)
+                    if content_hash is not None:
+                        self.document_registry.update_metadata(filename, metadata._replace(content_hash=content_hash))
+            except OSError as e:
+                # removed or made unreadable since it was crawled
+                print("ignoring file {}: {}".format(filename, e.strerror))
+                if filename in self.document_registry:
+                    self.remove_file(filename)
+                return
+            finally:
+                self._generation += 1
+        INSTRUMENTATION.count("indexed_bytes" if doc_id is not None else "deduplicated_bytes", metadata.size)
+
+    def register_file(self, filename: str, metadata: FileMetadata) -> DocId or None:
+        """
+        Doc id to index filename under. None when deduplicating and a file with the same content is registered
+        already: filename then shares its doc id, and has nothing to index.
+        """
+        if self.deduplicate:
+            doc_id: DocId or None = self.document_registry.find_content(metadata.content_hash)
+            if doc_id is not None:
+                self.document_registry.add_duplicate(doc_id, filename, metadata)
+                return None
+        return self.document_registry.register(filename, metadata)
+
+    def remove_file(self, filename: str) -> None:
+        """
+        Its doc id is only deleted from the Database with the last file sharing it.
+        """
+        doc_id: DocId or None = self.document_registry.remove(filename)
+        if doc_id is not None:
+            self.database.remove(doc_id)
+
+    def get_file_metadata(self, filename: str, sizes: Counter or None = None) -> FileMetadata:
+        """
+        Only files of the same size can have the same content: when deduplicating, the content hash of filename is
+        computed here if a file of its size is registered, or appears more than once in sizes, to know whether to index
+        it. Other files are hashed while they are indexed, see index_file().
+        """
         file_path: str = os.path.join(self.path, filename)
-        with open(file_path, mode="r") as f:
-            for line in f:
-                self.fill_database(filename, line)
+        metadata: FileMetadata = FileMetadata.from_file(file_path)
+        if self.deduplicate and (self.document_registry.has_size(metadata.size)
+                                 or (sizes is not None and sizes[metadata.size] > 1)):
+            metadata = metadata._replace(content_hash=FileMetadata.hash_file(file_path))
+        return metadata
+
+    @timed("index_file")
+    def index_file(self, doc_id: DocId, filename: str, hash_content: bool = False) -> bytes or None:
+        """
+        The file is streamed in chunks by the FileReader, so memory does not grow with its size. With hash_content, the
+        chunks are hashed on the way, and the content hash is returned.
+        """
+        content_hash: 'hashlib.blake2b' or None = FileMetadata.content_hasher() if hash_content else None
+        chunks: Iterator[str] = self.file_reader.iter_chunks(os.path.join(self.path, filename), content_hash)
+        for token in self.tokenizer.iter_chunk_tokens(chunks):
+            self._database.add(token, doc_id)
+        return None if content_hash is None else content_hash.digest()
+
+    def is_valid_file(self, filename: str) -> bool:
+        if not self.get_file_extension(filename) in self.valid_extensions:
+            print("ignoring file {}: not a valid extension".format(filename))
+            return False
+
+        return True
 
     @staticmethod
     def get_file_extension(filename: str) -> str or None:
-        extension: str = filename.split(".")[-1]
-        if filename == extension:
-            return None
-        return extension
+        return get_file_extension(filename)
+
+    @timed("fill_database")
+    def fill_database(self, doc_id: DocId, line: str) -> None:
+        """
+        Index the tokens of line under doc_id, positions included when enabled. Files are streamed by index_file
+        instead, so this stage is only timed for text added this way.
+        """
+        for token in self.tokenizer.iter_tokens(raw_string=line):
+            self._database.add(token, doc_id)
+        self._generation += 1
 
-    def fill_database(self, absolute_path: str, line: str) -> None:
-        for token in self.tokenizer.get_tokens(raw_string=line):
-            self._database.add(token, absolute_path)
+    def find_files(self, token: str) -> set[str]:
+        return {filename for doc_id in self.database.find_doc_ids(token)
+                for filename in self.document_registry.get_filenames(doc_id)}
 
     def interact(self, search_scanner: Scanner) -> None:
         query_string: str = search_scanner.read_input_as_string()
         while not search_scanner.is_exit_statement(query_string):
-            tokens: set[str] = self.get_query_tokens(query_string)
-            hits_df: pd.DataFrame = self.get_search_hits_as_dataframe(tokens)
-            self.report_results(
-                self.rank_dataframe_search_hits(hits_df))
+            if search_scanner.is_reload_statement(query_string):
+                if self.is_loading:
+                    print("still indexing, reload once it is done")
+                else:
+                    self.reload_database()
+            elif search_scanner.is_stats_statement(query_string):
+                print(self.stats_report())
+            else:
+                try:
+                    self.report_results(self.search(query_string))
+                except QueryParseError as e:
+                    print(e.message)
+                self.report_coverage()
             query_string = search_scanner.read_input_as_string()
 
+    def report_coverage(self) -> None:
+        """
+        Tell results are partial while loading in the background, or why loading failed.
+        """
+        if self.loading_error is not None:
+            print("indexing failed: {}".format(self.loading_error))
+        elif self.is_loading:
+            files_indexed, files_to_index = self.coverage
+            if files_to_index is None:
+                print("indexed {:,} files so far, still looking for files".format(files_indexed))
+            else:
+                print("indexed {:,} / {:,} files so far".format(files_indexed, files_to_index))
+
+    def deduplication_report(self) -> str:
+        """
+        What indexing the duplicates of other files would have added: their bytes, read only to be hashed, and the
+        tokens and postings of their content.
+        """
+        duplicates, saved_bytes, saved_tokens, saved_postings = 0, 0, 0, 0
+        for doc_id, _, metadata in self.document_registry.duplicates():
+            duplicates += 1
+            saved_bytes += metadata.size if metadata is not None else 0
+            saved_tokens += self.database.get_document_length(doc_id)
+            saved_postings += self.database.get_document_terms(doc_id)
+        indexed_postings: int = sum(self.database.get_document_terms(doc_id)
+                                    for doc_id in self.document_registry.doc_ids())
+        return "{:,} duplicate files not indexed: {:,} bytes, {:,} tokens and {:,} postings saved ({:.1f}% of the " \
+               "postings)".format(duplicates, saved_bytes, saved_tokens, saved_postings,
+                                  100 * saved_postings / max(indexed_postings + saved_postings, 1))
+
+    def stats_report(self) -> str:
+        return "{}\nresult cache: {}".format(self.instrumentation.report(), self.result_cache.stats)
+
+    @timed("get_query_tokens")
     def get_query_tokens(self, query_string: str) -> set[str]:
         if not self.tokenizer:
             raise ValueError("Tokenizer must be set to get tokens from query.")
 
-        return self.tokenizer.get_tokens(query_string)
+        return self.tokenizer.get_query_tokens(query_string)
+
+    @timed("search")
+    def search(self, query_string: str, top_n_rows: int = RANK_RESULT_LIMIT) -> list[SearchResult]:
+        """
+        Queries with AND, OR, NOT, parentheses or quoted phrases are evaluated as boolean queries, anything else is a
+        bag of words ranked by rank_search_hits, the only ones matched with typos when fuzzy is set. Raises
+        QueryParseError on malformed boolean queries.
+        """
+        with self._lock if self.is_loading else nullcontext():
+            if not QueryParser.is_boolean_query(query_string):
+                return self.rank_search_hits(self.get_query_tokens(query_string), top_n_rows)
+
+            query: QueryNode or None = QueryParser(self.tokenizer).parse(query_string)
+            if has_near(query) and not self.database.has_positions:
+                raise QueryParseError(query_string, "NEAR needs an index built with positions")
+            return self.rank_boolean_query(query, top_n_rows)
+
+    @timed("rank_boolean_query")
+    def rank_boolean_query(self, query: QueryNode or None, top_n_rows: int = RANK_RESULT_LIMIT,
+                           document_frequencies: dict[str, int] or None = None) -> list[SearchResult]:
+        """
+        Only the documents matching query are ranked, scored by the ranker against the tokens not under a NOT.
+        document_frequencies overrides the ones of the Database, see rank_search_hits.
+        """
+        if query is None:
+            return []
+
+        key: tuple = (query, self._ranker_name, top_n_rows, frequencies_key(document_frequencies))
+        results: list[SearchResult] or None = self.result_cache.get(key, self.generation)
+        if results is not None:
+            return results
+
+        evaluator: QueryEvaluator = QueryEvaluator(self.database,
+                                                   self.document_registry.doc_ids())
+
+        candidates: np.ndarray = np.array(evaluator.evaluate(query), dtype=np.uint32)
+        scored_documents: list[ScoredDocument] = self._ranker.rank(self.database, positive_tokens(query), top_n_rows,
+                                                                   candidates, document_frequencies) \
+            if len(candidates) else []
+        results = self.to_search_results(scored_documents)
+        self.result_cache.put(key, results, self.generation)
+        return results
+
+    @timed("rank_search_hits")
+    def rank_search_hits(self, query_tokens: set[str], top_n_rows: int = RANK_RESULT_LIMIT,
+                         document_frequencies: dict[str, int] or None = None) -> list[SearchResult]:
+        """
+        Rank files against the query tokens, visiting only the doc ids in the posting lists of those tokens.
+        Returns up to top_n_rows (filename, rank) tuples, best first, same ranks as rank_dataframe_search_hits.
+        Results are cached by token set, so queries differing only in case, punctuation or word order are computed once.
+        document_frequencies, the number of documents containing each token in the whole collection, replaces the ones
+        of the Database when it only holds a shard of it.
+        With fuzzy set, tokens also match the terms a few typos away from them, see fuzzy_expansions(): results are
+        only cached when the expansions completed within the time limit.
+        """
+        key: tuple = (frozenset(query_tokens), self._ranker_name, top_n_rows, frequencies_key(document_frequencies))
+        results: list[SearchResult] or None = self.result_cache.get(key, self.generation)
+        if results is not None:
+            return results
+
+        expansions, complete = self.fuzzy_expansions(query_tokens) if self.fuzzy else (None, True)
+        scored_documents: list[ScoredDocument] = self._ranker.rank(self.database, query_tokens, top_n_rows,
+                                                                   document_frequencies=document_frequencies,
+                                                                   expansions=expansions)
+        results = self.to_search_results(scored_documents)
+        if complete:
+            self.result_cache.put(key, results, self.generation)
+        return results
+
+    @timed("fuzzy_expansions")
+    def fuzzy_expansions(self, query_tokens: set[str]) -> tuple[Expansions, bool]:
+        """
+        Terms of the Database each query token matches when allowing for typos: up to fuzzy edits, fewer for short
+        tokens (see max_edits). The lookups of all tokens share FUZZY_TIME_LIMIT seconds; returns whether they all
+        completed within it.
+        """
+        deadline: float = time.perf_counter() + self.FUZZY_TIME_LIMIT
+        expansions: Expansions = dict()
+        complete: bool = True
+        for token in sorted(query_tokens):
+            expansions[token], token_complete = self.database.fuzzy_expand(token, max_edits(token, self.fuzzy),
+                                                                           deadline)
+            complete = complete and token_complete
+        if not complete:
+            INSTRUMENTATION.count("fuzzy_timeouts")
+        return expansions, complete
+
+    def to_search_results(self, scored_documents: list[ScoredDocument]) -> list[SearchResult]:
+        """
+        A result per file of every scored doc id: files with the same content all show up, with the same score.
+        """
+        return [(filename, rank) for doc_id, rank in scored_documents
+                for filename in self.document_registry.get_filenames(doc_id)]
+
+    def document_frequencies(self, query_tokens: set[str]) -> dict[str, int]:
+        """
+        Number of documents containing each token, or any term matching it for wildcard patterns.
+        """
+        frequencies: dict[str, int] = dict()
+        for token in query_tokens:
+            postings: PostingList or None = self.database.find(token)
+            frequencies[token] = len(postings) if postings else 0
+        return frequencies
 
+    # the dataframe API is not on the query path of search(), this stage only times direct calls
+    @timed("get_search_hits_as_dataframe")
     def get_search_hits_as_dataframe(self, query_tokens: set[str]) -> 'pd.DataFrame':
         """
         Build a dict that can be converted to a DataFrame. It relies on the order of files returned when calling
-        self.database_files, that's why it's important it is a list() and not a set().
+        self.database_files, that's why it's important it is a list() and not a set(): files are listed in the order
+        of their doc ids in the Database posting lists.
         Example. Having:
             self.database_files = ['f1.txt', 'f2.txt', 'f3.txt'],
             'token1' being inside f1.txt,
@@ -119,20 +818,25 @@ class SimpleSearch:
         f2.txt         0       1       1
         f3.txt         0       0       1
 
-        Cost of this function in time is: O(n_tokens * n_files)
+        Cost of this function in time is: O(n_tokens * n_files). interact() relies on rank_search_hits instead, which
+        only visits matching doc ids.
         """
+        import pandas as pd  # only needed here, and slow to import: it is not loaded before the first call
+
         df_dict: [str, list[str]] = defaultdict(list)
         for token in query_tokens:
-            matching_files: SetDictionary = self.database.find(token)
-            if not matching_files:
+            postings: PostingList or None = self.database.find(token)
+            if not postings:
                 df_dict[token] = len(self.database_files) * [0]
             else:
-                for file in self.database_files:
-                    df_dict[token].append(int(file in matching_files))
+                matching_doc_ids: set[DocId] = set(postings)
+                for doc_id, _ in self.document_registry.items():
+                    df_dict[token].append(int(doc_id in matching_doc_ids))
 
         return pd.DataFrame(df_dict, index=self.database_files, columns=df_dict.keys())
 
     @staticmethod
+    @timed("rank_dataframe_search_hits")
     def rank_dataframe_search_hits(df: 'pd.DataFrame', top_n_rows: int = RANK_RESULT_LIMIT) -> 'pd.DataFrame':
         df = df[(df.T != 0).any()].copy()  # filtering files that didn't make any hit
         df['rank'] = round(df.sum(axis=1) / len(df.columns) * 100)  # simple rank function: hits(file) / #n_words
@@ -140,22 +844,61 @@ class SimpleSearch:
 
         return df['rank'].head(top_n_rows)
 
-    @staticmethod
-    def report_results(df: 'pd.Dataframe') -> None:
-        if df.empty:
+    @timed("report_results")
+    def report_results(self, results: list[SearchResult]) -> None:
+        if not results:
             print("no matches found")
             return
 
-        for file in df.index:
-            print("{}: {}%".format(file, int(df.at[file])))
+        for file, rank in results:
+            print("{}: {}".format(file, self._ranker.format_score(rank)))
+
+
+def frequencies_key(document_frequencies: dict[str, int] or None) -> frozenset or None:
+    return None if document_frequencies is None else frozenset(document_frequencies.items())
+
+
+def loads_in_background(args: Namespace) -> bool:
+    """
+    Only interactive sessions load in the background by default: piped queries would be answered before the files
+    they look for are indexed.
+    """
+    return args.index_in_background or (not args.wait_for_index and sys.stdin.isatty())
+
+
+def dump_profile(profile: str) -> None:
+    if profile == "-":
+        print(INSTRUMENTATION.report(), file=sys.stderr)
+        return
+    with open(profile, mode="w") as f:
+        json.dump(INSTRUMENTATION.as_dict(), f, indent=2)
 
 
 if __name__ == "__main__":
     args: Namespace = SimpleSearch.parse_args()
     t: Tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter=" ")
 
-    simple_search: SimpleSearch = SimpleSearch(path=args.path, valid_extensions=['txt'], tokenizer=t)
-    simple_search.load_directory_into_database()
-
-    scanner: Scanner = Scanner(exit_word=":quit", prompt="search> ")
-    simple_search.interact(scanner)
+    simple_search: SimpleSearch = SimpleSearch.from_args(args, t)
+    if args.profile is not None:
+        INSTRUMENTATION.enabled = True
+        atexit.register(dump_profile, args.profile)
+    if args.trace_memory:
+        INSTRUMENTATION.start_tracing_memory()
+
+    if args.queries is None:
+        if loads_in_background(args):
+            simple_search.load_database_in_background(args.index_file)
+        else:
+            simple_search.load_database(args.index_file)
+            INSTRUMENTATION.snapshot_memory("loading the index")
+        scanner: Scanner = Scanner(exit_word=":quit", prompt="search> ")
+        simple_search.interact(scanner)
+    else:
+        # stdout only gets the JSON lines of the results in batch mode
+        with redirect_stdout(sys.stderr):
+            simple_search.load_database(args.index_file)
+        INSTRUMENTATION.snapshot_memory("loading the index")
+        with sys.stdin if args.queries == "-" else open(args.queries, mode="r") as f:
+            report: LatencyReport = run_batch(simple_search, read_queries(f), sys.stdout, args.query_workers,
+                                              args.query_processes)
+        print(report, file=sys.stderr)
@@ -0,0 +1,115 @@
+import re
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from re import Pattern
+from typing import Iterable
+
+from fuzzy_index import NGramIndex
+
+WILDCARD: str = "*"
+LAST_CHARACTER: str = chr(0x10FFFF)
+
+
+def is_wildcard_pattern(term: str) -> bool:
+    return WILDCARD in term
+
+
+class ReversedTerms(Sequence):
+    """
+    Terms reversed, in the order of their positions in order.
+    """
+
+    def __init__(self, terms: Sequence[str], order: array) -> None:
+        self._terms = terms
+        self._order = order
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __getitem__(self, position: int) -> str:
+        return self._terms[self._order[position]][::-1]
+
+
+class TermDictionary:
+    """
+    Every term of a Database, sorted, along with the positions of the terms sorted by their reverse. Terms beginning
+    with a prefix are a contiguous range of the first list and terms ending with a suffix a contiguous range of the
+    second one, so both are found by binary search in O(log V + matches). Reversed terms are not kept, only their order
+    as 4 bytes per term.
+
+    Terms given already sorted are kept as given, which lets the terms of a CompactDictionary stay interned (see
+    InternedTerms): nothing holds a str per term then.
+
+    A pattern like "h*o" takes the smallest of the ranges of its prefix ("h") and its suffix ("o"), and only the
+    terms in it are matched against the whole pattern.
+
+    Terms close to a misspelled word are found through an NGramIndex, built on the first fuzzy lookup.
+    """
+
+    def __init__(self, terms: Iterable[str], is_sorted: bool = False) -> None:
+        self._terms: Sequence[str] = terms if is_sorted else sorted(terms)
+        self._reversed_order: array = array('I', sorted(range(len(self._terms)),
+                                                        key=lambda position: self._terms[position][::-1]))
+        self._reversed_terms: ReversedTerms = ReversedTerms(self._terms, self._reversed_order)
+        self._ngram_index: NGramIndex or None = None
+
+    @property
+    def ngram_index(self) -> NGramIndex:
+        if self._ngram_index is None:
+            self._ngram_index = NGramIndex(self._terms)
+        return self._ngram_index
+
+    @staticmethod
+    def _range(sorted_terms: Sequence[str], prefix: str) -> tuple[int, int]:
+        return bisect_left(sorted_terms, prefix), bisect_left(sorted_terms, prefix + LAST_CHARACTER)
+
+    def with_prefix(self, prefix: str, limit: int or None = None) -> list[str]:
+        start, end = self._range(self._terms, prefix)
+        return self._terms[start:end if limit is None else min(end, start + limit)]
+
+    def with_suffix(self, suffix: str, limit: int or None = None) -> list[str]:
+        start, end = self._range(self._reversed_terms, suffix[::-1])
+        end = end if limit is None else min(end, start + limit)
+        return sorted(self._terms[position] for position in self._reversed_order[start:end])
+
+    def expand(self, pattern: str, limit: int or None = None) -> list[str]:
+        """
+        Sorted terms matching pattern, where every "*" stands for any number of characters. At most limit terms are
+        returned, the first ones found, to bound the cost of patterns matching a large part of the dictionary.
+        """
+        if not is_wildcard_pattern(pattern):
+            return [pattern] if pattern in self else []
+
+        prefix: str = pattern[:pattern.index(WILDCARD)]
+        suffix: str = pattern[pattern.rindex(WILDCARD) + 1:]
+        if pattern == prefix + WILDCARD:
+            return self.with_prefix(prefix, limit)
+        if pattern == WILDCARD + suffix:
+            return self.with_suffix(suffix, limit)
+
+        start, end = self._range(self._terms, prefix)
+        reversed_start, reversed_end = self._range(self._reversed_terms, suffix[::-1])
+        if end - start <= reversed_end - reversed_start:
+            candidates: Iterable[str] = self._terms[start:end]
+        else:
+            candidates = (self._terms[position] for position in self._reversed_order[reversed_start:reversed_end])
+
+        matcher: Pattern = re.compile(".*".join(re.escape(piece) for piece in pattern.split(WILDCARD)), re.DOTALL)
+        matches: list[str] = list()
+        for term in candidates:
+            if limit is not None and len(matches) >= limit:
+                break
+            if matcher.fullmatch(term):
+                matches.append(term)
+        return sorted(matches)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, term: str) -> bool:
+        position: int = bisect_left(self._terms, term)
+        return position < len(self._terms) and self._terms[position] == term
+
+    def __iter__(self):
+        return iter(self._terms)
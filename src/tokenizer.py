@@ -1,11 +1,22 @@
 import re
+from re import Pattern
+from typing import Iterable, Iterator, TextIO
+
 from regex_catalog import RegexCatalog
+from term_dictionary import WILDCARD
+
+READ_CHUNK_SIZE: int = 1 << 20
+# longest token carried over from a chunk to the next one, past which it is split where the chunk ends
+MAX_TOKEN_LENGTH: int = 1 << 16
 
 
 class Tokenizer:
     def __init__(self, regex: str, word_delimiter: str) -> None:
         self._regex = regex
         self._word_delimiter = word_delimiter
+        self._pattern: Pattern = RegexCatalog.get_pattern(regex, flags=re.IGNORECASE)
+        # when the delimiter can be part of a token, splitting on it first changes the tokens found
+        self._split_on_delimiter: bool = self._pattern.search(word_delimiter) is not None
 
     @property
     def regex(self) -> str:
@@ -16,14 +27,98 @@ class Tokenizer:
         return self._word_delimiter
 
     def get_tokens(self, raw_string: str) -> set[str]:
-        tokens: set[str] = set()
-        for word in raw_string.split(self.word_delimiter):
-            [tokens.add(token.lower()) for token in self.tokenize_word(word) if token]
+        return set(self.iter_tokens(raw_string))
 
+    def iter_tokens(self, raw_string: str) -> Iterator[str]:
+        """
+        Yield the lowercase tokens of raw_string, repeated ones included, scanning it once with the compiled pattern.
+        """
+        if self._split_on_delimiter:
+            for word in raw_string.split(self.word_delimiter):
+                for token in self.tokenize_word(word):
+                    yield token.lower()
+        elif raw_string.isascii():
+            yield from self._pattern.findall(raw_string.lower())
+        else:
+            # lowercasing non ascii text first can change what the pattern matches, e.g. 'İ' becomes 'i̇'
+            for token in self._pattern.findall(raw_string):
+                yield token.lower()
+
+    def get_query_tokens(self, query_string: str) -> set[str]:
+        """
+        Tokens of a plain query. Words with wildcards are kept as patterns, to be expanded by the Database into the
+        terms matching them.
+        """
+        if WILDCARD not in query_string:
+            return self.get_tokens(query_string)
+
+        tokens: set[str] = set()
+        for word in query_string.split():
+            pattern: str or None = self.get_wildcard_pattern(word)
+            if pattern is None:
+                tokens.update(self.iter_tokens(word))
+            else:
+                tokens.add(pattern)
         return tokens
 
+    def get_wildcard_pattern(self, word: str) -> str or None:
+        """
+        Lowercase pattern of a word with "*" wildcards, e.g. "Hel*" becomes "hel*". None if word has no wildcards, only
+        has wildcards, or if any piece between them is more than one token.
+        """
+        if WILDCARD not in word:
+            return None
+
+        pieces: list[str] = list()
+        for piece in word.split(WILDCARD):
+            tokens: list[str] = list(self.iter_tokens(piece))
+            if len(tokens) > 1:
+                return None
+            pieces.append(tokens[0] if tokens else "")
+        return WILDCARD.join(pieces) if any(pieces) else None
+
+    def iter_file_tokens(self, f: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[str]:
+        """
+        Yield the tokens of a whole file reading it in chunks of chunk_size characters, so memory does not depend on the
+        length of its lines. A token that may continue in the next chunk is carried over instead of being yielded.
+        """
+        return self.iter_chunk_tokens(iter(lambda: f.read(chunk_size), ""))
+
+    def iter_chunk_tokens(self, chunks: Iterable[str], max_token_length: int = MAX_TOKEN_LENGTH) -> Iterator[str]:
+        """
+        Yield the tokens of the text made of chunks, as if it was a single string. The text carried over to the next
+        chunk is at most max_token_length characters: a longer run without separators is split where the chunk ends,
+        so memory stays bounded by the chunk size whatever the file.
+        """
+        carry: str = ""
+        for chunk in chunks:
+            buffer: str = carry + chunk
+            cut: int = self._find_safe_cut(buffer, max_token_length)
+            yield from self.iter_tokens(buffer[:cut])
+            carry = buffer[cut:]
+        yield from self.iter_tokens(carry)
+
+    def _find_safe_cut(self, buffer: str, max_token_length: int) -> int:
+        """
+        Where buffer can be cut without splitting a token, looking back at most max_token_length characters: the end
+        of buffer when there is no such place.
+        """
+        lowest_cut: int = max(0, len(buffer) - max_token_length)
+        if self._split_on_delimiter:
+            cut: int = buffer.rfind(self.word_delimiter, lowest_cut)
+            if cut >= 0:
+                return cut + len(self.word_delimiter)
+            if lowest_cut == 0:
+                return 0
+            # no delimiter within reach, cut after a character that can't be part of a token instead
+
+        cut = len(buffer)
+        while cut > lowest_cut and self._pattern.fullmatch(buffer, cut - 1, cut):
+            cut -= 1
+        return len(buffer) if cut == lowest_cut and cut > 0 else cut
+
     def tokenize_word(self, word: str) -> [str]:
-        match: list[str] = RegexCatalog.get_pattern(self.regex, flags=re.IGNORECASE).findall(word)
+        match: list[str] = self._pattern.findall(word)
         if not match:
             return []
         return match
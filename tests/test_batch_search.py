@@ -0,0 +1,69 @@
+import json
+import multiprocessing
+import os.path
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from src.batch_search import LatencyReport, read_queries, run_batch
+from src.regex_catalog import RegexCatalog
+from src.simple_search import SimpleSearch
+from src.tokenizer import Tokenizer
+
+
+class BatchSearchTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._simple_search = SimpleSearch(path=os.path.join(os.getcwd(), "tests", "samples"),
+                                          valid_extensions=['txt'],
+                                          tokenizer=Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED,
+                                                              word_delimiter=" "))
+        with redirect_stdout(StringIO()):
+            cls._simple_search.load_directory_into_database()
+        cls._queries = ["like bicycle just show", "bicycle AND (ride", "just"] * 5
+
+    def run_queries(self, workers: int, processes: bool = False) -> tuple[list[dict], LatencyReport]:
+        output: StringIO = StringIO()
+        report: LatencyReport = run_batch(self._simple_search, self._queries, output, workers, processes)
+        return [json.loads(line) for line in output.getvalue().splitlines()], report
+
+    def test_run_batch(self) -> None:
+        # when
+        results, report = self.run_queries(workers=3)
+        # then
+        self.assertListEqual(self._queries, [result["query"] for result in results])
+        self.assertListEqual([["queen_bicycle.txt", 50.0], ["queen_bohemian_rhapsody.txt", 25.0]],
+                             results[0]["results"])
+        self.assertIn("missing ')'", results[1]["error"])
+        self.assertListEqual([["queen_bohemian_rhapsody.txt", 100.0]], results[2]["results"])
+        self.assertEqual(len(self._queries), report.queries)
+        self.assertEqual(5, report.errors)
+        self.assertGreater(report.qps, 0)
+        self.assertLessEqual(report.percentile(50), report.percentile(99))
+        self.assertTrue(all(result["latency_ms"] >= 0 for result in results))
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "needs the fork start method")
+    def test_run_batch_in_processes(self) -> None:
+        # when
+        results, report = self.run_queries(workers=2, processes=True)
+        expected_results, _ = self.run_queries(workers=1)
+        # then
+        self.assertListEqual([{k: v for k, v in result.items() if k != "latency_ms"} for result in expected_results],
+                             [{k: v for k, v in result.items() if k != "latency_ms"} for result in results])
+        self.assertEqual(len(self._queries), report.queries)
+
+    def test_run_batch_invalid_workers(self) -> None:
+        with self.assertRaises(ValueError):
+            run_batch(self._simple_search, self._queries, StringIO(), workers=0)
+
+    def test_read_queries(self) -> None:
+        self.assertListEqual(["a b", "c"], list(read_queries(StringIO("a b\n\n  c  \n"))))
+
+    def test_latency_report_empty(self) -> None:
+        self.assertEqual(0.0, LatencyReport().percentile(99))
+        self.assertEqual(0.0, LatencyReport().qps)
+
+
+if __name__ == '__main__':
+    unittest.main()
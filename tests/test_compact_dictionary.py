@@ -0,0 +1,84 @@
+import pickle
+import sys
+import unittest
+
+from src.compact_dictionary import CompactDictionary
+
+
+class CompactDictionaryTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self._terms: dict[str, int] = {"hello": 1, "help": 2, "hero": 3, "ñandú": 4, "h": 5}
+        self._dictionary = CompactDictionary(self._terms.items())
+
+    def test_lookup(self) -> None:
+        for term, value in self._terms.items():
+            self.assertEqual(value, self._dictionary[term])
+            self.assertIn(term, self._dictionary)
+        self.assertNotIn("he", self._dictionary)
+        self.assertIsNone(self._dictionary.get("hellos"))
+        self.assertEqual(0, self._dictionary.get("ñand", 0))
+        with self.assertRaises(KeyError):
+            _ = self._dictionary["x"]
+
+    def test_terms_sorted(self) -> None:
+        self.assertListEqual(sorted(self._terms), list(self._dictionary))
+        self.assertEqual(5, len(self._dictionary))
+        self.assertEqual("ñandú", self._dictionary.term(self._dictionary.term_id("ñandú")))
+        self.assertIsNone(self._dictionary.term_id("x"))
+
+    def test_interned_terms(self) -> None:
+        # when
+        terms = self._dictionary.interned_terms()
+        # then
+        self.assertListEqual(sorted(self._terms), list(terms))
+        self.assertEqual("hello", terms[1])
+        self.assertEqual("ñandú", terms[-1])
+        self.assertListEqual(["hello", "help"], terms[1:3])
+        with self.assertRaises(IndexError):
+            _ = terms[5]
+        self.assertTrue(self._dictionary.fully_interned)
+        self._dictionary["abc"] = 7
+        self.assertFalse(self._dictionary.fully_interned)
+
+    def test_set_and_delete(self) -> None:
+        # when
+        self._dictionary["hero"] = 30
+        self._dictionary["zebra"] = 6
+        del self._dictionary["help"]
+        del self._dictionary["zebra"]
+        # then
+        self.assertEqual(30, self._dictionary["hero"])
+        self.assertNotIn("help", self._dictionary)
+        self.assertDictEqual({}, self._dictionary.overflow)
+        self.assertEqual(4, len(self._dictionary))
+        self.assertEqual(5, self._dictionary.n_interned)
+        with self.assertRaises(KeyError):
+            del self._dictionary["help"]
+
+    def test_overflow_interned_on_rebuild(self) -> None:
+        # given
+        self._dictionary["abc"] = 7
+        # when
+        rebuilt: CompactDictionary = CompactDictionary(self._dictionary.items())
+        # then
+        self.assertDictEqual({"abc": 7, **self._terms}, dict(rebuilt))
+        self.assertEqual(0, rebuilt.term_id("abc"))
+        self.assertDictEqual({}, rebuilt.overflow)
+
+    def test_empty(self) -> None:
+        dictionary: CompactDictionary = CompactDictionary()
+        self.assertEqual(0, len(dictionary))
+        self.assertNotIn("a", dictionary)
+        self.assertListEqual([], list(dictionary))
+
+    def test_pickle(self) -> None:
+        self.assertDictEqual(self._terms, dict(pickle.loads(pickle.dumps(self._dictionary))))
+
+    def test_smaller_than_dict(self) -> None:
+        terms: dict[str, int] = {"term{}".format(i): i for i in range(10000)}
+        dict_size: int = sys.getsizeof(terms) + sum(sys.getsizeof(term) for term in terms)
+        self.assertLess(sys.getsizeof(CompactDictionary(terms.items())), dict_size / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+
+from src.crawler import Crawler, FileReader
+from src.document_registry import FileMetadata
+
+
+class CrawlerTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self._root: str = self._directory.name
+        for relative_path, content in [("b.txt", "b"), ("a.txt", "a"), ("notes.md", "md"),
+                                       ("docs/c.txt", "c"), ("docs/deep/d.txt", "d" * 100),
+                                       (".git/e.txt", "e"), ("logs/f_2024.txt", "f")]:
+            os.makedirs(os.path.dirname(os.path.join(self._root, relative_path)), exist_ok=True)
+            with open(os.path.join(self._root, relative_path), mode="w") as f:
+                f.write(content)
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def crawl(self, **kwargs) -> list[str]:
+        self._crawler = Crawler(self._root, ["txt"], **kwargs)
+        return [crawled_file.path.replace(os.sep, "/") for crawled_file in self._crawler.crawl()]
+
+    def test_crawl(self) -> None:
+        # when
+        paths: list[str] = self.crawl()
+        # then, depth first in name order
+        self.assertListEqual([".git/e.txt", "a.txt", "b.txt", "docs/c.txt", "docs/deep/d.txt", "logs/f_2024.txt"],
+                             paths)
+        self.assertEqual(1, self._crawler.stats.other_extensions)
+        self.assertEqual(5, self._crawler.stats.directories)
+
+    def test_crawl_include_and_exclude(self) -> None:
+        self.assertListEqual(["a.txt", "b.txt", "docs/c.txt", "logs/f_2024.txt"],
+                             self.crawl(exclude=[".git", "deep"]))
+        self.assertListEqual(["docs/c.txt", "docs/deep/d.txt"], self.crawl(include=["docs/*"]))
+        self.assertListEqual(["logs/f_2024.txt"], self.crawl(include=["*_2024.txt"]))
+        self.assertListEqual(["a.txt", "docs/deep/d.txt"], self.crawl(include=["a.txt", "d.txt"]))
+        self.assertEqual(4, self._crawler.stats.excluded)
+
+    def test_crawl_max_file_size(self) -> None:
+        # when
+        paths: list[str] = self.crawl(max_file_size=10)
+        # then
+        self.assertNotIn("docs/deep/d.txt", paths)
+        self.assertEqual(1, self._crawler.stats.too_large)
+        with self.assertRaises(ValueError):
+            Crawler(self._root, ["txt"], max_file_size=-1)
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "needs symlinks")
+    def test_crawl_symlink_loop(self) -> None:
+        # given, a link back to an ancestor and a link to a file
+        os.symlink(self._root, os.path.join(self._root, "docs", "deep", "loop"))
+        os.symlink(os.path.join(self._root, "a.txt"), os.path.join(self._root, "docs", "link.txt"))
+        # when
+        paths: list[str] = self.crawl()
+        # then
+        self.assertIn("docs/link.txt", paths)
+        self.assertEqual(7, len(paths))
+        self.assertEqual(1, self._crawler.stats.linked_directories)
+
+    def test_crawl_non_existing_root(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            list(Crawler(os.path.join(self._root, "missing"), ["txt"]).crawl())
+
+
+class FileReaderTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self._file_path: str = os.path.join(self._directory.name, "file.txt")
+        with open(self._file_path, mode="wb") as f:
+            f.write("héllo wörld ".encode("utf-8") * 10 + b"\xff\xfe bad bytes")
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def test_iter_chunks(self) -> None:
+        # given, chunks splitting multibyte characters
+        expected: str = "héllo wörld " * 10 + "�� bad bytes"
+        for mmap_threshold in [1 << 20, 1]:
+            with self.subTest(mmap_threshold=mmap_threshold):
+                # when
+                file_reader: FileReader = FileReader(chunk_size=5, mmap_threshold=mmap_threshold)
+                chunks: list[str] = list(file_reader.iter_chunks(self._file_path))
+                # then
+                self.assertEqual(expected, "".join(chunks))
+                self.assertGreater(len(chunks), 30)
+
+    def test_iter_chunks_content_hash(self) -> None:
+        for mmap_threshold in [1 << 20, 1]:
+            with self.subTest(mmap_threshold=mmap_threshold):
+                # given
+                content_hash = FileMetadata.content_hasher()
+                # when
+                "".join(FileReader(chunk_size=5, mmap_threshold=mmap_threshold).iter_chunks(self._file_path,
+                                                                                             content_hash))
+                # then
+                self.assertEqual(FileMetadata.hash_file(self._file_path), content_hash.digest())
+
+    def test_iter_chunks_errors(self) -> None:
+        self.assertTrue("".join(FileReader(errors="ignore").iter_chunks(self._file_path)).endswith("wörld  bad bytes"))
+        self.assertTrue("".join(FileReader(encoding="latin-1").iter_chunks(self._file_path)).startswith("hÃ©llo"))
+
+    def test_iter_chunks_empty_file(self) -> None:
+        # given
+        open(self._file_path, mode="w").close()
+        # then
+        self.assertEqual("", "".join(FileReader(mmap_threshold=0).iter_chunks(self._file_path)))
+
+    def test_invalid_arguments(self) -> None:
+        with self.assertRaises(LookupError):
+            FileReader(encoding="no-such-encoding")
+        with self.assertRaises(ValueError):
+            FileReader(chunk_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
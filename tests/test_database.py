@@ -1,5 +1,6 @@
 import unittest
-from src.database import Database, DictionaryKey, DictionaryValue, SetDictionaryValue
+from src.database import Database, DictionaryKey, DictionaryValue
+from src.posting_list import PostingList
 
 
 class DatabaseTestCase(unittest.TestCase):
@@ -11,8 +12,8 @@ class DatabaseTestCase(unittest.TestCase):
         # given
         self._database.dictionary.clear()
         # when
-        self._database.add(DictionaryKey('key1'), DictionaryValue("one"))
-        self._database.add(DictionaryKey('key1'), DictionaryValue("two"))
+        self._database.add(DictionaryKey('key1'), DictionaryValue(1))
+        self._database.add(DictionaryKey('key1'), DictionaryValue(2))
         # then
         self.assertEqual(1, len(self._database.dictionary))
 
@@ -21,7 +22,7 @@ class DatabaseTestCase(unittest.TestCase):
         self._database.dictionary.clear()
         # when-then
         with self.assertRaises(ValueError) as e:
-            self._database.add(DictionaryKey(''), DictionaryValue("one"))
+            self._database.add(DictionaryKey(''), DictionaryValue(1))
 
         self.assertEqual("Expected key and val to be provided.", str(e.exception))
 
@@ -30,20 +31,29 @@ class DatabaseTestCase(unittest.TestCase):
         self._database.dictionary.clear()
         # when-then
         with self.assertRaises(ValueError) as e:
-            self._database.add(DictionaryKey('key1'), DictionaryValue(''))
+            self._database.add(DictionaryKey('key1'), None)
 
         self.assertEqual("Expected key and val to be provided.", str(e.exception))
 
+    def test_add_doc_id_zero(self) -> None:
+        # given
+        self._database.dictionary.clear()
+        key1: DictionaryKey = DictionaryKey('key1')
+        # when
+        self._database.add(key1, DictionaryValue(0))
+        # then
+        self.assertListEqual([0], list(self._database.find(key1)))
+
     def test_add_repeated_value(self) -> None:
         # given
         self._database.dictionary.clear()
         key1: DictionaryKey = DictionaryKey('key1')
-        val1: DictionaryValue = "one"
-        expected_value: SetDictionaryValue = {"one"}
+        val1: DictionaryValue = 1
+        expected_value: set[DictionaryValue] = {1}
         # when
         self._database.add(key1, val1)
         self._database.add(key1, val1)
-        actual_value: SetDictionaryValue = self._database.find(key1)
+        actual_value: set[DictionaryValue] = set(self._database.find(key1))
         # then
         self.assertSetEqual(expected_value, actual_value)
 
@@ -51,11 +61,11 @@ class DatabaseTestCase(unittest.TestCase):
         # given
         self._database.dictionary.clear()
         key1: DictionaryKey = DictionaryKey('key1')
-        val1: DictionaryValue = "one"
-        expected_value: SetDictionaryValue = {"one"}
+        val1: DictionaryValue = 1
+        expected_value: set[DictionaryValue] = {1}
         # when
         self._database.add(key1, val1)
-        actual_value: SetDictionaryValue = self._database.find(key1)
+        actual_value: set[DictionaryValue] = set(self._database.find(key1))
         # then
         self.assertSetEqual(expected_value, actual_value)
 
@@ -63,14 +73,210 @@ class DatabaseTestCase(unittest.TestCase):
         # given
         self._database.dictionary.clear()
         key1: DictionaryKey = DictionaryKey('key1')
-        val1: DictionaryValue = "one"
+        val1: DictionaryValue = 1
         missing_key: DictionaryKey = DictionaryKey('key2')
         # when
         self._database.add(key1, val1)
-        actual_value: SetDictionaryValue = self._database.find(missing_key)
+        actual_value = self._database.find(missing_key)
         # then
         self.assertIsNone(actual_value)
 
+    def test_find_doc_ids(self) -> None:
+        # given
+        self._database.dictionary.clear()
+        key1: DictionaryKey = DictionaryKey('key1')
+        # when
+        for doc_id in (7, 3, 300):
+            self._database.add(key1, doc_id)
+        # then
+        self.assertListEqual([3, 7, 300], list(self._database.find_doc_ids(key1)))
+        self.assertListEqual([], list(self._database.find_doc_ids(DictionaryKey('key2'))))
+
+    def test_merge(self) -> None:
+        # given
+        self._database.dictionary.clear()
+        self._database.add(DictionaryKey('key1'), 0)
+        other: Database = Database()
+        other.add(DictionaryKey('key1'), 1)
+        other.add(DictionaryKey('key2'), 1)
+        # when
+        self._database.merge(other)
+        # then
+        self.assertListEqual([0, 1], list(self._database.find_doc_ids(DictionaryKey('key1'))))
+        self.assertListEqual([1], list(self._database.find_doc_ids(DictionaryKey('key2'))))
+
+    def test_document_lengths(self) -> None:
+        # given
+        database: Database = Database()
+        # when
+        for token, doc_id in (('key1', 0), ('key1', 0), ('key2', 0), ('key1', 2)):
+            database.add(DictionaryKey(token), doc_id)
+        # then
+        self.assertListEqual([3, 0, 1], database.document_lengths.tolist())
+        self.assertEqual(0, database.get_document_length(7))
+        self.assertListEqual([(0, 2), (2, 1)], list(database.find(DictionaryKey('key1')).items()))
+
+    def test_merge_document_lengths(self) -> None:
+        # given
+        database: Database = Database()
+        database.add(DictionaryKey('key1'), 0)
+        other: Database = Database()
+        other.add(DictionaryKey('key1'), 2)
+        other.add(DictionaryKey('key1'), 2)
+        other.add(DictionaryKey('key2'), 2)
+        # when
+        database.merge(other)
+        # then
+        self.assertListEqual([1, 0, 3], database.document_lengths.tolist())
+        self.assertListEqual([1, 0, 2], database.document_terms.tolist())
+        self.assertEqual(2, database.get_document_terms(2))
+        self.assertEqual(0, database.get_document_terms(3))
+
+    def test_remove(self) -> None:
+        # given
+        database: Database = Database()
+        for doc_id in (0, 1, 2):
+            database.add(DictionaryKey('key1'), doc_id)
+        database.add(DictionaryKey('key2'), 1)
+        # when
+        database.remove(1)
+        # then
+        self.assertListEqual([0, 2], list(database.find_doc_ids(DictionaryKey('key1'))))
+        self.assertIsNone(database.find(DictionaryKey('key2')))
+
+    def test_compact(self) -> None:
+        # given
+        database: Database = Database()
+        for doc_id in (0, 1, 2):
+            database.add(DictionaryKey('key1'), doc_id)
+        database.add(DictionaryKey('key2'), 1)
+        database.add(DictionaryKey('key3'), 2)
+        key3_postings: PostingList = database.dictionary[DictionaryKey('key3')]
+        database.remove(1)
+        # when
+        database.compact()
+        # then
+        self.assertSetEqual(set(), database.deleted)
+        self.assertListEqual([0, 2], list(database.dictionary[DictionaryKey('key1')]))
+        self.assertNotIn(DictionaryKey('key2'), database.dictionary)
+        self.assertIs(key3_postings, database.dictionary[DictionaryKey('key3')])
+        self.assertListEqual([1, 0, 2], list(database.document_lengths))
+        self.assertListEqual([1, 0, 2], list(database.document_terms))
+
+    def test_positions(self) -> None:
+        # given
+        database: Database = Database(positions=True)
+        for doc_id, tokens in ((0, ["to", "be", "or", "not", "to", "be"]), (1, ["be", "to"])):
+            for token in tokens:
+                database.add(DictionaryKey(token), doc_id)
+        other: Database = Database(positions=True)
+        other.add(DictionaryKey("to"), 2)
+        # when
+        database.merge(other)
+        database.remove(1)
+        database.compact()
+        # then
+        self.assertListEqual([0, 4], list(database.find_positions(DictionaryKey("to")).get(0)))
+        self.assertListEqual([0], list(database.find_positions(DictionaryKey("to")).get(2)))
+        self.assertListEqual([], list(database.find_positions(DictionaryKey("to")).get(1)))
+        self.assertListEqual([1, 5], list(database.find_positions(DictionaryKey("be")).get(0)))
+        self.assertIsNone(Database().find_positions(DictionaryKey("to")))
+
+    def test_find_pattern(self) -> None:
+        # given
+        database: Database = Database(max_expansions=2)
+        for token, doc_id in (('ride', 0), ('ride', 1), ('rider', 1), ('rider', 1), ('riding', 1), ('bike', 2)):
+            database.add(DictionaryKey(token), doc_id)
+        database.find(DictionaryKey('r*'))
+        database.add(DictionaryKey('rid'), 2)
+        # then, 'rid*' is capped to 'rid' and 'ride'
+        self.assertListEqual([(0, 1), (1, 1), (2, 1)], list(database.find(DictionaryKey('rid*')).items()))
+        self.assertListEqual([(0, 1), (1, 3)], list(database.find(DictionaryKey('ride*')).items()))
+        self.assertListEqual([(1, 1)], list(database.find(DictionaryKey('*ing')).items()))
+        self.assertListEqual(['rid', 'ride'], database.expand(DictionaryKey('ri*')))
+        self.assertIsNone(database.find(DictionaryKey('x*')))
+
+    def test_fuzzy_expand(self) -> None:
+        # given
+        database: Database = Database(max_expansions=2)
+        for token, doc_id in (('ride', 0), ('rider', 1), ('riding', 1), ('hide', 2), ('bike', 2)):
+            database.add(DictionaryKey(token), doc_id)
+        # then
+        self.assertEqual(({'rde': 0, 'ride': 1}, True), database.fuzzy_expand(DictionaryKey('rde'), 1))
+        self.assertEqual(({'ride': 0, 'hide': 1}, True), database.fuzzy_expand(DictionaryKey('ride'), 2))
+        self.assertEqual(({'ride': 0}, True), database.fuzzy_expand(DictionaryKey('ride'), 0))
+        self.assertEqual(({'ri*': 0}, True), database.fuzzy_expand(DictionaryKey('ri*'), 1))
+        # and new terms are found
+        database.add(DictionaryKey('rude'), 3)
+        self.assertIn('rude', database.fuzzy_expand(DictionaryKey('rde'), 1)[0])
+
+    def test_intern_terms(self) -> None:
+        # given
+        database: Database = Database()
+        for token, doc_id in (('ride', 0), ('ride', 1), ('rider', 1), ('bike', 2)):
+            database.add(DictionaryKey(token), doc_id)
+        # when
+        database.intern_terms()
+        database.add(DictionaryKey('ride'), 3)
+        database.add(DictionaryKey('riding'), 3)
+        database.remove(2)
+        database.compact()
+        # then
+        self.assertListEqual(['riding'], list(database.dictionary.overflow))
+        self.assertListEqual([0, 1, 3], list(database.find(DictionaryKey('ride'))))
+        self.assertListEqual([3], list(database.find(DictionaryKey('riding'))))
+        self.assertIsNone(database.find(DictionaryKey('bike')))
+        self.assertListEqual(['ride', 'rider', 'riding'], database.expand(DictionaryKey('ri*')))
+        # and the terms added since are interned by the next call
+        database.intern_terms()
+        self.assertDictEqual({}, database.dictionary.overflow)
+        self.assertListEqual(['ride', 'rider', 'riding'], list(database.terms()))
+        # which only rebuilds the dictionary when terms changed
+        dictionary = database.dictionary
+        database.intern_terms()
+        self.assertIs(dictionary, database.dictionary)
+
+    def test_term_dictionary_of_interned_terms(self) -> None:
+        # given
+        database: Database = Database()
+        for doc_id, token in enumerate(('ride', 'rider', 'hide', 'bike')):
+            database.add(DictionaryKey(token), doc_id)
+        database.intern_terms()
+        # when
+        terms = database.term_dictionary
+        # then, terms are read from the CompactDictionary rather than copied
+        self.assertNotIsInstance(terms._terms, list)
+        self.assertListEqual(['bike', 'hide', 'ride', 'rider'], list(terms))
+        self.assertListEqual(['bike', 'hide', 'ride'], database.expand(DictionaryKey('*e')))
+        self.assertListEqual(['ride', 'rider'], database.expand(DictionaryKey('ri*')))
+        self.assertEqual(({'rde': 0, 'ride': 1}, True), database.fuzzy_expand(DictionaryKey('rde'), 1))
+
+    def test_defer_term_dictionary(self) -> None:
+        # given
+        database: Database = Database()
+        database.add(DictionaryKey('ride'), 0)
+        database.defer_term_dictionary(True)
+        terms = database.term_dictionary
+        # when
+        other: Database = Database()
+        other.add(DictionaryKey('rides'), 2)
+        database.add(DictionaryKey('rider'), 1)
+        database.merge(other)
+        # then, the term dictionary is kept until it is refreshed
+        self.assertIs(terms, database.term_dictionary)
+        self.assertListEqual(['ride'], database.expand(DictionaryKey('ri*')))
+        database.refresh_term_dictionary()
+        self.assertListEqual(['ride', 'rider', 'rides'], database.expand(DictionaryKey('ri*')))
+        terms = database.term_dictionary
+        database.refresh_term_dictionary()
+        self.assertIs(terms, database.term_dictionary)
+
+        database.add(DictionaryKey('rids'), 3)
+        database.defer_term_dictionary(False)
+        self.assertListEqual(['ride', 'rider', 'rides', 'rids'], database.expand(DictionaryKey('ri*')))
+        database.add(DictionaryKey('rim'), 4)
+        self.assertListEqual(['ride', 'rider', 'rides', 'rids', 'rim'], database.expand(DictionaryKey('ri*')))
+
 
 if __name__ == '__main__':
     unittest.main()
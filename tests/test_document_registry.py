@@ -0,0 +1,138 @@
+import unittest
+
+import os
+import tempfile
+
+from src.document_registry import DocumentRegistry, FileMetadata
+
+
+class DocumentRegistryTestCase(unittest.TestCase):
+
+    def test_register(self) -> None:
+        # given
+        registry: DocumentRegistry = DocumentRegistry()
+        # when
+        first_doc_id: int = registry.register("a.txt")
+        second_doc_id: int = registry.register("b.txt")
+        # then
+        self.assertEqual(0, first_doc_id)
+        self.assertEqual(1, second_doc_id)
+        self.assertListEqual(["a.txt", "b.txt"], registry.filenames)
+        self.assertEqual("b.txt", registry.get_filename(second_doc_id))
+        self.assertEqual(first_doc_id, registry.get_doc_id("a.txt"))
+
+    def test_register_repeated_filename(self) -> None:
+        # given
+        registry: DocumentRegistry = DocumentRegistry()
+        # when
+        registry.register("a.txt")
+        doc_id: int = registry.register("a.txt")
+        # then
+        self.assertEqual(0, doc_id)
+        self.assertEqual(1, len(registry))
+
+    def test_register_empty_filename(self) -> None:
+        with self.assertRaises(ValueError) as e:
+            DocumentRegistry().register("")
+
+        self.assertEqual("Expected filename to be provided.", str(e.exception))
+
+    def test_get_doc_id_missing(self) -> None:
+        self.assertIsNone(DocumentRegistry().get_doc_id("missing.txt"))
+
+    def test_remove_keeps_doc_ids(self) -> None:
+        # given
+        registry: DocumentRegistry = DocumentRegistry(["a.txt", "b.txt"])
+        # when
+        removed_doc_id: int = registry.remove("a.txt")
+        new_doc_id: int = registry.register("a.txt")
+        # then
+        self.assertEqual(0, removed_doc_id)
+        self.assertEqual(2, new_doc_id)
+        self.assertIsNone(registry.get_filename(removed_doc_id))
+        self.assertListEqual(["b.txt", "a.txt"], registry.filenames)
+        self.assertListEqual([(1, "b.txt"), (2, "a.txt")], list(registry.items()))
+        self.assertEqual(2, len(registry))
+
+    def test_holes(self) -> None:
+        # given
+        registry: DocumentRegistry = DocumentRegistry(["a.txt", None, "c.txt"])
+        # then
+        self.assertEqual(2, registry.get_doc_id("c.txt"))
+        self.assertEqual(3, registry.next_doc_id)
+        self.assertListEqual([("a.txt", None), (None, None), ("c.txt", None)], list(registry.slots()))
+
+    def test_metadata(self) -> None:
+        # given
+        registry: DocumentRegistry = DocumentRegistry()
+        registry.register("a.txt", FileMetadata(1, 2))
+        # when
+        registry.update_metadata("a.txt", FileMetadata(3, 4))
+        # then
+        self.assertEqual(FileMetadata(3, 4), registry.get_metadata("a.txt"))
+        self.assertIsNone(registry.get_metadata("missing.txt"))
+
+    def test_duplicates(self) -> None:
+        # given
+        registry: DocumentRegistry = DocumentRegistry()
+        doc_id: int = registry.register("a.txt", FileMetadata(1, 2, b"a"))
+        registry.register("b.txt", FileMetadata(1, 3, b"b"))
+        # when
+        registry.add_duplicate(registry.find_content(b"a"), "copy/a.txt", FileMetadata(5, 2, b"a"))
+        registry.add_duplicate(doc_id, "other/a.txt", FileMetadata(6, 2, b"a"))
+        # then
+        self.assertIsNone(registry.find_content(b"c"))
+        self.assertListEqual(["a.txt", "copy/a.txt", "other/a.txt"], registry.get_filenames(doc_id))
+        self.assertListEqual(["a.txt", "copy/a.txt", "other/a.txt", "b.txt"], registry.filenames)
+        self.assertListEqual([0, 0, 0, 1], [item_doc_id for item_doc_id, _ in registry.items()])
+        self.assertListEqual([0, 1], list(registry.doc_ids()))
+        self.assertEqual(doc_id, registry.get_doc_id("copy/a.txt"))
+        self.assertEqual(FileMetadata(5, 2, b"a"), registry.get_metadata("copy/a.txt"))
+        self.assertEqual(4, len(registry))
+        with self.assertRaises(ValueError):
+            registry.add_duplicate(doc_id, "b.txt")
+
+    def test_content_hash_given_after_indexing(self) -> None:
+        # given
+        registry: DocumentRegistry = DocumentRegistry()
+        registry.register("a.txt", FileMetadata(1, 2))
+        # when
+        registry.update_metadata("a.txt", FileMetadata(1, 2, b"a"))
+        # then
+        self.assertEqual(0, registry.find_content(b"a"))
+        self.assertTrue(registry.has_size(2))
+        self.assertFalse(registry.has_size(3))
+
+    def test_remove_duplicates(self) -> None:
+        # given
+        registry: DocumentRegistry = DocumentRegistry(["a.txt"], [FileMetadata(1, 2, b"a")],
+                                                      [(0, "copy/a.txt", FileMetadata(5, 2, b"a")),
+                                                       (0, "other/a.txt", FileMetadata(6, 2, b"a"))])
+        # when-then, the doc id is only released with its last file, the oldest duplicate taking it over
+        self.assertIsNone(registry.remove("other/a.txt"))
+        self.assertIsNone(registry.remove("a.txt"))
+        self.assertEqual("copy/a.txt", registry.get_filename(0))
+        self.assertEqual(FileMetadata(5, 2, b"a"), registry.get_metadata("copy/a.txt"))
+        self.assertListEqual([], list(registry.duplicates()))
+        self.assertEqual(0, registry.find_content(b"a"))
+        self.assertEqual(0, registry.remove("copy/a.txt"))
+        self.assertIsNone(registry.find_content(b"a"))
+        self.assertListEqual([], registry.get_filenames(0))
+
+    def test_file_metadata_from_file(self) -> None:
+        # given
+        with tempfile.TemporaryDirectory() as directory:
+            file_path: str = os.path.join(directory, "a.txt")
+            with open(file_path, mode="w") as f:
+                f.write("hello")
+            # when
+            metadata: FileMetadata = FileMetadata.from_file(file_path, with_content_hash=True)
+            # then
+            self.assertEqual(5, metadata.size)
+            self.assertEqual(os.stat(file_path).st_mtime_ns, metadata.mtime_ns)
+            self.assertEqual(16, len(metadata.content_hash))
+            self.assertIsNone(FileMetadata.from_file(file_path).content_hash)
+
+
+if __name__ == '__main__':
+    unittest.main()
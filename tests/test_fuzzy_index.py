@@ -0,0 +1,71 @@
+import random
+import time
+import unittest
+
+from src.fuzzy_index import NGramIndex, bounded_levenshtein, max_edits, ngrams
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous: list[int] = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current: list[int] = [i]
+        for j in range(1, len(b) + 1):
+            current.append(min(previous[j - 1] + (a[i - 1] != b[j - 1]), previous[j] + 1, current[j - 1] + 1))
+        previous = current
+    return previous[-1]
+
+
+class FuzzyIndexTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        generator: random.Random = random.Random(0)
+        cls._terms = sorted({"".join(generator.choices("abcde", k=generator.randint(1, 8))) for _ in range(2000)})
+        cls._index = NGramIndex(cls._terms)
+
+    def test_ngrams(self) -> None:
+        self.assertSetEqual({"\0r", "ri", "id", "de", "e\0"}, ngrams("ride"))
+        self.assertSetEqual({"\0a", "a\0"}, ngrams("a"))
+        self.assertSetEqual({"\0\0a", "\0a\0", "a\0\0"}, ngrams("a", 3))
+
+    def test_max_edits(self) -> None:
+        self.assertListEqual([0, 0, 1, 1, 2, 2], [max_edits("x" * length, 2) for length in [1, 2, 3, 5, 6, 12]])
+        self.assertEqual(1, max_edits("bicycle", 1))
+
+    def test_bounded_levenshtein(self) -> None:
+        terms: list[str] = ["ride", "bicycle", "nandú", "bike", "abcd", ""]
+        self.assertListEqual([0, 3, 3, 2, 3, 3], bounded_levenshtein("ride", terms, 2).tolist())
+        self.assertListEqual([2, 1, 2, 2, 2, 2], bounded_levenshtein("bicyle", terms, 1).tolist())
+        self.assertListEqual([3, 3, 2, 3, 3, 3], bounded_levenshtein("ñandu", terms, 2).tolist())
+        self.assertListEqual([3, 3, 3, 3, 3, 0], bounded_levenshtein("", terms, 2).tolist())
+        self.assertListEqual([], bounded_levenshtein("ride", [], 2).tolist())
+
+    def test_bounded_levenshtein_same_as_levenshtein(self) -> None:
+        generator: random.Random = random.Random(1)
+        for _ in range(200):
+            word: str = "".join(generator.choices("abc", k=generator.randint(0, 7)))
+            terms: list[str] = ["".join(generator.choices("abc", k=generator.randint(0, 7))) for _ in range(10)]
+            max_distance: int = generator.randint(0, 3)
+            self.assertListEqual([min(levenshtein(word, term), max_distance + 1) for term in terms],
+                                 bounded_levenshtein(word, terms, max_distance).tolist())
+
+    def test_similar_same_as_scanning_every_term(self) -> None:
+        for word in ["abc", "e", "abcdeab", "aaaa", "edcbaedcba", ""]:
+            for max_distance in [0, 1, 2]:
+                with self.subTest(word=word, max_distance=max_distance):
+                    expected: list[tuple[str, int]] = sorted(
+                        ((term, levenshtein(word, term)) for term in self._terms
+                         if levenshtein(word, term) <= max_distance), key=lambda match: (match[1], match[0]))
+                    self.assertEqual((expected, True), self._index.similar(word, max_distance))
+
+    def test_similar_limit(self) -> None:
+        matches, complete = self._index.similar("abcd", 2, limit=3)
+        self.assertTrue(complete)
+        self.assertListEqual(self._index.similar("abcd", 2)[0][:3], matches)
+
+    def test_similar_deadline(self) -> None:
+        self.assertEqual(([], False), self._index.similar("abcd", 2, deadline=time.perf_counter()))
+        self.assertEqual(([], True), NGramIndex([]).similar("abcd", 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import os
+import tempfile
+import unittest
+
+from src.database import Database
+from src.document_registry import DocumentRegistry, FileMetadata
+from src.index_file import HEADER, IndexFileError, MappedIndex, VERSION, write_index_file
+
+
+class IndexFileTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self._index_filename = os.path.join(self._directory.name, "index.bin")
+        metadata: list = [FileMetadata(1, 10, b"0123456789abcdef"), FileMetadata(2, 20), None]
+        self._document_registry = DocumentRegistry(["a.txt", "b.txt", "c.txt"], metadata)
+        self._database = Database()
+        for token, doc_ids in {"queen": [0, 1], "bicycle": [0], "rhapsody": [1, 300], "ñandú": [2]}.items():
+            for doc_id in doc_ids:
+                self._database.add(token, doc_id)
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def test_write_and_find(self) -> None:
+        # given
+        write_index_file(self._index_filename, "some/path", self._document_registry, self._database)
+        # when
+        index: MappedIndex = MappedIndex(self._index_filename)
+        # then
+        self.assertEqual("some/path", index.path)
+        self.assertListEqual(["a.txt", "b.txt", "c.txt"], index.filenames)
+        self.assertListEqual([FileMetadata(1, 10, b"0123456789abcdef"), FileMetadata(2, 20), None], index.metadata)
+        self.assertEqual(4, len(index))
+        for token in ("queen", "bicycle", "rhapsody", "ñandú"):
+            self.assertEqual(self._database.find(token), index.find(token))
+        self.assertEqual(300, index.find("rhapsody").last)
+        self.assertListEqual([2, 2, 1], list(index.document_lengths))
+        self.assertIsNone(index.find("missing"))
+        self.assertListEqual(["bicycle", "queen", "rhapsody", "ñandú"], list(index.terms()))
+        index.close()
+
+    def test_database_on_top_of_index(self) -> None:
+        # given
+        write_index_file(self._index_filename, "some/path", self._document_registry, self._database)
+        database: Database = Database(base=MappedIndex(self._index_filename))
+        # when
+        database.add("queen", 301)
+        database.add("new", 301)
+        # then
+        self.assertListEqual([0, 1, 301], list(database.find_doc_ids("queen")))
+        self.assertListEqual([301], list(database.find_doc_ids("new")))
+        self.assertListEqual([0], list(database.find_doc_ids("bicycle")))
+        self.assertSetEqual({"queen", "bicycle", "rhapsody", "ñandú", "new"}, set(database.terms()))
+
+    def test_remove_from_database_on_top_of_index(self) -> None:
+        # given
+        write_index_file(self._index_filename, "some/path", self._document_registry, self._database)
+        database: Database = Database(base=MappedIndex(self._index_filename))
+        database.add("queen", 301)
+        # when
+        database.remove(1)
+        database.compact()
+        # then, twice as the filtered base lists are kept
+        for _ in range(2):
+            self.assertListEqual([0, 301], list(database.find_doc_ids("queen")))
+            self.assertListEqual([300], list(database.find_doc_ids("rhapsody")))
+        database.remove(0)
+        self.assertListEqual([301], list(database.find_doc_ids("queen")))
+        self.assertIsNone(database.find("bicycle"))
+        self.assertSetEqual({0, 1}, database.deleted)
+
+    def test_write_removed_documents(self) -> None:
+        # given
+        self._database.remove(self._document_registry.remove("b.txt"))
+        write_index_file(self._index_filename, "some/path", self._document_registry, self._database)
+        # when
+        index: MappedIndex = MappedIndex(self._index_filename)
+        # then
+        self.assertListEqual(["a.txt", None, "c.txt"], index.filenames)
+        self.assertListEqual([0], list(index.find("queen")))
+        self.assertListEqual([300], list(index.find("rhapsody")))
+        self.assertListEqual([2, 0, 1], list(index.document_lengths))
+        self.assertListEqual([2, 0, 1], list(index.document_terms))
+        index.close()
+
+    def test_write_duplicates(self) -> None:
+        # given
+        self._document_registry.add_duplicate(0, "copy/a.txt", FileMetadata(3, 10, b"0123456789abcdef"))
+        write_index_file(self._index_filename, "some/path", self._document_registry, self._database)
+        # when
+        index: MappedIndex = MappedIndex(self._index_filename)
+        # then
+        self.assertListEqual([(0, "copy/a.txt", FileMetadata(3, 10, b"0123456789abcdef"))], index.duplicates)
+        self.assertListEqual([2, 2, 1], list(index.document_terms))
+        registry: DocumentRegistry = DocumentRegistry(index.filenames, index.metadata, index.duplicates)
+        self.assertListEqual(["a.txt", "copy/a.txt"], registry.get_filenames(0))
+        self.assertEqual(0, registry.find_content(b"0123456789abcdef"))
+        index.close()
+
+    def test_open_not_an_index(self) -> None:
+        # given
+        with open(self._index_filename, mode="wb") as f:
+            f.write(64 * b"not an index file ")
+        # when-then
+        with self.assertRaises(IndexFileError) as e:
+            MappedIndex(self._index_filename)
+
+        self.assertEqual("Could not open index file {}: not an index file".format(self._index_filename),
+                         str(e.exception))
+
+    def test_open_other_version(self) -> None:
+        # given
+        write_index_file(self._index_filename, "some/path", DocumentRegistry(), self._database)
+        with open(self._index_filename, mode="r+b") as f:
+            f.seek(8)
+            f.write((VERSION + 1).to_bytes(4, "little"))
+        # when-then
+        with self.assertRaises(IndexFileError) as e:
+            MappedIndex(self._index_filename)
+
+        self.assertIn("unsupported version", str(e.exception))
+
+    def test_open_empty_file(self) -> None:
+        # given
+        open(self._index_filename, mode="wb").close()
+        # when-then
+        with self.assertRaises(IndexFileError):
+            MappedIndex(self._index_filename)
+
+    def test_open_truncated_file(self) -> None:
+        # given
+        database: Database = Database(positions=True)
+        for doc_id, tokens in ((0, ["queen", "bicycle", "queen"]), (1, ["ñandú"]), (2, ["queen"])):
+            for token in tokens:
+                database.add(token, doc_id)
+        write_index_file(self._index_filename, "some/path", self._document_registry, database)
+        with open(self._index_filename, mode="rb") as f:
+            content: bytes = f.read()
+        for size in range(1, len(content)):
+            with self.subTest(size=size):
+                with open(self._index_filename, mode="wb") as f:
+                    f.write(content[:size])
+                # when-then
+                with self.assertRaises(IndexFileError):
+                    MappedIndex(self._index_filename)
+
+    def test_open_corrupt_terms(self) -> None:
+        # given
+        write_index_file(self._index_filename, "some/path", self._document_registry, self._database)
+        with open(self._index_filename, mode="rb") as f:
+            header: tuple = HEADER.unpack(f.read(HEADER.size))
+        terms_offset, term_table_offset = header[7], header[8]
+        for position, byte in ((terms_offset, b"\xff"), (term_table_offset - 2, b"b"), (term_table_offset, b"\x01")):
+            write_index_file(self._index_filename, "some/path", self._document_registry, self._database)
+            with open(self._index_filename, mode="r+b") as f:
+                f.seek(position)
+                f.write(byte)
+            with self.subTest(position=position):
+                # when-then
+                with self.assertRaises(IndexFileError) as e:
+                    MappedIndex(self._index_filename)
+
+                self.assertIn("file is corrupt", str(e.exception))
+
+    def test_write_and_find_positions(self) -> None:
+        # given
+        database: Database = Database(positions=True)
+        for doc_id, tokens in ((0, ["queen", "bicycle", "queen"]), (1, ["rhapsody"]), (2, ["queen"])):
+            for token in tokens:
+                database.add(token, doc_id)
+        database.remove(self._document_registry.remove("c.txt"))
+        write_index_file(self._index_filename, "some/path", self._document_registry, database)
+        # when
+        index: MappedIndex = MappedIndex(self._index_filename)
+        overlay: Database = Database(base=index, positions=True)
+        overlay.add("queen", 3)
+        # then
+        self.assertTrue(index.has_positions)
+        self.assertListEqual([0, 2], list(index.find_positions("queen").get(0)))
+        self.assertListEqual([0], list(index.find_positions("queen").doc_ids))
+        self.assertListEqual([1], list(index.find_positions("bicycle").get(0)))
+        self.assertIsNone(index.find_positions("missing"))
+        self.assertListEqual([0, 3], list(overlay.find_positions("queen").doc_ids))
+        index.close()
+
+    def test_write_without_positions(self) -> None:
+        # given
+        write_index_file(self._index_filename, "some/path", self._document_registry, self._database)
+        # when
+        index: MappedIndex = MappedIndex(self._index_filename)
+        # then
+        self.assertFalse(index.has_positions)
+        self.assertIsNone(index.find_positions("queen"))
+        index.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import tracemalloc
+import unittest
+
+from src.instrumentation import Instrumentation, LatencyHistogram
+
+
+class LatencyHistogramTestCase(unittest.TestCase):
+
+    def test_record(self) -> None:
+        # given
+        histogram: LatencyHistogram = LatencyHistogram()
+        # when
+        for seconds in [0.0000005, 0.000003, 0.000003, 0.001, 2.0]:
+            histogram.record(seconds)
+        # then
+        self.assertEqual(5, histogram.count)
+        self.assertAlmostEqual(2.0010065, histogram.total)
+        self.assertEqual(2.0, histogram.max)
+        self.assertListEqual([1, 0, 2], histogram.buckets[:3])
+        self.assertEqual(1, histogram.buckets[10])
+
+    def test_percentile(self) -> None:
+        # given
+        histogram: LatencyHistogram = LatencyHistogram()
+        for _ in range(99):
+            histogram.record(0.000003)
+        histogram.record(0.5)
+        # then, percentiles are the upper bound of their bucket, capped by the maximum
+        self.assertAlmostEqual(0.000004, histogram.percentile(50))
+        self.assertAlmostEqual(0.000004, histogram.percentile(99))
+        self.assertEqual(0.5, histogram.percentile(100))
+        self.assertEqual(0.0, LatencyHistogram().percentile(50))
+
+
+class InstrumentationTestCase(unittest.TestCase):
+
+    def test_timed(self) -> None:
+        # given
+        instrumentation: Instrumentation = Instrumentation(enabled=True)
+
+        @instrumentation.timed("double")
+        def double(x: int) -> int:
+            return 2 * x
+
+        # when
+        results: list[int] = [double(x) for x in range(3)]
+        instrumentation.count("doubled", 3)
+        # then
+        self.assertListEqual([0, 2, 4], results)
+        self.assertEqual(3, instrumentation.histograms["double"].count)
+        self.assertDictEqual({"doubled": 3}, instrumentation.counters)
+        self.assertEqual(3, instrumentation.as_dict()["stages"]["double"]["count"])
+        self.assertIn("double: calls: 3", instrumentation.report())
+
+    def test_timed_raising(self) -> None:
+        # given
+        instrumentation: Instrumentation = Instrumentation(enabled=True)
+
+        @instrumentation.timed("fail")
+        def fail() -> None:
+            raise ValueError()
+
+        # when
+        with self.assertRaises(ValueError):
+            fail()
+        # then
+        self.assertEqual(1, instrumentation.histograms["fail"].count)
+
+    def test_disabled(self) -> None:
+        # given
+        instrumentation: Instrumentation = Instrumentation()
+        double = instrumentation.timed("double")(lambda x: 2 * x)
+        # when
+        double(1)
+        instrumentation.count("doubled")
+        # then
+        self.assertDictEqual({}, instrumentation.histograms)
+        self.assertDictEqual({}, instrumentation.counters)
+        self.assertIn("disabled", instrumentation.report())
+
+    def test_snapshot_memory(self) -> None:
+        # given
+        instrumentation: Instrumentation = Instrumentation(enabled=True)
+        self.assertIsNone(instrumentation.snapshot_memory("nothing traced"))
+        instrumentation.start_tracing_memory()
+        try:
+            # when
+            allocated: list[bytes] = [bytes(1000) for _ in range(1000)]
+            snapshot: dict = instrumentation.snapshot_memory("allocating")
+        finally:
+            tracemalloc.stop()
+        # then
+        self.assertGreaterEqual(snapshot["current_bytes"], 1000 * len(allocated))
+        self.assertGreaterEqual(snapshot["peak_bytes"], snapshot["current_bytes"])
+        self.assertLessEqual(len(snapshot["top"]), Instrumentation.TOP_ALLOCATIONS)
+        self.assertIn("allocating", instrumentation.memory_snapshots)
+        self.assertIn("memory after allocating", instrumentation.report())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import unittest
+
+from src.posting_list import PositionList, PostingCursor, PostingList, decode_varbytes, encode_varbyte
+
+
+class PostingListTestCase(unittest.TestCase):
+
+    def test_varbyte_round_trip(self) -> None:
+        # given
+        values: list[int] = [0, 1, 127, 128, 300, 16384, 2 ** 32 - 1]
+        buffer: bytearray = bytearray()
+        # when
+        for value in values:
+            encode_varbyte(value, buffer)
+        # then
+        self.assertListEqual(values, list(decode_varbytes(buffer)))
+
+    def test_small_postings_take_two_bytes(self) -> None:
+        # given
+        postings: PostingList = PostingList(range(100))
+        # then, one byte for the gap and one for the term frequency
+        self.assertEqual(100, len(postings))
+        self.assertEqual(200, len(postings.buffer))
+
+    def test_add_keeps_order_and_uniqueness(self) -> None:
+        # given
+        postings: PostingList = PostingList()
+        # when
+        added: list[bool] = [postings.add(doc_id) for doc_id in (5, 9, 9, 1, 200, 5)]
+        # then
+        self.assertListEqual([True, True, False, True, True, False], added)
+        self.assertListEqual([1, 5, 9, 200], list(postings))
+        self.assertEqual(4, len(postings))
+        self.assertEqual(200, postings.last)
+
+    def test_term_frequencies(self) -> None:
+        # given
+        postings: PostingList = PostingList()
+        # when
+        for doc_id in (1, 1, 3, 5, 5, 5):
+            postings.add(doc_id)
+        postings.add(5, 200)
+        postings.add(0, 2)
+        # then
+        self.assertListEqual([(0, 2), (1, 2), (3, 1), (5, 203)], list(postings.items()))
+        doc_ids, tfs = postings.to_arrays()
+        self.assertListEqual([0, 1, 3, 5], doc_ids.tolist())
+        self.assertListEqual([2, 2, 1, 203], tfs.tolist())
+
+    def test_add_to_decoded_postings(self) -> None:
+        # given
+        encoded: PostingList = PostingList.from_items([(1, 1), (4, 300)])
+        postings: PostingList = PostingList.from_encoded(encoded.buffer, len(encoded), encoded.last)
+        # when
+        postings.add(4)
+        # then
+        self.assertListEqual([(1, 1), (4, 301)], list(postings.items()))
+
+    def test_add_invalid_term_frequency(self) -> None:
+        with self.assertRaises(ValueError):
+            PostingList().add(1, 0)
+
+    def test_add_negative_doc_id(self) -> None:
+        with self.assertRaises(ValueError):
+            PostingList().add(-1)
+
+    def test_contains(self) -> None:
+        # given
+        postings: PostingList = PostingList([2, 4, 1000])
+        # then
+        self.assertIn(1000, postings)
+        self.assertNotIn(3, postings)
+        self.assertNotIn(1001, postings)
+
+    def test_to_array(self) -> None:
+        self.assertListEqual([2, 4, 1000], PostingList([2, 4, 1000]).to_array().tolist())
+
+    def test_extend_appends_greater_doc_ids(self) -> None:
+        # given
+        postings: PostingList = PostingList([1, 5])
+        # when
+        postings.extend(PostingList([6, 300, 301, 301]))
+        postings.add(301)
+        # then
+        self.assertEqual(PostingList([1, 5, 6, 300, 301, 301, 301]), postings)
+        self.assertEqual(5, len(postings))
+        self.assertEqual(301, postings.last)
+
+    def test_extend_overlapping_doc_ids(self) -> None:
+        # given
+        postings: PostingList = PostingList([1, 5, 9])
+        # when
+        postings.extend(PostingList([0, 5, 10]))
+        # then
+        self.assertListEqual([(0, 1), (1, 1), (5, 2), (9, 1), (10, 1)], list(postings.items()))
+
+    def test_extend_empty(self) -> None:
+        # given
+        postings: PostingList = PostingList()
+        # when
+        postings.extend(PostingList([3]))
+        postings.extend(PostingList())
+        # then
+        self.assertListEqual([3], list(postings))
+
+    def test_skips(self) -> None:
+        # given
+        postings: PostingList = PostingList(range(0, 3 * PostingList.SKIP_INTERVAL * 2, 2))
+        # then
+        self.assertListEqual([2 * PostingList.SKIP_INTERVAL - 2, 4 * PostingList.SKIP_INTERVAL - 2],
+                             postings.skips[0].tolist())
+        self.assertListEqual([PostingList.SKIP_INTERVAL, 2 * PostingList.SKIP_INTERVAL], postings.skips[2].tolist())
+
+    def test_extend_shifts_skips(self) -> None:
+        # given
+        postings: PostingList = PostingList([0, 1000])
+        other: PostingList = PostingList(range(2000, 2000 + 2 * PostingList.SKIP_INTERVAL))
+        # when
+        postings.extend(other)
+        # then
+        cursor: PostingCursor = postings.cursor()
+        self.assertEqual(2000 + PostingList.SKIP_INTERVAL + 5, cursor.next_geq(2000 + PostingList.SKIP_INTERVAL + 5))
+        # doc 1000 and the first SKIP_INTERVAL doc ids of other are jumped over
+        self.assertEqual(PostingList.SKIP_INTERVAL + 1, cursor.skipped)
+        self.assertListEqual([0, 1000] + list(range(2000, 2000 + 2 * PostingList.SKIP_INTERVAL)), list(postings))
+
+    def test_without(self) -> None:
+        # given
+        postings: PostingList = PostingList.from_items((doc_id, doc_id % 3 + 1) for doc_id in range(0, 1000, 2))
+        # then
+        self.assertIs(postings, postings.without([1, 501, 2000]))
+        self.assertIs(postings, postings.without([]))
+        without: PostingList = postings.without([4, 500, 501])
+        self.assertListEqual([(doc_id, doc_id % 3 + 1) for doc_id in range(0, 1000, 2) if doc_id not in (4, 500)],
+                             list(without.items()))
+        self.assertEqual(500, len(postings))
+
+    def test_max_tf(self) -> None:
+        # given
+        postings: PostingList = PostingList([1, 2, 2, 2, 3])
+        # then
+        self.assertEqual(3, postings.max_tf)
+
+    def test_cursor(self) -> None:
+        # given
+        doc_ids: list[int] = list(range(0, 1000, 3))
+        postings: PostingList = PostingList(doc_ids)
+        postings.add(999, 4)
+        cursor: PostingCursor = postings.cursor()
+        # when-then
+        self.assertEqual(0, cursor.doc_id)
+        self.assertEqual(3, cursor.next())
+        self.assertEqual(501, cursor.next_geq(500))
+        self.assertEqual(501, cursor.next_geq(400))
+        self.assertGreater(cursor.skipped, 0)
+        self.assertEqual(999, cursor.next_geq(998))
+        self.assertEqual(5, cursor.tf)
+        self.assertEqual(PostingCursor.END, cursor.next())
+        self.assertEqual(len(postings), cursor.scanned + cursor.skipped)
+
+    def test_cursor_empty(self) -> None:
+        self.assertEqual(PostingCursor.END, PostingList().cursor().doc_id)
+
+    def test_position_list(self) -> None:
+        # given
+        positions: PositionList = PositionList()
+        # when
+        for doc_id, position in ((0, 3), (0, 200), (4, 0), (4, 1), (9, 7)):
+            positions.add(doc_id, position)
+        # then
+        self.assertEqual(3, len(positions))
+        self.assertListEqual([3, 200], list(positions.get(0)))
+        self.assertListEqual([0, 1], list(positions.get(4)))
+        self.assertListEqual([7], list(positions.get(9)))
+        self.assertListEqual([], list(positions.get(5)))
+        self.assertListEqual([(0, [3, 200]), (9, [7])],
+                             [(doc_id, list(values)) for doc_id, values in positions.without({4}).items()])
+
+    def test_position_list_out_of_order(self) -> None:
+        # given
+        positions: PositionList = PositionList()
+        positions.add(4, 10)
+        # then
+        with self.assertRaises(ValueError):
+            positions.add(4, 10)
+        with self.assertRaises(ValueError):
+            positions.add(3, 11)
+
+    def test_position_list_extend(self) -> None:
+        # given
+        positions: PositionList = PositionList()
+        positions.add(1, 5)
+        other: PositionList = PositionList()
+        other.add(2, 1)
+        other.add(2, 9)
+        # when
+        positions.extend(other)
+        positions.add(2, 10)
+        # then
+        self.assertListEqual([1, 9, 10], list(positions.get(2)))
+        self.assertListEqual([5], list(positions.get(1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
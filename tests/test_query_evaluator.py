@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from src.posting_list import PostingList
+from src.query_evaluator import (END, AndIterator, AndNotIterator, DocIdIterator, DocIdListIterator, EmptyIterator,
+                                 OrIterator, PostingsIterator, matches_near, matches_phrase)
+
+
+def drain(iterator: DocIdIterator) -> list[int]:
+    doc_ids: list[int] = list()
+    while iterator.doc_id != END:
+        doc_ids.append(iterator.doc_id)
+        iterator.next()
+    return doc_ids
+
+
+class QueryEvaluatorTestCase(unittest.TestCase):
+
+    def test_doc_id_list_iterator_next_geq(self) -> None:
+        # given
+        iterator: DocIdListIterator = DocIdListIterator([1, 3, 5, 7, 9, 11, 13])
+        # then
+        self.assertEqual(1, iterator.next_geq(0))
+        self.assertEqual(7, iterator.next_geq(6))
+        self.assertEqual(7, iterator.next_geq(7))
+        self.assertEqual(13, iterator.next_geq(12))
+        self.assertEqual(END, iterator.next_geq(14))
+
+    def test_and_iterator(self) -> None:
+        # given
+        iterator: AndIterator = AndIterator([PostingsIterator(PostingList([1, 2, 3, 5, 8, 13])),
+                                             DocIdListIterator([2, 3, 4, 13]),
+                                             PostingsIterator(PostingList(range(0, 20)))])
+        # then
+        self.assertEqual(4, iterator.cost)
+        self.assertListEqual([2, 3, 13], drain(iterator))
+
+    def test_and_iterator_with_empty(self) -> None:
+        iterator: AndIterator = AndIterator([PostingsIterator(PostingList([1, 2])), EmptyIterator()])
+        self.assertListEqual([], drain(iterator))
+
+    def test_or_iterator(self) -> None:
+        # given
+        iterator: OrIterator = OrIterator([PostingsIterator(PostingList([1, 5, 9])), DocIdListIterator([2, 5, 10]),
+                                           EmptyIterator()])
+        # then
+        self.assertEqual(5, iterator.next_geq(3))
+        self.assertListEqual([5, 9, 10], drain(iterator))
+
+    def test_and_not_iterator(self) -> None:
+        # given
+        iterator: AndNotIterator = AndNotIterator(DocIdListIterator(list(range(10))),
+                                                  PostingsIterator(PostingList([0, 3, 4, 9])))
+        # then
+        self.assertListEqual([1, 2, 5, 6, 7, 8], drain(iterator))
+
+    def test_nested_iterators_match_sets(self) -> None:
+        # given
+        generator: random.Random = random.Random(9)
+        lists: list[list[int]] = [sorted(generator.sample(range(2000), size)) for size in (20, 300, 900, 1500)]
+        # when
+        iterator: AndNotIterator = AndNotIterator(
+            OrIterator([AndIterator([PostingsIterator(PostingList(lists[0])), PostingsIterator(PostingList(lists[2]))]),
+                        PostingsIterator(PostingList(lists[1]))]),
+            DocIdListIterator(lists[3]))
+        # then
+        expected: set[int] = ((set(lists[0]) & set(lists[2])) | set(lists[1])) - set(lists[3])
+        self.assertListEqual(sorted(expected), drain(iterator))
+
+    def test_matches_phrase(self) -> None:
+        self.assertTrue(matches_phrase([[0, 4], [1, 5], [2], [3]]))
+        self.assertFalse(matches_phrase([[0, 4], [2, 6]]))
+        self.assertTrue(matches_phrase([[4, 7], [8]]))
+
+    def test_matches_near(self) -> None:
+        self.assertTrue(matches_near((2,))([[10], [8]]))
+        self.assertFalse(matches_near((1,))([[10], [8, 12]]))
+        self.assertTrue(matches_near((2, 1))([[0, 20], [2, 19], [18]]))
+        self.assertFalse(matches_near((2, 1))([[0, 20], [2, 23], [18]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from src.query_parser import (And, Near, Not, Or, Phrase, QueryParseError, QueryParser, Term, has_near,
+                              positive_tokens)
+from src.regex_catalog import RegexCatalog
+from src.tokenizer import Tokenizer
+
+
+class QueryParserTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._parser = QueryParser(Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter=" "))
+
+    def test_is_boolean_query(self) -> None:
+        self.assertTrue(QueryParser.is_boolean_query("bicycle AND ride"))
+        self.assertTrue(QueryParser.is_boolean_query("NOT bicycle"))
+        self.assertTrue(QueryParser.is_boolean_query('"ride my bicycle"'))
+        self.assertTrue(QueryParser.is_boolean_query("(bicycle)"))
+        self.assertTrue(QueryParser.is_boolean_query("bicycle NEAR/3 ride"))
+        self.assertFalse(QueryParser.is_boolean_query("to be or not to be"))
+        self.assertFalse(QueryParser.is_boolean_query(""))
+
+    def test_parse_precedence(self) -> None:
+        # given
+        query: str = "a OR b AND NOT c"
+        # when
+        actual = self._parser.parse(query)
+        # then
+        self.assertEqual(Or((Term("a"), And((Term("b"), Not(Term("c")))))), actual)
+
+    def test_parse_implicit_and_and_parentheses(self) -> None:
+        # given
+        query: str = "(A OR b) c"
+        # when
+        actual = self._parser.parse(query)
+        # then
+        self.assertEqual(And((Or((Term("a"), Term("b"))), Term("c"))), actual)
+
+    def test_parse_phrase(self) -> None:
+        self.assertEqual(Phrase(("ride", "my", "bicycle")), self._parser.parse('"Ride my bicycle"'))
+        self.assertEqual(Term("ride"), self._parser.parse('"ride"'))
+        self.assertEqual(Phrase(("i", "m")), self._parser.parse("I'm"))
+
+    def test_parse_drops_words_without_tokens(self) -> None:
+        self.assertEqual(Term("a"), self._parser.parse("a AND !!"))
+        self.assertIsNone(self._parser.parse("NOT !!"))
+        self.assertIsNone(self._parser.parse(""))
+
+    def test_parse_errors(self) -> None:
+        for query in ("a AND", "(a OR b", "a)", 'a "b', "OR a", "NOT", "a NEAR/2", 'a NEAR/2 "b c"', "NEAR/1 a"):
+            with self.subTest(query=query):
+                with self.assertRaises(QueryParseError):
+                    self._parser.parse(query)
+
+    def test_positive_tokens(self) -> None:
+        # given
+        query = self._parser.parse('(a OR "b c") NOT d')
+        # then
+        self.assertSetEqual({"a", "b", "c"}, positive_tokens(query))
+        self.assertSetEqual(set(), positive_tokens(None))
+
+    def test_parse_near(self) -> None:
+        # given
+        query: str = "ride NEAR/2 Bicycle NEAR/10 bike OR NOT a NEAR/1 b"
+        # when
+        actual = self._parser.parse(query)
+        # then
+        self.assertEqual(Or((Near(("ride", "bicycle", "bike"), (2, 10)), Not(Near(("a", "b"), (1,))))), actual)
+        self.assertTrue(has_near(actual))
+        self.assertFalse(has_near(self._parser.parse("a OR NOT b")))
+        self.assertSetEqual({"ride", "bicycle", "bike"}, positive_tokens(actual))
+
+
+if __name__ == '__main__':
+    unittest.main()
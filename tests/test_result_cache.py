@@ -0,0 +1,82 @@
+import unittest
+
+from src.result_cache import ResultCache, result_size
+
+
+class ResultCacheTestCase(unittest.TestCase):
+
+    def test_get_and_put(self) -> None:
+        # given
+        cache: ResultCache = ResultCache()
+        # when
+        cache.put("key", [("a.txt", 50.0)], 0)
+        # then
+        self.assertListEqual([("a.txt", 50.0)], cache.get("key", 0))
+        self.assertIsNone(cache.get("other", 0))
+        self.assertEqual(1, cache.stats.hits)
+        self.assertEqual(1, cache.stats.misses)
+
+    def test_evicts_least_recently_used(self) -> None:
+        # given
+        cache: ResultCache = ResultCache(max_entries=2)
+        cache.put("a", [], 0)
+        cache.put("b", [], 0)
+        cache.get("a", 0)
+        # when
+        cache.put("c", [], 0)
+        # then
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get("b", 0))
+        self.assertIsNotNone(cache.get("a", 0))
+        self.assertIsNotNone(cache.get("c", 0))
+        self.assertEqual(1, cache.stats.evictions)
+
+    def test_evicts_by_size(self) -> None:
+        # given
+        result: list = [("a.txt", 50.0), ("b.txt", 25.0)]
+        cache: ResultCache = ResultCache(max_bytes=2 * result_size(result))
+        # when
+        for key in range(3):
+            cache.put(key, result, 0)
+        cache.put("too big", result * 10, 0)
+        # then
+        self.assertEqual(2, len(cache))
+        self.assertEqual(2 * result_size(result), cache.size)
+        self.assertIsNone(cache.get("too big", 0))
+        self.assertIsNone(cache.get(0, 0))
+
+    def test_new_generation_invalidates(self) -> None:
+        # given
+        cache: ResultCache = ResultCache()
+        cache.put("key", [("a.txt", 50.0)], 0)
+        # then
+        self.assertIsNone(cache.get("key", 1))
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.size)
+
+    def test_cached_results_are_copies(self) -> None:
+        # given
+        cache: ResultCache = ResultCache()
+        result: list = [("a.txt", 50.0)]
+        cache.put("key", result, 0)
+        # when
+        result.clear()
+        cache.get("key", 0).clear()
+        # then
+        self.assertListEqual([("a.txt", 50.0)], cache.get("key", 0))
+
+    def test_disabled(self) -> None:
+        # given
+        cache: ResultCache = ResultCache(max_entries=0)
+        # when
+        cache.put("key", [], 0)
+        # then
+        self.assertIsNone(cache.get("key", 0))
+
+    def test_invalid_limits(self) -> None:
+        with self.assertRaises(ValueError):
+            ResultCache(max_entries=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,6 +18,14 @@ class ScannerTestCase(unittest.TestCase):
         # then
         self.assertFalse(self._scanner.is_exit_statement(not_exit_statement))
 
+    def test_is_reload_statement(self) -> None:
+        self.assertTrue(self._scanner.is_reload_statement(":reload"))
+        self.assertFalse(self._scanner.is_reload_statement(self._scanner.exit_word))
+
+    def test_is_stats_statement(self) -> None:
+        self.assertTrue(self._scanner.is_stats_statement(":stats"))
+        self.assertFalse(self._scanner.is_stats_statement(":reload"))
+
 
 if __name__ == '__main__':
     unittest.main()
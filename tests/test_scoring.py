@@ -0,0 +1,176 @@
+import math
+import random
+import unittest
+
+import numpy as np
+
+from src.database import Database
+from src.scoring import BM25Ranker, MaxScoreBM25Ranker, PercentageRanker, select_top_k
+
+
+class ScoringTestCase(unittest.TestCase):
+
+    def test_select_top_k(self) -> None:
+        # given
+        doc_ids: np.ndarray = np.array([0, 1, 2, 3, 4])
+        scores: np.ndarray = np.array([10.0, 50.0, 30.0, 50.0, 20.0])
+        # when
+        actual: list = select_top_k(doc_ids, scores, 3)
+        # then
+        self.assertListEqual([(1, 50.0), (3, 50.0), (2, 30.0)], actual)
+
+    def test_select_top_k_ties_at_boundary(self) -> None:
+        # given
+        doc_ids: np.ndarray = np.array([7, 3, 5])
+        scores: np.ndarray = np.array([20.0, 20.0, 20.0])
+        # then
+        self.assertListEqual([(3, 20.0), (5, 20.0)], select_top_k(doc_ids, scores, 2))
+
+    def test_select_top_k_empty(self) -> None:
+        self.assertListEqual([], select_top_k(np.array([]), np.array([]), 10))
+
+    def test_percentage_ranker(self) -> None:
+        # given
+        database: Database = Database()
+        for token, doc_ids in {"a": [0, 1, 2], "b": [1, 2], "c": [2]}.items():
+            for doc_id in doc_ids:
+                database.add(token, doc_id)
+        # when
+        actual: list = PercentageRanker.rank(database, {"a", "b", "c", "missing"}, 10)
+        # then
+        self.assertListEqual([(2, 75.0), (1, 50.0), (0, 25.0)], actual)
+
+    def test_percentage_ranker_rounds_half_to_even(self) -> None:
+        # given
+        database: Database = Database()
+        database.add("a", 0)
+        tokens: set[str] = {"a"} | {"t{}".format(i) for i in range(7)}
+        # when
+        actual: list = PercentageRanker.rank(database, tokens, 10)
+        # then
+        self.assertListEqual([(0, 12.0)], actual)
+
+    def test_bm25_ranker(self) -> None:
+        # given
+        database: Database = Database()
+        documents: list[list[str]] = [["a", "a", "b"], ["a", "c", "c", "c", "d"], ["b", "d"]]
+        for doc_id, tokens in enumerate(documents):
+            for token in tokens:
+                database.add(token, doc_id)
+        ranker: BM25Ranker = BM25Ranker(k1=1.2, b=0.75)
+        ranker.prepare(database)
+
+        def expected_score(doc_id: int, query_tokens: set[str]) -> float:
+            average_length: float = sum(len(tokens) for tokens in documents) / len(documents)
+            score: float = 0.0
+            for token in query_tokens:
+                tf: int = documents[doc_id].count(token)
+                df: int = sum(token in tokens for tokens in documents)
+                idf: float = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+                norm: float = 1.2 * (1 - 0.75 + 0.75 * len(documents[doc_id]) / average_length)
+                score += idf * tf * 2.2 / (tf + norm)
+            return score
+
+        # when
+        actual: list = ranker.rank(database, {"a", "c"}, 10)
+        # then
+        self.assertListEqual([1, 0], [doc_id for doc_id, _ in actual])
+        for doc_id, score in actual:
+            self.assertAlmostEqual(expected_score(doc_id, {"a", "c"}), score)
+
+    def test_bm25_ranker_ignores_deleted_documents(self) -> None:
+        # given
+        database: Database = Database()
+        for doc_id, tokens in enumerate([["a"], ["a", "b"], ["b"]]):
+            for token in tokens:
+                database.add(token, doc_id)
+        database.remove(0)
+        ranker: BM25Ranker = BM25Ranker()
+        # when
+        ranker.prepare(database)
+        # then
+        self.assertEqual(2, ranker.n_documents)
+        self.assertListEqual([1], [doc_id for doc_id, _ in ranker.rank(database, {"a"}, 10)])
+
+    def test_bm25_ranker_covers_documents_added_since_prepare(self) -> None:
+        for ranker in [BM25Ranker(), MaxScoreBM25Ranker()]:
+            with self.subTest(ranker=type(ranker).__name__):
+                # given
+                database: Database = Database()
+                for doc_id, tokens in enumerate([["a", "b"], ["b", "c"]]):
+                    for token in tokens:
+                        database.add(token, doc_id)
+                ranker.prepare(database)
+                database.add("a", 2)
+                # when
+                actual: list = ranker.rank(database, {"a"}, 10)
+                # then, the shorter document added is scored against the statistics of the last prepare()
+                self.assertListEqual([2, 0], [doc_id for doc_id, _ in actual])
+                self.assertEqual(2, ranker.n_documents)
+
+    def test_bm25_ranker_no_matches(self) -> None:
+        # given
+        ranker: BM25Ranker = BM25Ranker()
+        ranker.prepare(Database())
+        # then
+        self.assertListEqual([], ranker.rank(Database(), {"a"}, 10))
+
+    def test_max_score_ranker_same_results_as_bm25(self) -> None:
+        # given
+        generator: random.Random = random.Random(42)
+        vocabulary: list[str] = ["t{}".format(i) for i in range(50)]
+        weights: list[float] = [1 / (i + 1) for i in range(50)]
+        database: Database = Database()
+        for doc_id in range(2000):
+            for token in generator.choices(vocabulary, weights, k=generator.randint(5, 60)):
+                database.add(token, doc_id)
+        bm25_ranker: BM25Ranker = BM25Ranker()
+        bm25_ranker.prepare(database)
+        max_score_ranker: MaxScoreBM25Ranker = MaxScoreBM25Ranker()
+        max_score_ranker.prepare(database)
+
+        for query_tokens in ({"t0", "t1", "t30"}, {"t0", "t49"}, {"t2", "t3", "t4", "t5", "t40"}, {"t7"}):
+            # when
+            expected: list = bm25_ranker.rank(database, query_tokens, 10)
+            actual: list = max_score_ranker.rank(database, query_tokens, 10)
+            # then
+            self.assertListEqual([doc_id for doc_id, _ in expected], [doc_id for doc_id, _ in actual])
+            for (_, expected_score), (_, actual_score) in zip(expected, actual):
+                self.assertAlmostEqual(expected_score, actual_score)
+
+        self.assertEqual(4, max_score_ranker.stats.queries)
+        self.assertGreater(max_score_ranker.stats.skipped, 0)
+
+    def test_rankers_with_expansions(self) -> None:
+        # given
+        database: Database = Database()
+        for token, doc_ids in {"bicycle": [0, 2], "bicycles": [1, 2], "ride": [0, 1, 3]}.items():
+            for doc_id in doc_ids:
+                database.add(token, doc_id)
+        expansions: dict[str, dict[str, int]] = {"bicycle": {"bicycle": 0, "bicycles": 1}, "ride": {"ride": 0}}
+        # then, a misspelling counts half and a document having both counts as the exact match
+        self.assertListEqual([(0, 100.0), (1, 75.0), (2, 50.0), (3, 50.0)],
+                             PercentageRanker.rank(database, {"bicycle", "ride"}, 10, expansions=expansions))
+        self.assertListEqual([(0, 100.0), (1, 75.0), (3, 50.0)],
+                             PercentageRanker.rank(database, {"bicycle", "ride"}, 3, np.array([0, 1, 3]),
+                                                   expansions=expansions))
+        for ranker in [BM25Ranker(), MaxScoreBM25Ranker()]:
+            with self.subTest(ranker=type(ranker).__name__):
+                ranker.prepare(database)
+                scores: dict[int, float] = dict(ranker.rank(database, {"bicycle"}, 10, expansions=expansions))
+                exact_scores: dict[int, float] = dict(ranker.rank(database, {"bicycle"}, 10))
+                self.assertListEqual([0, 1, 2], sorted(scores))
+                self.assertEqual(exact_scores[0], scores[0])
+                self.assertEqual(exact_scores[2], scores[2])
+                self.assertLess(scores[1], exact_scores[0])
+
+    def test_max_score_ranker_no_matches(self) -> None:
+        # given
+        ranker: MaxScoreBM25Ranker = MaxScoreBM25Ranker()
+        ranker.prepare(Database())
+        # then
+        self.assertListEqual([], ranker.rank(Database(), {"a"}, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os.path
+import shutil
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from src.regex_catalog import RegexCatalog
+from src.search_server import SearchServer
+from src.simple_search import SimpleSearch
+from src.tokenizer import Tokenizer
+
+
+class SearchServerTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        samples: str = os.path.join(os.getcwd(), "tests", "samples")
+        shutil.copy(os.path.join(samples, "queen_bicycle.txt"), self._directory.name)
+        self._tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter=" ")
+        self._builds = 0
+        self._build_allowed = threading.Event()
+        self._build_allowed.set()
+        self._build_error: Exception or None = None
+        self._server = SearchServer(self.build_snapshot, query_workers=4)
+        await self._server.start()
+
+    async def asyncTearDown(self) -> None:
+        self._build_allowed.set()
+        await self._server.close()
+        self._directory.cleanup()
+
+    def build_snapshot(self) -> SimpleSearch:
+        self._build_allowed.wait()
+        if self._build_error is not None:
+            raise self._build_error
+        simple_search: SimpleSearch = SimpleSearch(path=self._directory.name, valid_extensions=['txt'],
+                                                   tokenizer=self._tokenizer)
+        with redirect_stdout(StringIO()):
+            simple_search.load_database()
+        self._builds += 1
+        return simple_search
+
+    async def request(self, *lines: str) -> list[dict]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self._server.port)
+        responses: list[dict] = list()
+        for line in lines:
+            writer.write(line.encode("utf-8") + b"\n")
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+        writer.write(b":quit\n")
+        await writer.drain()
+        self.assertEqual(b"", await reader.read())
+        writer.close()
+        return responses
+
+    async def test_search(self) -> None:
+        # when
+        responses: list[dict] = await self.request("bicycle", "bicycle AND (")
+        # then
+        self.assertListEqual([["queen_bicycle.txt", 100.0]], responses[0]["results"])
+        self.assertIn("latency_ms", responses[0])
+        self.assertIn("error", responses[1])
+
+    async def test_concurrent_clients(self) -> None:
+        # when
+        responses: list[list[dict]] = await asyncio.gather(*(self.request("ride bike", "just") for _ in range(20)))
+        # then
+        for client_responses in responses:
+            self.assertListEqual([["queen_bicycle.txt", 100.0]], client_responses[0]["results"])
+            self.assertListEqual([], client_responses[1]["results"])
+
+    async def test_reload_swaps_snapshot(self) -> None:
+        # given
+        old_snapshot: SimpleSearch = self._server.snapshot
+        shutil.copy(os.path.join(os.getcwd(), "tests", "samples", "queen_bohemian_rhapsody.txt"),
+                    self._directory.name)
+        self._build_allowed.clear()
+        # when
+        reload_responses: list[dict] = await self.request(":reload", ":reload")
+        # then, queries are served by the old snapshot until the new one is built
+        self.assertListEqual([{"reload": "started"}, {"reload": "already running"}], reload_responses)
+        self.assertListEqual([], (await self.request("just"))[0]["results"])
+        self.assertIs(old_snapshot, self._server.snapshot)
+
+        self._build_allowed.set()
+        while self._server.is_reloading:
+            await asyncio.sleep(0.01)
+        self.assertIsNot(old_snapshot, self._server.snapshot)
+        self.assertEqual(2, self._builds)
+        self.assertListEqual([["queen_bohemian_rhapsody.txt", 100.0]], (await self.request("just"))[0]["results"])
+
+    async def test_failed_reload_keeps_snapshot(self) -> None:
+        # given
+        old_snapshot: SimpleSearch = self._server.snapshot
+        self._build_error = OSError("disk unplugged")
+        # when
+        with redirect_stdout(StringIO()) as output:
+            self.assertListEqual([{"reload": "started"}], await self.request(":reload"))
+            while self._server.is_reloading:
+                await asyncio.sleep(0.01)
+        # then, the old snapshot keeps serving queries and the next reload reports the failure once
+        self.assertIn("OSError: disk unplugged", output.getvalue())
+        self.assertIs(old_snapshot, self._server.snapshot)
+        self.assertListEqual([["queen_bicycle.txt", 100.0]], (await self.request("bicycle"))[0]["results"])
+
+        self._build_error = None
+        self.assertListEqual([{"reload": "started", "last_error": "OSError: disk unplugged"}],
+                             await self.request(":reload"))
+        while self._server.is_reloading:
+            await asyncio.sleep(0.01)
+        self.assertIsNone(self._server.reload_error)
+        self.assertIsNot(old_snapshot, self._server.snapshot)
+        self.assertListEqual([{"reload": "started"}], await self.request(":reload"))
+
+
+if __name__ == '__main__':
+    unittest.main()
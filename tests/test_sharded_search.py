@@ -0,0 +1,87 @@
+import os
+import random
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from src.regex_catalog import RegexCatalog
+from src.sharded_search import ShardedSearch, UNSUPPORTED_OPTIONS, unsupported_option
+from src.simple_search import QueryParseError, SimpleSearch
+from src.tokenizer import Tokenizer
+
+
+class ShardedSearchTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._directory = tempfile.TemporaryDirectory()
+        cls._tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter=" ")
+        rng: random.Random = random.Random(7)
+        vocabulary: list[str] = ["bicycle", "ride", "queen", "bike", "just", "show", "like", "want", "race", "music"]
+        for i in range(40):
+            os.makedirs(os.path.join(cls._directory.name, "d{}".format(i % 3)), exist_ok=True)
+            with open(os.path.join(cls._directory.name, "d{}".format(i % 3), "f{:02d}.txt".format(i)), mode="w") as f:
+                f.write(" ".join(rng.choices(vocabulary, weights=range(10, 0, -1), k=rng.randint(1, 30))))
+        cls._queries = ["bicycle", "ride bike", "queen music race", "bi* show", "bicycle AND NOT ride",
+                        "(queen OR music) AND just", '"ride bicycle"', "nothing"]
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._directory.cleanup()
+
+    def assert_same_results(self, ranker: str, n_shards: int) -> None:
+        simple_search: SimpleSearch = SimpleSearch(path=self._directory.name, valid_extensions=['txt'],
+                                                   tokenizer=self._tokenizer, ranker=ranker)
+        with redirect_stdout(StringIO()):
+            simple_search.load_directory_into_database()
+        with ShardedSearch(self._directory.name, ['txt'], self._tokenizer, n_shards, ranker=ranker) as sharded_search:
+            self.assertListEqual(simple_search.database_files, sharded_search.files)
+            for query in self._queries:
+                with self.subTest(ranker=ranker, n_shards=n_shards, query=query):
+                    self.assertListEqual(simple_search.search(query), sharded_search.search(query))
+                    self.assertListEqual(simple_search.search(query, 40), sharded_search.search(query, 40))
+
+    def test_search_percentage(self) -> None:
+        self.assert_same_results("percentage", 3)
+
+    def test_search_bm25(self) -> None:
+        # scores depend on the whole collection, not just the shard of every file
+        self.assert_same_results("bm25", 3)
+        self.assert_same_results("bm25-maxscore", 4)
+
+    def test_search_single_shard(self) -> None:
+        self.assert_same_results("bm25", 1)
+
+    def test_collection_statistics(self) -> None:
+        with ShardedSearch(self._directory.name, ['txt'], self._tokenizer, 4, ranker="bm25") as sharded_search:
+            self.assertEqual(40, sharded_search.collection.n_documents)
+            sharded_search.search("bicycle")
+            sharded_search.search("bicycle")
+            self.assertEqual(1, sharded_search.result_cache.stats.hits)
+
+    def test_search_invalid_query(self) -> None:
+        with ShardedSearch(self._directory.name, ['txt'], self._tokenizer, 2) as sharded_search:
+            with self.assertRaises(QueryParseError):
+                sharded_search.search("bicycle AND (")
+            with self.assertRaises(QueryParseError):
+                sharded_search.search("ride NEAR/2 bicycle")
+            self.assertListEqual([], sharded_search.search("!!!"))
+
+    def test_invalid_shards(self) -> None:
+        with self.assertRaises(ValueError):
+            ShardedSearch(self._directory.name, ['txt'], self._tokenizer, 0)
+
+    def test_unsupported_options(self) -> None:
+        parser = SimpleSearch.argument_parser()
+        self.assertIsNone(unsupported_option(parser, parser.parse_args(["--path", "p", "--ranker", "bm25"])))
+        values: dict[str, list[str]] = {"--workers": ["2"], "--index-file": ["index.bin"], "--fuzzy": ["1"],
+                                        "--queries": ["-"], "--query-workers": ["1000"], "--profile": ["-"]}
+        for option in UNSUPPORTED_OPTIONS:
+            with self.subTest(option=option):
+                args = parser.parse_args(["--path", "p", option] + values.get(option, []))
+                self.assertTrue(unsupported_option(parser, args).startswith(option + " is not supported"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,17 @@
 import os.path
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
+from contextlib import redirect_stdout
+from io import StringIO
 
 import pandas as pd
 
+from src.document_registry import FileMetadata
 from src.regex_catalog import RegexCatalog
-from src.simple_search import SimpleSearch
+from src.simple_search import QueryParseError, SimpleSearch
 from src.tokenizer import Tokenizer
 
 
@@ -26,9 +33,270 @@ class SimpleSearchTestCase(unittest.TestCase):
         self._simple_search.load_directory_into_database()
         # then
         self.assertEqual(file_count, len(self._simple_search.database_files))
-        self.assertDictEqual(self._simple_search_dictionary, self._simple_search.database.dictionary)
+        self.assertSetEqual(set(self._simple_search_dictionary), set(self._simple_search.database.dictionary))
+        for token, files in self._simple_search_dictionary.items():
+            self.assertSetEqual(files, self._simple_search.find_files(token))
         self._simple_search.clear_database()
 
+    def test_load_directory_into_database_in_parallel(self) -> None:
+        # given
+        parallel_simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path,
+                                                            valid_extensions=['txt'],
+                                                            tokenizer=self._tokenizer,
+                                                            workers=2)
+        # when
+        self._simple_search.load_directory_into_database()
+        parallel_simple_search.load_directory_into_database()
+        # then
+        self.assertListEqual(self._simple_search.database_files, parallel_simple_search.database_files)
+        self.assertDictEqual(self._simple_search.database.dictionary, parallel_simple_search.database.dictionary)
+        self._simple_search.clear_database()
+
+    def test_load_directory_into_database_with_compact_terms(self) -> None:
+        # given
+        compact_simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                           tokenizer=self._tokenizer, ranker="bm25",
+                                                           compact_terms=True)
+        simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                   tokenizer=self._tokenizer, ranker="bm25")
+        # when
+        with redirect_stdout(StringIO()):
+            compact_simple_search.load_directory_into_database()
+            simple_search.load_directory_into_database()
+        # then
+        self.assertDictEqual({}, compact_simple_search.database.dictionary.overflow)
+        self.assertDictEqual(dict(simple_search.database.dictionary), dict(compact_simple_search.database.dictionary))
+        for query in ["bicycle ride", "bicycle AND NOT race", "bicy*"]:
+            self.assertListEqual(simple_search.search(query), compact_simple_search.search(query))
+        with tempfile.TemporaryDirectory() as directory:
+            index_filename: str = os.path.join(directory, "index.bin")
+            compact_simple_search.save_index(index_filename)
+            simple_search.clear_database()
+            simple_search.load_database(index_filename)
+            self.assertListEqual(simple_search.search("bicycle"), compact_simple_search.search("bicycle"))
+
+    def test_fuzzy_search(self) -> None:
+        # given
+        fuzzy_simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                         tokenizer=self._tokenizer, fuzzy=2)
+        with redirect_stdout(StringIO()):
+            fuzzy_simple_search.load_directory_into_database()
+        # then, misspelled words match, below exact ones
+        self.assertListEqual([("queen_bicycle.txt", 50.0)], fuzzy_simple_search.search("bicyle"))
+        self.assertListEqual([("queen_bicycle.txt", 100.0)], fuzzy_simple_search.search("bicycle"))
+        self.assertListEqual([("queen_bicycle.txt", 75.0)], fuzzy_simple_search.search("bicycle rde"))
+        self.assertListEqual([], fuzzy_simple_search.search("bcycle AND ride"))
+        # and results of expansions cut by the time limit are not cached
+        fuzzy_simple_search.FUZZY_TIME_LIMIT = 0
+        fuzzy_simple_search.result_cache.clear()
+        self.assertListEqual([], fuzzy_simple_search.search("bicyle"))
+        self.assertEqual(0, len(fuzzy_simple_search.result_cache))
+        with self.assertRaises(ValueError):
+            SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'], tokenizer=self._tokenizer, fuzzy=-1)
+
+    def test_load_database_from_index_file(self) -> None:
+        # given
+        query_tokens: set[str] = {"like", "bicycle", "just", "show"}
+        with tempfile.TemporaryDirectory() as directory:
+            index_filename: str = os.path.join(directory, "index.bin")
+            self._simple_search.load_database(index_filename)
+            expected_results = self._simple_search.rank_search_hits(query_tokens)
+            self._simple_search.clear_database()
+            # when
+            self._simple_search.load_database(index_filename)
+            # then
+            self.assertIsNotNone(self._simple_search.database.base)
+            self.assertEqual(0, len(self._simple_search.database.dictionary))
+            self.assertListEqual(expected_results, self._simple_search.rank_search_hits(query_tokens))
+            for token, files in self._simple_search_dictionary.items():
+                self.assertSetEqual(files, self._simple_search.find_files(token))
+            self._simple_search.clear_database()
+
+    def test_load_database_from_index_file_of_other_path(self) -> None:
+        # given
+        other_simple_search: SimpleSearch = SimpleSearch(path=os.path.join(os.getcwd(), "tests"),
+                                                         valid_extensions=['txt'],
+                                                         tokenizer=self._tokenizer)
+        with tempfile.TemporaryDirectory() as directory:
+            index_filename: str = os.path.join(directory, "index.bin")
+            other_simple_search.save_index(index_filename)
+            # when
+            self._simple_search.load_database(index_filename)
+            # then
+            self.assertIsNone(self._simple_search.database.base)
+            self.assertEqual(2, len(self._simple_search.database_files))
+            self._simple_search.clear_database()
+
+    def test_load_database_from_truncated_index_file(self) -> None:
+        # given
+        with tempfile.TemporaryDirectory() as directory:
+            index_filename: str = os.path.join(directory, "index.bin")
+            with redirect_stdout(StringIO()):
+                self._simple_search.load_database(index_filename)
+            with open(index_filename, mode="r+b") as f:
+                f.truncate(200)
+            self._simple_search.clear_database()
+            # when
+            with redirect_stdout(StringIO()) as output:
+                self._simple_search.load_database(index_filename)
+            # then, the index is rebuilt and saved again
+            self.assertIn("file is truncated, rebuilding it", output.getvalue())
+            self.assertIsNone(self._simple_search.database.base)
+            self.assertSetEqual({"queen_bicycle.txt"}, self._simple_search.find_files("bicycle"))
+            self.assertGreater(os.path.getsize(index_filename), 200)
+            self._simple_search.clear_database()
+
+    def test_reload_database(self) -> None:
+        # given
+        with tempfile.TemporaryDirectory() as directory:
+            for filename, content in {"a.txt": "queen bicycle", "b.txt": "queen rhapsody", "c.txt": "queen"}.items():
+                with open(os.path.join(directory, filename), mode="w") as f:
+                    f.write(content)
+            simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                       tokenizer=self._tokenizer)
+            simple_search.load_directory_into_database()
+            # when
+            with open(os.path.join(directory, "b.txt"), mode="w") as f:
+                f.write("queen bohemian rhapsody")
+            os.remove(os.path.join(directory, "c.txt"))
+            with open(os.path.join(directory, "d.txt"), mode="w") as f:
+                f.write("bicycle")
+            changed_count: int = simple_search.reload_database()
+            # then
+            self.assertEqual(3, changed_count)
+            self.assertListEqual(["a.txt", "b.txt", "d.txt"], sorted(simple_search.database_files))
+            self.assertSetEqual({"a.txt", "b.txt"}, simple_search.find_files("queen"))
+            self.assertSetEqual({"b.txt"}, simple_search.find_files("bohemian"))
+            self.assertSetEqual({"a.txt", "d.txt"}, simple_search.find_files("bicycle"))
+            self.assertEqual(0, simple_search.reload_database())
+
+    def test_files_removed_after_the_crawl(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            # given
+            for filename, content in {"a.txt": "queen bicycle", "b.txt": "queen rhapsody", "c.txt": "ride"}.items():
+                with open(os.path.join(directory, filename), mode="w") as f:
+                    f.write(content)
+            for workers, deduplicate in ((1, False), (2, False), (2, True)):
+                with self.subTest(workers=workers, deduplicate=deduplicate):
+                    simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                               tokenizer=self._tokenizer, workers=workers,
+                                                               deduplicate=deduplicate)
+                    crawled_files: list[str] = simple_search.list_files() + ["removed.txt"]
+                    simple_search.list_files = lambda: crawled_files
+                    # when
+                    with redirect_stdout(StringIO()) as output:
+                        simple_search.load_directory_into_database()
+                        os.rename(os.path.join(directory, "b.txt"), os.path.join(directory, "moved.txt"))
+                        changed_count: int = simple_search.reload_database()
+                    os.rename(os.path.join(directory, "moved.txt"), os.path.join(directory, "b.txt"))
+                    # then, they are skipped or removed as if they had not been crawled
+                    self.assertIn("ignoring file removed.txt", output.getvalue())
+                    self.assertIn("ignoring file b.txt", output.getvalue())
+                    self.assertEqual(2, changed_count)
+                    self.assertListEqual(["a.txt", "c.txt"], sorted(simple_search.database_files))
+                    self.assertSetEqual({"a.txt"}, simple_search.find_files("queen"))
+                    self.assertSetEqual(set(), simple_search.find_files("rhapsody"))
+
+    def test_index_batch_of_removed_file(self) -> None:
+        # when
+        with redirect_stdout(StringIO()):
+            database, content_hashes, unread_filenames = SimpleSearch.index_batch(
+                self._simple_search.path, self._tokenizer, [(0, "queen_bicycle.txt", True), (1, "removed.txt", True)])
+        # then
+        self.assertListEqual(["removed.txt"], unread_filenames)
+        self.assertListEqual(["queen_bicycle.txt"], list(content_hashes))
+        self.assertListEqual([0], list(database.find_doc_ids("bicycle")))
+
+    def test_reload_database_touched_file_with_hash(self) -> None:
+        # given
+        with tempfile.TemporaryDirectory() as directory:
+            file_path: str = os.path.join(directory, "a.txt")
+            with open(file_path, mode="w") as f:
+                f.write("queen")
+            simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                       tokenizer=self._tokenizer, hash_files=True)
+            simple_search.load_directory_into_database()
+            # the content is hashed while indexed
+            self.assertEqual(FileMetadata.hash_file(file_path),
+                             simple_search.document_registry.get_metadata("a.txt").content_hash)
+            # when
+            os.utime(file_path, ns=(0, 0))
+            # then
+            self.assertEqual(0, simple_search.reload_database())
+            self.assertEqual(0, simple_search.document_registry.get_metadata("a.txt").mtime_ns)
+
+    def test_load_database_from_stale_index_file(self) -> None:
+        # given
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "a.txt"), mode="w") as f:
+                f.write("queen")
+            index_filename: str = os.path.join(directory, "index.bin")
+            simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                       tokenizer=self._tokenizer)
+            simple_search.load_database(index_filename)
+            with open(os.path.join(directory, "b.txt"), mode="w") as f:
+                f.write("queen")
+            # when
+            simple_search.load_database(index_filename)
+            reopened_simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                                tokenizer=self._tokenizer)
+            reopened_simple_search.open_index(index_filename)
+            # then
+            self.assertSetEqual({"a.txt", "b.txt"}, simple_search.find_files("queen"))
+            self.assertSetEqual({"a.txt", "b.txt"}, reopened_simple_search.find_files("queen"))
+
+    def test_reopen_index_file_after_removing_files_bm25(self) -> None:
+        # given
+        with tempfile.TemporaryDirectory() as directory:
+            for i in range(5):
+                with open(os.path.join(directory, "f{}.txt".format(i)), mode="w") as f:
+                    f.write("queen" + " bicycle" * i + " rhapsody" * (5 - i))
+            index_filename: str = os.path.join(directory, "index.bin")
+            simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                       tokenizer=self._tokenizer, ranker="bm25")
+            simple_search.load_directory_into_database()
+            os.remove(os.path.join(directory, "f3.txt"))
+            os.remove(os.path.join(directory, "f4.txt"))
+            simple_search.reload_database()
+            simple_search.save_index(index_filename)
+            fresh_simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                             tokenizer=self._tokenizer, ranker="bm25")
+            fresh_simple_search.load_directory_into_database()
+            # when
+            reopened_simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                                tokenizer=self._tokenizer, ranker="bm25")
+            reopened_simple_search.open_index(index_filename)
+            # then
+            for query in ["queen", "bicycle rhapsody"]:
+                self.assertListEqual(fresh_simple_search.search(query), reopened_simple_search.search(query))
+                self.assertListEqual(simple_search.search(query), reopened_simple_search.search(query))
+
+    def test_rank_search_hits_bm25(self) -> None:
+        # given
+        bm25_simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path,
+                                                        valid_extensions=['txt'],
+                                                        tokenizer=self._tokenizer,
+                                                        ranker="bm25")
+        bm25_simple_search.load_directory_into_database()
+        # when
+        actual_results = bm25_simple_search.rank_search_hits({"bicycle", "to"})
+        # then
+        self.assertListEqual(['queen_bicycle.txt', 'queen_bohemian_rhapsody.txt'],
+                             [filename for filename, _ in actual_results])
+        self.assertGreater(actual_results[0][1], actual_results[1][1])
+
+    def test_invalid_ranker(self) -> None:
+        with self.assertRaises(ValueError) as e:
+            SimpleSearch(path="does/not/exist", valid_extensions=["txt"], tokenizer=self._tokenizer, ranker="tf-idf")
+
+        self.assertEqual("Unknown ranker: tf-idf", str(e.exception))
+
+    def test_invalid_workers(self) -> None:
+        with self.assertRaises(ValueError) as e:
+            SimpleSearch(path="does/not/exist", valid_extensions=["txt"], tokenizer=self._tokenizer, workers=0)
+
+        self.assertEqual("Expected workers to be a positive integer.", str(e.exception))
+
     def test_load_directory_into_database_non_existing_path(self) -> None:
         # given
         non_existing_path: str = "does/not/exist"
@@ -130,6 +398,391 @@ class SimpleSearchTestCase(unittest.TestCase):
         # then
         self.assertDictEqual(expected_df_dict, actual_df.to_dict())
 
+    def test_rank_search_hits(self) -> None:
+        # given
+        query_tokens: set[str] = {"like", "bicycle", "just", "show"}
+        # when
+        self._simple_search.load_directory_into_database()
+        expected_ranks: dict[str, float] = self._simple_search.rank_dataframe_search_hits(
+            self._simple_search.get_search_hits_as_dataframe(query_tokens)).to_dict()
+        actual_results = self._simple_search.rank_search_hits(query_tokens)
+
+        # then
+        self.assertListEqual([('queen_bicycle.txt', 50.0), ('queen_bohemian_rhapsody.txt', 25.0)], actual_results)
+        self.assertDictEqual(expected_ranks, dict(actual_results))
+        self._simple_search.clear_database()
+
+    def test_rank_search_hits_caps_top_n(self) -> None:
+        # given
+        query_tokens: set[str] = {"like", "bicycle", "just", "show"}
+        # when
+        self._simple_search.load_directory_into_database()
+        actual_results = self._simple_search.rank_search_hits(query_tokens, 1)
+
+        # then
+        self.assertListEqual([('queen_bicycle.txt', 50.0)], actual_results)
+        self._simple_search.clear_database()
+
+    def test_rank_search_hits_missing_query_tokens(self) -> None:
+        # when
+        self._simple_search.load_directory_into_database()
+        actual_results = self._simple_search.rank_search_hits({"this-token-does-not-exist"})
+
+        # then
+        self.assertListEqual([], actual_results)
+        self._simple_search.clear_database()
+
+    def test_search_boolean_query(self) -> None:
+        # when
+        self._simple_search.load_directory_into_database()
+        # then
+        self.assertListEqual([('queen_bicycle.txt', 50.0), ('queen_bohemian_rhapsody.txt', 50.0)],
+                             self._simple_search.search("bicycle OR just"))
+        self.assertListEqual([('queen_bohemian_rhapsody.txt', 50.0)],
+                             self._simple_search.search("(bicycle OR just) AND NOT ride"))
+        self.assertListEqual([('queen_bicycle.txt', 100.0)], self._simple_search.search('"ride my bicycle"'))
+        self.assertListEqual([('queen_bohemian_rhapsody.txt', 0.0)], self._simple_search.search("NOT bicycle"))
+        self.assertListEqual([], self._simple_search.search("bicycle AND just"))
+        self._simple_search.clear_database()
+
+    def test_search_bag_of_words(self) -> None:
+        # when
+        self._simple_search.load_directory_into_database()
+        # then
+        self.assertListEqual(self._simple_search.rank_search_hits({"like", "bicycle", "just", "show"}),
+                             self._simple_search.search("like bicycle just show"))
+        self._simple_search.clear_database()
+
+    def test_search_invalid_boolean_query(self) -> None:
+        with self.assertRaises(QueryParseError):
+            self._simple_search.search("bicycle AND (ride")
+
+    def test_search_boolean_query_bm25(self) -> None:
+        # given
+        simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                   tokenizer=self._tokenizer, ranker="bm25")
+        simple_search.load_directory_into_database()
+        # when
+        actual_results = simple_search.search("bicycle OR NOT ride")
+        # then
+        self.assertListEqual(['queen_bicycle.txt', 'queen_bohemian_rhapsody.txt'], [r[0] for r in actual_results])
+        self.assertGreater(actual_results[0][1], 0.0)
+        self.assertEqual(0.0, actual_results[1][1])
+
+    def test_search_phrase_and_near_with_positions(self) -> None:
+        # given
+        simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                   tokenizer=self._tokenizer, positions=True)
+        with tempfile.TemporaryDirectory() as directory:
+            index_filename: str = os.path.join(directory, "index.bin")
+            simple_search.load_database(index_filename)
+            # when
+            simple_search.load_database(index_filename)
+            # then
+            self.assertIsNotNone(simple_search.database.base)
+            self.assertListEqual([('queen_bicycle.txt', 100.0)], simple_search.search('"ride my bicycle"'))
+            self.assertListEqual([], simple_search.search('"my ride"'))
+            self.assertListEqual([('queen_bicycle.txt', 100.0)], simple_search.search("ride NEAR/2 bicycle"))
+            self.assertListEqual([], simple_search.search("ride NEAR/1 bicycle"))
+            self.assertListEqual([('queen_bohemian_rhapsody.txt', 100.0)],
+                                 simple_search.search('"poor boy" NOT "ride my"'))
+            simple_search.database.base.close()
+
+    def test_search_near_without_positions(self) -> None:
+        with self.assertRaises(QueryParseError):
+            self._simple_search.search("ride NEAR/2 bicycle")
+
+    def test_load_database_from_index_file_without_positions(self) -> None:
+        # given
+        simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                   tokenizer=self._tokenizer, positions=True)
+        with tempfile.TemporaryDirectory() as directory:
+            index_filename: str = os.path.join(directory, "index.bin")
+            self._simple_search.load_database(index_filename)
+            self._simple_search.clear_database()
+            # when
+            simple_search.load_database(index_filename)
+            # then, the index is rebuilt with positions
+            self.assertIsNone(simple_search.database.base)
+            self.assertTrue(simple_search.database.has_positions)
+            self.assertIsNotNone(simple_search.database.find_positions("bicycle"))
+
+    def test_rank_search_hits_cached(self) -> None:
+        # given
+        simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                   tokenizer=self._tokenizer)
+        simple_search.load_directory_into_database()
+        # when
+        expected_results = simple_search.search("like bicycle just show")
+        actual_results = simple_search.search("Show, just BICYCLE like")
+        simple_search.search("bicycle OR just")
+        simple_search.search("(bicycle) OR (just)")
+        # then
+        self.assertListEqual(expected_results, actual_results)
+        self.assertEqual(2, simple_search.result_cache.stats.hits)
+        self.assertEqual(2, simple_search.result_cache.stats.misses)
+
+    def test_rank_search_hits_cache_invalidated(self) -> None:
+        # given
+        simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                   tokenizer=self._tokenizer)
+        simple_search.load_directory_into_database()
+        simple_search.search("bicycle")
+        # when
+        simple_search.clear_database()
+        # then
+        self.assertListEqual([], simple_search.search("bicycle"))
+        self.assertEqual(0, simple_search.result_cache.stats.hits)
+
+    def test_search_wildcards(self) -> None:
+        # when
+        self._simple_search.load_directory_into_database()
+        # then
+        self.assertSetEqual({"bicy*", "ride"}, self._simple_search.get_query_tokens("Bicy* ride!"))
+        self.assertListEqual([('queen_bicycle.txt', 100.0)], self._simple_search.search("bicy*"))
+        self.assertListEqual([('queen_bicycle.txt', 100.0), ('queen_bohemian_rhapsody.txt', 50.0)],
+                             self._simple_search.search("*ke b*"))
+        self.assertListEqual([('queen_bohemian_rhapsody.txt', 100.0)], self._simple_search.search("r*y NOT ride"))
+        self._simple_search.clear_database()
+
+    def test_instrumentation(self) -> None:
+        # given
+        simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                   tokenizer=self._tokenizer)
+        simple_search.instrumentation.reset()
+        simple_search.instrumentation.enabled = True
+        try:
+            # when
+            with redirect_stdout(StringIO()):
+                simple_search.load_directory_into_database()
+                simple_search.report_results(simple_search.search("bicycle AND ride"))
+                simple_search.report_results(simple_search.search("just"))
+            # then
+            histograms = simple_search.instrumentation.histograms
+            self.assertEqual(1, histograms["index_directory"].count)
+            self.assertEqual(2, histograms["dump_file_to_database"].count)
+            self.assertEqual(2, histograms["index_file"].count)
+            self.assertNotIn("get_search_hits_as_dataframe", histograms)
+            self.assertEqual(2, histograms["search"].count)
+            self.assertEqual(1, histograms["rank_boolean_query"].count)
+            self.assertEqual(1, histograms["get_query_tokens"].count)
+            self.assertEqual(2, histograms["report_results"].count)
+            self.assertEqual(sum(os.path.getsize(os.path.join(simple_search.path, filename))
+                                 for filename in simple_search.database_files),
+                             simple_search.instrumentation.counters["indexed_bytes"])
+            self.assertIn("report_results: calls: 2", simple_search.stats_report())
+            # the dataframe API and fill_database are only timed when called directly
+            simple_search.rank_dataframe_search_hits(simple_search.get_search_hits_as_dataframe({"bicycle"}))
+            simple_search.fill_database(len(simple_search.database_files), "bicycle")
+            histograms = simple_search.instrumentation.histograms
+            self.assertEqual(1, histograms["get_search_hits_as_dataframe"].count)
+            self.assertEqual(1, histograms["rank_dataframe_search_hits"].count)
+            self.assertEqual(1, histograms["fill_database"].count)
+        finally:
+            simple_search.instrumentation.enabled = False
+            simple_search.instrumentation.reset()
+
+    def test_instrumentation_disabled(self) -> None:
+        # given
+        simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                   tokenizer=self._tokenizer)
+        # when
+        with redirect_stdout(StringIO()):
+            simple_search.load_directory_into_database()
+        simple_search.search("bicycle")
+        # then
+        self.assertDictEqual({}, simple_search.instrumentation.histograms)
+        self.assertIn("disabled", simple_search.stats_report())
+
+    def test_load_directory_into_database_recursively(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            # given, nested files, one of them with bytes that are not utf-8
+            os.makedirs(os.path.join(directory, "songs", "queen"))
+            os.makedirs(os.path.join(directory, "skipped"))
+            with open(os.path.join(directory, "songs", "queen", "bicycle.txt"), mode="wb") as f:
+                f.write(b"I want to ride my bicycle \xff\xfe caf\xc3\xa9")
+            with open(os.path.join(directory, "skipped", "bicycle.txt"), mode="w") as f:
+                f.write("bicycle")
+            for workers in [1, 2]:
+                with self.subTest(workers=workers):
+                    simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                               tokenizer=self._tokenizer, workers=workers,
+                                                               exclude=["skipped"])
+                    # when
+                    with redirect_stdout(StringIO()):
+                        simple_search.load_directory_into_database()
+                    # then
+                    filename: str = os.path.join("songs", "queen", "bicycle.txt")
+                    self.assertListEqual([filename], simple_search.database_files)
+                    self.assertListEqual([(filename, 100.0)], simple_search.search("café bicycle"))
+
+            # when
+            with open(os.path.join(directory, "songs", "other.txt"), mode="w") as f:
+                f.write("bicycle")
+            with redirect_stdout(StringIO()):
+                changes: int = simple_search.reload_database()
+            # then
+            self.assertEqual(1, changes)
+            self.assertSetEqual({os.path.join("songs", "queen", "bicycle.txt"), os.path.join("songs", "other.txt")},
+                                simple_search.find_files("bicycle"))
+
+    def test_deduplicate(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            # given, two copies of the samples and one other file
+            for copy in ["a", "b"]:
+                os.makedirs(os.path.join(directory, copy))
+                for filename in ["queen_bicycle.txt", "queen_bohemian_rhapsody.txt"]:
+                    with open(os.path.join(self._simple_search.path, filename), mode="rb") as source, \
+                            open(os.path.join(directory, copy, filename), mode="wb") as f:
+                        f.write(source.read())
+            with open(os.path.join(directory, "c.txt"), mode="w") as f:
+                f.write("my bicycle")
+            bicycle_files: list[str] = [os.path.join(copy, "queen_bicycle.txt") for copy in ["a", "b"]]
+            for workers in [1, 2]:
+                with self.subTest(workers=workers):
+                    simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                               tokenizer=self._tokenizer, workers=workers,
+                                                               deduplicate=True)
+                    # when
+                    with redirect_stdout(StringIO()) as output:
+                        simple_search.load_directory_into_database()
+                    # then, copies share a doc id and are all listed in results
+                    self.assertIn("2 duplicate files not indexed: ", output.getvalue())
+                    self.assertEqual(5, len(simple_search.database_files))
+                    self.assertEqual(3, len(list(simple_search.document_registry.doc_ids())))
+                    self.assertListEqual([(bicycle_files[0], 100.0), (bicycle_files[1], 100.0), ("c.txt", 100.0)],
+                                         simple_search.search("bicycle"))
+                    self.assertListEqual(bicycle_files, [file for file, _ in simple_search.search("bicycle AND ride")])
+                    self.assertSetEqual(set(bicycle_files) | {"c.txt"}, simple_search.find_files("bicycle"))
+                    self.assertListEqual(bicycle_files, [file for file in simple_search.get_search_hits_as_dataframe(
+                        {"ride"}).query("ride == 1").index])
+
+            # when, the file owning the doc id is removed and its copy modified to the content of c.txt
+            index_filename: str = os.path.join(directory, "index.bin")
+            simple_search.save_index(index_filename)
+            os.remove(os.path.join(directory, bicycle_files[0]))
+            with open(os.path.join(directory, bicycle_files[1]), mode="w") as f:
+                f.write("my bicycle")
+            reloaded_simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                                tokenizer=self._tokenizer, deduplicate=True)
+            with redirect_stdout(StringIO()):
+                reloaded_simple_search.load_database(index_filename)
+            # then
+            self.assertListEqual([("c.txt", 100.0), (bicycle_files[1], 100.0)],
+                                 reloaded_simple_search.search("bicycle"))
+            self.assertListEqual([], reloaded_simple_search.search("ride"))
+            self.assertEqual(2, len(list(reloaded_simple_search.document_registry.doc_ids())))
+
+    def test_load_database_in_background(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            # given
+            for i in range(200):
+                with open(os.path.join(directory, "f{:03d}.txt".format(i)), mode="w") as f:
+                    f.write("bicycle " * (i % 7 + 1) + "ride " * (i % 3) + "word{:03d}".format(i))
+            expected: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                  tokenizer=self._tokenizer, ranker="bm25")
+            with redirect_stdout(StringIO()):
+                expected.load_directory_into_database()
+            for workers in [1, 2]:
+                with self.subTest(workers=workers):
+                    simple_search: SimpleSearch = SimpleSearch(path=directory, valid_extensions=['txt'],
+                                                               tokenizer=self._tokenizer, ranker="bm25",
+                                                               workers=workers)
+                    # when, queries are answered while indexing
+                    with redirect_stdout(StringIO()):
+                        simple_search.load_database_in_background()
+                        self.assertTrue(simple_search.is_loading)
+                        while not simple_search.wait_until_loaded(timeout=0.001):
+                            results = simple_search.search("bicycle ride")
+                            simple_search.search("word1*")
+                            files_indexed, files_to_index = simple_search.coverage
+                            self.assertLessEqual(len(results), 10)
+                            self.assertTrue(files_to_index is None or files_indexed <= files_to_index)
+                    # then
+                    self.assertFalse(simple_search.is_loading)
+                    self.assertIsNone(simple_search.loading_error)
+                    self.assertEqual((200, 200), simple_search.coverage)
+                    self.assertListEqual(expected.search("bicycle ride"), simple_search.search("bicycle ride"))
+                    # the term dictionary of wildcards, only refreshed now and then while loading, has every term
+                    self.assertListEqual(expected.search("word1*", 200), simple_search.search("word1*", 200))
+
+    def test_search_does_not_wait_for_the_lock_once_loaded(self) -> None:
+        # given
+        simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                   tokenizer=self._tokenizer)
+        with redirect_stdout(StringIO()):
+            simple_search.load_directory_into_database()
+        lock_held, release = threading.Event(), threading.Event()
+
+        def hold_lock() -> None:
+            with simple_search._lock:
+                lock_held.set()
+                release.wait()
+
+        holder: threading.Thread = threading.Thread(target=hold_lock)
+        holder.start()
+        lock_held.wait()
+        # when
+        results: list = simple_search.search("bicycle")
+        release.set()
+        holder.join()
+        # then
+        self.assertListEqual([("queen_bicycle.txt", 100.0)], results)
+
+    def test_open_index_waits_for_the_lock(self) -> None:
+        # given
+        with tempfile.TemporaryDirectory() as directory:
+            index_filename: str = os.path.join(directory, "index.bin")
+            simple_search: SimpleSearch = SimpleSearch(path=self._simple_search.path, valid_extensions=['txt'],
+                                                       tokenizer=self._tokenizer, ranker="bm25")
+            with redirect_stdout(StringIO()):
+                simple_search.load_database(index_filename)
+            database, document_registry = simple_search.database, simple_search.document_registry
+            opener: threading.Thread = threading.Thread(target=simple_search.open_index, args=(index_filename,))
+            # when
+            with simple_search._lock:
+                opener.start()
+                opener.join(0.1)
+                # then, a query holding the lock keeps the Database and registry it started with
+                self.assertTrue(opener.is_alive())
+                self.assertIs(database, simple_search.database)
+                self.assertIs(document_registry, simple_search.document_registry)
+            opener.join()
+            self.assertIsNot(database, simple_search.database)
+            self.assertIsNot(document_registry, simple_search.document_registry)
+            self.assertEqual("queen_bicycle.txt", simple_search.search("bicycle")[0][0])
+            simple_search.database.base.close()
+
+    def test_load_database_in_background_error(self) -> None:
+        # given
+        simple_search: SimpleSearch = SimpleSearch(path=os.path.join(self._simple_search.path, "missing"),
+                                                   valid_extensions=['txt'], tokenizer=self._tokenizer)
+        # when
+        simple_search.load_database_in_background()
+        simple_search.wait_until_loaded()
+        # then
+        self.assertIsInstance(simple_search.loading_error, FileNotFoundError)
+        with redirect_stdout(StringIO()) as output:
+            simple_search.report_coverage()
+        self.assertIn("indexing failed", output.getvalue())
+
+    def test_pandas_imported_lazily(self) -> None:
+        # when
+        modules: str = subprocess.run([sys.executable, "-c", "import sys; sys.path.insert(0, 'src'); "
+                                                             "import simple_search; print(' '.join(sys.modules))"],
+                                      capture_output=True, text=True, check=True).stdout
+        # then
+        self.assertNotIn("pandas", modules.split())
+
+    def test_piped_queries_wait_for_the_index(self) -> None:
+        # when
+        output: str = subprocess.run([sys.executable, os.path.join("src", "simple_search.py"), "--path",
+                                      self._simple_search.path], input="bicycle\n:quit\n", capture_output=True,
+                                     text=True, check=True).stdout
+        # then
+        self.assertIn("queen_bicycle.txt", output)
+        self.assertNotIn("so far", output)
+
 
 if __name__ == '__main__':
     unittest.main()
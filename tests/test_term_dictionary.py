@@ -0,0 +1,50 @@
+import unittest
+
+from src.term_dictionary import TermDictionary
+
+
+class TermDictionaryTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._terms = TermDictionary(["hello", "help", "hero", "halo", "going", "sing", "ring", "ñandú", "h"])
+
+    def test_with_prefix(self) -> None:
+        self.assertListEqual(["hello", "help"], self._terms.with_prefix("hel"))
+        self.assertListEqual(["hello"], self._terms.with_prefix("hel", limit=1))
+        self.assertListEqual([], self._terms.with_prefix("x"))
+
+    def test_with_suffix(self) -> None:
+        self.assertListEqual(["going", "ring", "sing"], self._terms.with_suffix("ing"))
+        self.assertListEqual(["ñandú"], self._terms.with_suffix("dú"))
+
+    def test_expand(self) -> None:
+        self.assertListEqual(["hello", "help"], self._terms.expand("hel*"))
+        self.assertListEqual(["going", "ring", "sing"], self._terms.expand("*ing"))
+        self.assertListEqual(["halo", "hello", "hero"], self._terms.expand("h*o"))
+        self.assertListEqual(["ring"], self._terms.expand("*r*g*"))
+        self.assertListEqual(["hello", "help", "hero"], self._terms.expand("he*"))
+        self.assertListEqual(["hero"], self._terms.expand("hero"))
+        self.assertListEqual([], self._terms.expand("heroes"))
+
+    def test_sorted_sequence_kept_as_given(self) -> None:
+        # given
+        sorted_terms: tuple[str, ...] = ("going", "halo", "ring", "sing")
+        # when
+        terms: TermDictionary = TermDictionary(sorted_terms, is_sorted=True)
+        # then
+        self.assertListEqual(["going", "ring", "sing"], terms.with_suffix("ing"))
+        self.assertListEqual(["halo"], terms.expand("h*o"))
+        self.assertIn("ring", terms)
+
+    def test_expand_limit(self) -> None:
+        self.assertEqual(2, len(self._terms.expand("h*", limit=2)))
+        self.assertEqual(1, len(self._terms.expand("h*o", limit=1)))
+
+    def test_contains(self) -> None:
+        self.assertIn("h", self._terms)
+        self.assertNotIn("he", self._terms)
+        self.assertEqual(9, len(self._terms))
+
+
+if __name__ == '__main__':
+    unittest.main()
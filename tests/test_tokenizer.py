@@ -1,4 +1,5 @@
 import unittest
+from io import StringIO
 
 from src.tokenizer import Tokenizer
 from src.regex_catalog import RegexCatalog
@@ -26,6 +27,71 @@ class TokenizerTestCase(unittest.TestCase):
         actual_tokens: list[str] = self._tokenizer.tokenize_word(raw_string)
         self.assertListEqual(["one", "two", "is", "not", "one-two", "nor", "one", "two"], actual_tokens)
 
+    def test_iter_tokens(self) -> None:
+        # iter_tokens keeps repeated tokens, and lowercases them
+        raw_string: str = "One two#ONE-two nor one!two"
+        actual_tokens: list[str] = list(self._tokenizer.iter_tokens(raw_string))
+        self.assertListEqual(["one", "two", "one-two", "nor", "one", "two"], actual_tokens)
+
+    def test_iter_tokens_non_ascii(self) -> None:
+        # same tokens as matching word by word: lowercasing 'İ' before matching would split 'İx' in two tokens
+        raw_string: str = "Ñandú \u212aelvin \u0130x"
+        self.assertListEqual(["and", "kelvin", "\u0130x".lower()], list(self._tokenizer.iter_tokens(raw_string)))
+
+    def test_iter_tokens_delimiter_inside_tokens(self) -> None:
+        # '-' can be part of a token, so words must be split on it before matching
+        tokenizer: Tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter="-")
+        self.assertSetEqual({"one", "two", "three"}, tokenizer.get_tokens("one-two three"))
+
+    def test_iter_file_tokens_across_chunks(self) -> None:
+        # given
+        content: str = "bicycle, bicycle\nI want to ride my bicycle#bike " * 20
+        expected_tokens: list[str] = list(self._tokenizer.iter_tokens(content))
+        # when
+        actual_tokens: list[str] = list(self._tokenizer.iter_file_tokens(StringIO(content), chunk_size=7))
+        # then
+        self.assertListEqual(expected_tokens, actual_tokens)
+
+    def test_iter_file_tokens_split_on_delimiter_across_chunks(self) -> None:
+        # given
+        tokenizer: Tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter="-")
+        content: str = "one-two three-four five " * 10
+        # when
+        actual_tokens: list[str] = list(tokenizer.iter_file_tokens(StringIO(content), chunk_size=5))
+        # then
+        self.assertListEqual(list(tokenizer.iter_tokens(content)), actual_tokens)
+
+    def test_iter_chunk_tokens_of_long_run(self) -> None:
+        for word_delimiter in (" ", "-"):
+            with self.subTest(word_delimiter=word_delimiter):
+                # given
+                tokenizer: Tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED,
+                                                 word_delimiter=word_delimiter)
+                content: str = "queen " + "a" * 1000 + " bicycle ride"
+                # when
+                actual_tokens: list[str] = list(tokenizer.iter_chunk_tokens(
+                    (content[i:i + 10] for i in range(0, len(content), 10)), max_token_length=20))
+                # then, the run is split instead of being carried over whole
+                self.assertListEqual(["queen"], actual_tokens[:1])
+                self.assertListEqual(["bicycle", "ride"], actual_tokens[-2:])
+                self.assertEqual("a" * 1000, "".join(actual_tokens[1:-2]))
+                self.assertLessEqual(max(len(token) for token in actual_tokens), 30)
+
+        # without the delimiter for longer than max_token_length, other words are still kept whole
+        tokenizer = Tokenizer(regex=RegexCatalog.ALPHANUMERIC_EXTENDED, word_delimiter="-")
+        content = "queen bicycle ride " * 10
+        self.assertListEqual(list(tokenizer.iter_tokens(content)), list(tokenizer.iter_chunk_tokens(
+            (content[i:i + 10] for i in range(0, len(content), 10)), max_token_length=20)))
+
+    def test_get_wildcard_pattern(self) -> None:
+        self.assertEqual("hel*", self._tokenizer.get_wildcard_pattern("Hel*"))
+        self.assertEqual("h*o", self._tokenizer.get_wildcard_pattern("h*O"))
+        self.assertEqual("*ing", self._tokenizer.get_wildcard_pattern("*ing!"))
+        self.assertIsNone(self._tokenizer.get_wildcard_pattern("hello"))
+        self.assertIsNone(self._tokenizer.get_wildcard_pattern("**"))
+        self.assertIsNone(self._tokenizer.get_wildcard_pattern("i'm*"))
+
+
 
 if __name__ == '__main__':
     unittest.main()